@@ -0,0 +1,135 @@
+## bench_logging.py
+
+"""Per-call logging overhead under concurrency: synchronous vs queue-based handlers.
+
+    python benchmarks/bench_logging.py --threads 1,8,32 --messages 20000
+
+For each thread count, every thread logs ``--messages`` records the way the
+transfer workers do. The time a caller spends inside ``logger.info`` is
+reported for a plain ``FileHandler`` (the old setup) and for the package's
+``QueueHandler`` + background writer with rotation.
+"""
+
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+DURABLE = False
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import ResultWriter
+from colabdrive.logger import LOG_FORMAT, CompressingRotatingFileHandler, DeferredQueueHandler
+
+
+class _SyncedStream:
+    """Wraps a log stream so every flush also fsyncs, like a slow network disk."""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+
+    def write(self, data: str) -> int:
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+def _durable(handler: logging.FileHandler) -> logging.FileHandler:
+    if DURABLE:
+        handler.stream = _SyncedStream(handler._open())
+    return handler
+
+
+def sync_logger(path: str):
+    handler = _durable(logging.FileHandler(path, delay=True))
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler, None
+
+
+def queued_logger(path: str):
+    file_handler = _durable(CompressingRotatingFileHandler(path, max_bytes=0, backup_count=3))
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    return DeferredQueueHandler(log_queue), listener
+
+
+def run(setup, threads: int, messages: int, workdir: str) -> dict:
+    """Logs from ``threads`` threads and returns caller-side and drain timings."""
+    name = f"bench-{setup.__name__}-{threads}"
+    handler, listener = setup(os.path.join(workdir, f"{name}.log"))
+    bench_logger = logging.getLogger(name)
+    bench_logger.propagate = False
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.addHandler(handler)
+
+    barrier = threading.Barrier(threads)
+    caller_seconds = [0.0] * threads
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        start = time.perf_counter()
+        for i in range(messages):
+            bench_logger.info("Downloaded chunk %d of %s (%d bytes)", i, 'model.safetensors', 1048576)
+        caller_seconds[index] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    callers_done = time.perf_counter() - start
+    if listener:
+        listener.stop()
+    drained = time.perf_counter() - start
+    handler.close()
+    bench_logger.removeHandler(handler)
+
+    total = threads * messages
+    return {
+        'handler': setup.__name__,
+        'threads': threads,
+        'messages': total,
+        'per_call_us': 1e6 * sum(caller_seconds) / total,
+        'callers_seconds': callers_done,
+        'drained_seconds': drained,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', default='1,8,32', help='Comma-separated thread counts')
+    parser.add_argument('--messages', type=int, default=20000, help='Records logged per thread')
+    parser.add_argument('--fsync', action='store_true',
+                        help='fsync after every record to mimic a slow persistent disk')
+    parser.add_argument('--output', default='logging_benchmarks.jsonl', help='JSON lines output file')
+    args = parser.parse_args()
+    global DURABLE
+    DURABLE = args.fsync
+
+    writer = ResultWriter(args.output)
+    with tempfile.TemporaryDirectory(prefix='colabdrive-logbench-') as workdir:
+        for threads in [int(t) for t in args.threads.split(',') if t]:
+            for setup in (sync_logger, queued_logger):
+                result = run(setup, threads, args.messages, workdir)
+                writer.write(dict(result, benchmark='logging', fsync=DURABLE))
+                print(f"{result['handler']:14} threads={threads:<3} {result['per_call_us']:8.2f} us/call "
+                      f"callers {result['callers_seconds']:.2f}s, drained {result['drained_seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+## bench_read_path.py
+
+"""CPU, wall time and RSS of the local read paths: buffered reads vs mmap/zero-copy.
+
+    python benchmarks/bench_read_path.py --sizes 256MB,2GB,4GB
+
+For each size a scratch file of incompressible data is written once, then
+each pair of implementations runs against it:
+
+* hash: ``f.read()`` loop into md5 vs ``fastio.hash_file`` over mmap slices
+* copy: ``shutil.copy2`` (the old upload staging) vs ``fastio.fast_copy``
+* body: reading the whole file into memory (the old Dropbox upload) vs
+  copying one ``fastio.iter_chunks`` view at a time into a bytes body, as
+  the Dropbox session upload does; both checksum the bytes so the data is
+  actually touched
+
+The file is read once before timing, so all runs see a warm page cache.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import ResultWriter, format_size, measure, parse_size
+from colabdrive import fastio
+
+CHUNK = fastio.CHUNK_SIZE
+
+
+def buffered_md5(path: str, _scratch: str) -> str:
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def mapped_md5(path: str, _scratch: str) -> str:
+    return fastio.file_md5(path)
+
+
+def copy2(path: str, scratch: str) -> str:
+    return shutil.copy2(path, os.path.join(scratch, 'copy'))
+
+
+def fast_copy(path: str, scratch: str) -> str:
+    return fastio.fast_copy(path, os.path.join(scratch, 'copy'))
+
+
+def read_whole(path: str, _scratch: str) -> int:
+    with open(path, 'rb') as f:
+        return zlib.crc32(f.read())
+
+
+def chunked_bodies(path: str, _scratch: str) -> int:
+    checksum = 0
+    for chunk in fastio.iter_chunks(path):
+        checksum = zlib.crc32(bytes(chunk), checksum)
+    return checksum
+
+
+PAIRS = {
+    'hash': (buffered_md5, mapped_md5),
+    'copy': (copy2, fast_copy),
+    'body': (read_whole, chunked_bodies),
+}
+
+
+def make_file(path: str, size: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        for start in range(0, size, len(block)):
+            f.write(block[:min(len(block), size - start)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='256MB,1GB', help='Comma-separated file sizes')
+    parser.add_argument('--cases', default=','.join(PAIRS), help='Comma-separated case names')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation')
+    parser.add_argument('--dir', default=None, help='Scratch directory (default: system temp)')
+    parser.add_argument('--output', default='read_path_benchmarks.jsonl', help='JSON lines output file')
+    args = parser.parse_args()
+
+    writer = ResultWriter(args.output)
+    with tempfile.TemporaryDirectory(prefix='colabdrive-readbench-', dir=args.dir) as scratch:
+        source = os.path.join(scratch, 'source.bin')
+        for size in [parse_size(s) for s in args.sizes.split(',') if s]:
+            make_file(source, size)
+            buffered_md5(source, scratch)
+            for case in [c for c in args.cases.split(',') if c]:
+                for fn in PAIRS[case]:
+                    for run in range(args.repeat):
+                        result = measure(lambda: fn(source, scratch))
+                        result.pop('result')
+                        writer.write(dict(result, benchmark='read_path', case=case,
+                                          implementation=fn.__name__, size=size, run=run))
+                        print(f"{case:5} {fn.__name__:13} {format_size(size):>6} "
+                              f"{result['seconds']:7.3f}s wall {result['cpu_seconds']:7.3f}s cpu "
+                              f"rss+{result['rss_delta_mb']:.1f} MB")
+                    copy = os.path.join(scratch, 'copy')
+                    if os.path.exists(copy):
+                        os.remove(copy)
+            os.remove(source)
+
+
+if __name__ == '__main__':
+    main()
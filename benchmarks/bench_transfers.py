@@ -0,0 +1,219 @@
+## bench_transfers.py
+
+"""Throughput, latency, CPU and memory benchmarks for the transfer paths.
+
+Every remote service is replaced by a local stand-in from ``servers.py``, so
+results reflect the client code rather than network conditions:
+
+    python benchmarks/bench_transfers.py --sizes 1KB,1MB,64MB,1GB --concurrency 1,4,8
+
+Source files are sparse, so even the 10GB case takes no disk space on the
+server side. Cases that write to local disk (``ModelOperations`` and ranged
+downloads) do need room for the downloaded copy. Results are appended as JSON
+lines to ``--output``; compare files from two versions to spot regressions.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import ResultWriter, format_size, measure, parse_size
+from servers import StandInServers, StaticAuth, make_sparse_file, s3_client
+
+CASES = {}
+
+
+def case(name: str, backend: str):
+    """Registers a benchmark case."""
+    def register(fn):
+        CASES[name] = (backend, fn)
+        return fn
+    return register
+
+
+def run_concurrently(concurrency: int, job) -> List[float]:
+    """Runs ``job(index)`` ``concurrency`` times in parallel, re-raising the first failure.
+
+    Returns:
+        List[float]: Wall time of each job in seconds.
+    """
+    def timed(i):
+        start = time.perf_counter()
+        job(i)
+        return time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return [future.result() for future in [executor.submit(timed, i) for i in range(concurrency)]]
+
+
+def model_operations(destination: str):
+    """Creates a ModelOperations that writes into ``destination``."""
+    from colabdrive.model_operations import ModelOperations
+    operations = ModelOperations()
+    operations.default_path = destination
+    return operations
+
+
+@case('model.civitai_download', 'http')
+def bench_civitai_download(ctx, name, size, concurrency):
+    def job(i):
+        destination = os.path.join(ctx['scratch'], f"civitai-{i}")
+        os.makedirs(destination, exist_ok=True)
+        if not model_operations(destination).download_civitai_model(ctx['servers'].url_for(name)):
+            raise RuntimeError('download_civitai_model failed')
+    return lambda: run_concurrently(concurrency, job)
+
+
+@case('model.huggingface_download', 'http')
+def bench_huggingface_download(ctx, name, size, concurrency):
+    os.environ['HF_ENDPOINT'] = ctx['servers'].urls['http']
+
+    def job(i):
+        destination = os.path.join(ctx['scratch'], f"hf-{i}")
+        os.makedirs(destination, exist_ok=True)
+        if not model_operations(destination).download_from_huggingface('bench/repo', name):
+            raise RuntimeError('download_from_huggingface failed')
+    return lambda: run_concurrently(concurrency, job)
+
+
+@case('model.huggingface_stream_to_drive', 'drive')
+def bench_stream_to_drive(ctx, name, size, concurrency):
+    from colabdrive.stream_upload import DriveTarget
+    os.environ['HF_ENDPOINT'] = ctx['servers'].urls['http']
+    target = DriveTarget(StaticAuth(), upload_url=ctx['servers'].urls['drive_upload'])
+
+    def job(i):
+        if not model_operations(ctx['scratch']).download_from_huggingface('bench/repo', name,
+                                                                         stream_to=target):
+            raise RuntimeError('streaming to Drive failed')
+    return lambda: run_concurrently(concurrency, job)
+
+
+@case('model.civitai_stream_to_s3', 's3')
+def bench_stream_to_s3(ctx, name, size, concurrency):
+    from colabdrive.stream_upload import S3Target
+    target = S3Target(ctx['s3_client'], ctx['bucket'], prefix=f"stream-{uuid.uuid4().hex}")
+
+    def job(i):
+        if not model_operations(ctx['scratch']).download_civitai_model(ctx['servers'].url_for(name),
+                                                                      stream_to=target):
+            raise RuntimeError('streaming to S3 failed')
+    return lambda: run_concurrently(concurrency, job)
+
+
+@case('file.drive_ranged_download', 'drive')
+def bench_drive_ranged_download(ctx, name, size, concurrency):
+    # FileOperations.download_file hands files above its threshold to parallel_download;
+    # here the worker count is the concurrency level.
+    from colabdrive.ranged_download import drive_media_url, parallel_download
+    destination = os.path.join(ctx['scratch'], f"ranged-{name}")
+    url = drive_media_url(name, ctx['servers'].urls['drive_files'])
+    chunk_size = max(1024 * 1024, -(-size // concurrency))
+    return lambda: [measure(lambda: parallel_download(url, destination, size, workers=concurrency,
+                                                      chunk_size=chunk_size))['seconds']]
+
+
+@case('cloud.s3_upload', 's3')
+def bench_s3_upload(ctx, name, size, concurrency):
+    storage = cloud_storage(ctx)
+
+    def job(i):
+        if not storage.upload_to_s3(os.path.join(ctx['source'], name), ctx['bucket']):
+            raise RuntimeError('upload_to_s3 failed')
+    return lambda: run_concurrently(concurrency, job)
+
+
+@case('cloud.s3_download', 's3')
+def bench_s3_download(ctx, name, size, concurrency):
+    storage = cloud_storage(ctx)
+    storage.upload_to_s3(os.path.join(ctx['source'], name), ctx['bucket'])
+
+    def job(i):
+        destination = os.path.join(ctx['scratch'], f"s3-{i}-{name}")
+        if not storage.download_from_s3(name, ctx['bucket'], destination):
+            raise RuntimeError('download_from_s3 failed')
+    return lambda: run_concurrently(concurrency, job)
+
+
+def cloud_storage(ctx):
+    """Builds a CloudStorage bound to the local S3 stand-in, skipping Drive/Dropbox auth."""
+    from colabdrive.cloud_storage import CloudStorage
+    storage = CloudStorage.__new__(CloudStorage)
+    storage.s3_client = ctx['s3_client']
+    return storage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='1KB,1MB,64MB',
+                        help='Comma-separated file sizes, e.g. 1KB,1MB,1GB,10GB')
+    parser.add_argument('--concurrency', default='1,4', help='Comma-separated concurrency levels')
+    parser.add_argument('--cases', default=','.join(CASES), help='Comma-separated case names')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case')
+    parser.add_argument('--output', default='transfer_benchmarks.jsonl', help='JSON lines output file')
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s]
+    levels = [int(c) for c in args.concurrency.split(',') if c]
+    selected = [c for c in args.cases.split(',') if c]
+    writer = ResultWriter(args.output)
+
+    workdir = tempfile.mkdtemp(prefix='colabdrive-bench-')
+    source = os.path.join(workdir, 'source')
+    os.makedirs(source)
+    ctx = {'source': source}
+    try:
+        with StandInServers(source) as servers:
+            ctx['servers'] = servers
+            if servers.urls['s3']:
+                ctx['s3_client'] = s3_client(servers.urls['s3'])
+                ctx['bucket'] = 'colabdrive-bench'
+                ctx['s3_client'].create_bucket(Bucket=ctx['bucket'])
+            else:
+                print('moto not installed; S3 cases will be skipped', file=sys.stderr)
+
+            for size in sizes:
+                name = f"bench-{format_size(size)}.bin"
+                make_sparse_file(os.path.join(source, name), size)
+                for case_name in selected:
+                    backend, build = CASES[case_name]
+                    for concurrency in levels:
+                        for run in range(args.repeat):
+                            record = {'case': case_name, 'backend': backend, 'size': size,
+                                      'concurrency': concurrency, 'run': run}
+                            if backend == 's3' and 's3_client' not in ctx:
+                                writer.write(dict(record, status='skipped', reason='moto not installed'))
+                                continue
+                            ctx['scratch'] = tempfile.mkdtemp(dir=workdir)
+                            try:
+                                record.update(measure(build(ctx, name, size, concurrency)))
+                                latencies = record.pop('result') or [record['seconds']]
+                                total = size * len(latencies)
+                                record['throughput_mbps'] = total / 2 ** 20 / record['seconds']
+                                record['latency_ms'] = 1000 * sum(latencies) / len(latencies)
+                                record['status'] = 'ok'
+                            except ImportError as e:
+                                record.update(status='skipped', reason=str(e))
+                            except Exception as e:
+                                record.update(status='error', error=f"{type(e).__name__}: {e}")
+                            finally:
+                                shutil.rmtree(ctx['scratch'], ignore_errors=True)
+                            writer.write(record)
+                            print(f"{case_name:36} {format_size(size):>6} x{concurrency:<3} "
+                                  f"{record['status']:8} {record.get('throughput_mbps', 0):10.1f} MB/s "
+                                  f"rss+{record.get('rss_delta_mb', 0):.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
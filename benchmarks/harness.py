@@ -0,0 +1,124 @@
+## harness.py
+
+"""Measurement and result-recording helpers shared by the benchmark scripts."""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict
+
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parses sizes such as ``1KB`` or ``10GB`` into bytes."""
+    text = text.strip().upper()
+    for unit in ('KB', 'MB', 'GB', 'B'):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    """Formats a byte count using the same units ``parse_size`` accepts."""
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def current_rss() -> int:
+    """Returns the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # ru_maxrss is the lifetime peak (KiB on Linux, bytes on macOS); best effort.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+class RSSSampler:
+    """Samples RSS on a background thread to find the peak during a block."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(fn: Callable[[], Any]) -> Dict[str, Any]:
+    """Runs ``fn`` once and reports wall time, CPU time and memory.
+
+    Returns:
+        Dict[str, Any]: ``seconds``, ``cpu_seconds``, ``peak_rss_mb``, ``rss_delta_mb``
+        (peak above the RSS at the start of the run) and ``result`` (the return value).
+    """
+    with RSSSampler() as sampler:
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        cpu_seconds = time.process_time() - cpu_start
+    return {
+        'seconds': seconds,
+        'cpu_seconds': cpu_seconds,
+        'peak_rss_mb': sampler.peak / 2 ** 20,
+        'rss_delta_mb': (sampler.peak - sampler.baseline) / 2 ** 20,
+        'result': result,
+    }
+
+
+def environment() -> Dict[str, str]:
+    """Describes the code version and host so results from different runs can be compared."""
+    try:
+        from importlib.metadata import version
+        package_version = version('colabdrive')
+    except Exception:
+        package_version = 'unknown'
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except Exception:
+        commit = ''
+    return {
+        'version': package_version,
+        'commit': commit or 'unknown',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+
+class ResultWriter:
+    """Appends one JSON object per benchmark case to a JSON lines file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.env = environment()
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = dict(record, run_started=self.started, **self.env)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(line, sort_keys=True) + '\n')
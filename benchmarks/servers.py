@@ -0,0 +1,341 @@
+## servers.py
+
+"""Local stand-ins for the remote services used by the transfer benchmarks."""
+
+import json
+import os
+import re
+import sys
+import logging
+import multiprocessing
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+COPY_BUFFER = 1024 * 1024
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single ``Range`` header into an inclusive (start, end) pair."""
+    if not header:
+        return None
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    if not match.group(1):
+        start = max(0, size - int(match.group(2)))
+        return start, size - 1
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else size - 1
+    return start, min(end, size - 1)
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that keeps access logs out of benchmark output."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def send_file(self, path: str) -> None:
+        """Serves a file, honoring a single ``Range`` header."""
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        byte_range = _parse_range(self.headers.get('Range'), size)
+        start, end = byte_range if byte_range else (0, size - 1)
+        if byte_range and start >= size:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{size}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        if byte_range:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+
+        remaining = end - start + 1
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while remaining > 0:
+                block = f.read(min(COPY_BUFFER, remaining))
+                if not block:
+                    break
+                self.wfile.write(block)
+                remaining -= len(block)
+
+    def send_json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None) -> None:
+        """Sends a JSON response."""
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def drain_body(self) -> int:
+        """Reads and discards the request body, returning its length."""
+        remaining = int(self.headers.get('Content-Length') or 0)
+        total = remaining
+        while remaining > 0:
+            block = self.rfile.read(min(COPY_BUFFER, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+        return total
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients closing connections early (e.g. after a failed range) are expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _BackgroundServer:
+    """Runs a ThreadingHTTPServer on an ephemeral localhost port."""
+
+    handler_class = _QuietHandler
+
+    def __init__(self) -> None:
+        handler = type('Handler', (self.handler_class,), {'server_state': self})
+        self.httpd = _HTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _RangeHandler(_QuietHandler):
+    def do_GET(self) -> None:
+        self.send_file(self.server_state.path_for(urlparse(self.path).path))
+
+    do_HEAD = do_GET
+
+
+class RangeFileServer(_BackgroundServer):
+    """Serves files from a directory with HTTP range support.
+
+    Stands in for HuggingFace ``/<repo>/resolve/<rev>/<file>`` URLs (only the
+    final path segment is used to find the file) and for CivitAI downloads.
+    """
+
+    handler_class = _RangeHandler
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        super().__init__()
+
+    def path_for(self, url_path: str) -> str:
+        return os.path.join(self.root, os.path.basename(url_path))
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/files/{name}"
+
+
+class _FakeDriveHandler(_QuietHandler):
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        match = re.fullmatch(r'/drive/v2/files/([^/]+)', parsed.path)
+        if not match:
+            self.send_error(404)
+            return
+        file_id = match.group(1)
+        path = os.path.join(self.server_state.root, file_id)
+        if 'alt=media' in parsed.query:
+            self.send_file(path)
+        elif os.path.isfile(path):
+            self.send_json(200, {
+                'id': file_id,
+                'title': file_id,
+                'fileSize': str(os.path.getsize(path)),
+                'downloadUrl': f"{self.server_state.base_url}/drive/v2/files/{file_id}?alt=media"
+            })
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:
+        if not urlparse(self.path).path.startswith('/upload/drive/v2/files'):
+            self.send_error(404)
+            return
+        self.drain_body()
+        session = self.server_state.new_session()
+        self.send_response(200)
+        self.send_header('Location', f"{self.server_state.base_url}/upload/session/{session}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_PUT(self) -> None:
+        session = urlparse(self.path).path.rsplit('/', 1)[-1]
+        received = self.drain_body()
+        content_range = self.headers.get('Content-Range', '')
+        match = re.fullmatch(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', content_range)
+        if not match:
+            self.send_error(400)
+            return
+        total = match.group(3)
+        end = int(match.group(2)) if match.group(2) else -1
+        self.server_state.bytes_received += received
+        if total != '*' and end + 1 == int(total):
+            self.send_json(200, {'id': f"uploaded-{session}"})
+            return
+        self.send_response(308)
+        if end >= 0:
+            self.send_header('Range', f"bytes=0-{end}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_DELETE(self) -> None:
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class FakeDriveServer(_BackgroundServer):
+    """Minimal Drive v2 API: file metadata, media downloads and resumable uploads.
+
+    Files placed in ``root`` are addressable by their file name as the ID.
+    Uploaded bytes are counted and discarded.
+    """
+
+    handler_class = _FakeDriveHandler
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.bytes_received = 0
+        self._sessions = itertools.count(1)
+        super().__init__()
+
+    def new_session(self) -> int:
+        return next(self._sessions)
+
+    @property
+    def upload_url(self) -> str:
+        return f"{self.base_url}/upload/drive/v2/files"
+
+    @property
+    def files_url(self) -> str:
+        return f"{self.base_url}/drive/v2/files"
+
+
+class StaticAuth:
+    """Stands in for a pydrive2 GoogleAuth whose token never expires."""
+
+    class _Credentials:
+        access_token = 'benchmark-token'
+
+    access_token_expired = False
+    credentials = _Credentials()
+
+
+class S3Server:
+    """Runs moto's S3 server in-process, if moto is installed."""
+
+    def __init__(self) -> None:
+        from moto.server import ThreadedMotoServer
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+
+    def __enter__(self):
+        self.server.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.stop()
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server.get_host_and_port()
+        return f"http://{host}:{port}"
+
+
+def s3_client(endpoint_url: str):
+    """Creates a boto3 S3 client for the local S3 stand-in."""
+    import boto3
+    return boto3.client('s3', endpoint_url=endpoint_url, region_name='us-east-1',
+                        aws_access_key_id='benchmark', aws_secret_access_key='benchmark')
+
+
+def _serve(root: str, connection) -> None:
+    """Child process body: runs every stand-in and reports their URLs."""
+    with RangeFileServer(root) as http_server, FakeDriveServer(root) as drive_server:
+        urls = {
+            'http': http_server.base_url,
+            'drive_upload': drive_server.upload_url,
+            'drive_files': drive_server.files_url,
+            's3': None,
+        }
+        s3_server = None
+        try:
+            s3_server = S3Server().__enter__()
+            urls['s3'] = s3_server.endpoint_url
+        except ImportError:
+            pass
+        connection.send(urls)
+        connection.recv()
+        if s3_server:
+            s3_server.__exit__(None, None, None)
+
+
+class StandInServers:
+    """Runs all stand-in servers in a child process.
+
+    Keeping the servers out of the benchmarking process means the CPU time and
+    RSS measured there belong to the client code alone (moto in particular
+    keeps uploaded objects in memory).
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.urls: Dict[str, Optional[str]] = {}
+        self._connection, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(root, child), daemon=True)
+
+    def __enter__(self):
+        self._process.start()
+        self.urls = self._connection.recv()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._connection.send('stop')
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def url_for(self, name: str) -> str:
+        """HTTP URL of a file in ``root`` on the range server."""
+        return f"{self.urls['http']}/files/{name}"
+
+
+def make_sparse_file(path: str, size: int) -> str:
+    """Creates a sparse file of ``size`` bytes so large cases cost no disk space."""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    return path
+
@@ -1,44 +1,20 @@
-import os
-from typing import Optional
-from pydrive.auth import GoogleAuth
 from colabdrive.logger import logger
-
-from colabdrive.config import config
+from colabdrive.credentials import credential_manager
 
 def verify_credentials() -> bool:
     """Verify if credentials file exists and is valid.
     
+    Credentials are loaded once by the shared credential manager; later calls
+    reuse them instead of re-reading the file or refreshing synchronously.
+
     Returns:
         bool: True if credentials are valid, False otherwise
     """
-    oauth_redirect_uri = config.get("oauth_redirect_uri")
     try:
-        creds_dir = os.path.join(os.path.expanduser('~'), '.colabdrive')
-        creds_file = os.path.join(creds_dir, 'mycreds.txt')
-        
-        # Check if credentials file exists
-        if not os.path.exists(creds_file):
-            logger.warning("No credentials file found")
-            return False
-            
-        # Try to load credentials
-        gauth = GoogleAuth()
-        gauth.LoadCredentialsFile(creds_file)
-        
-        # Check if credentials are valid
-        if gauth.credentials is None:
-            logger.warning("Invalid credentials")
+        gauth = credential_manager.get_auth(interactive=False)
+        if gauth is None or gauth.credentials is None:
+            logger.warning("No valid credentials found")
             return False
-            
-        # Check if token is expired
-        if gauth.access_token_expired:
-            try:
-                gauth.Refresh()
-                gauth.SaveCredentialsFile(creds_file)
-            except Exception as e:
-                logger.error(f"Failed to refresh token: {e}")
-                return False
-                
         return True
         
     except Exception as e:
@@ -48,9 +24,6 @@ def verify_credentials() -> bool:
 def clear_credentials() -> None:
     """Remove existing credentials file."""
     try:
-        creds_file = os.path.join(os.path.expanduser('~'), '.colabdrive', 'mycreds.txt')
-        if os.path.exists(creds_file):
-            os.remove(creds_file)
-            logger.info("Credentials cleared successfully")
+        credential_manager.clear()
     except Exception as e:
         logger.error(f"Error clearing credentials: {e}")
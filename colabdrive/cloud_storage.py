@@ -5,11 +5,14 @@ import boto3
 import dropbox
 from colabdrive.config import config
 from googleapiclient.http import MediaFileUpload
-from pydrive.auth import GoogleAuth
-from pydrive.drive import GoogleDrive
+from pydrive2.drive import GoogleDrive
+from colabdrive.credentials import credential_manager
 
 # Import the logger instance from logger.py
-from logger import logger
+from colabdrive.logger import logger
+from colabdrive import compression, disk_space, fastio, metrics, profiling, throttle
+from colabdrive.dedup import FolderIndex, check_existing, clear_compression_marker, if_exists_mode, md5_property
+from colabdrive.stream_upload import DriveResumableUpload
 
 
 class CloudStorage:
@@ -23,51 +26,20 @@ class CloudStorage:
         if not self.project_id:
             raise ValueError("Project ID not configured")
         self.drive = self._authenticate_drive()
+        self.folder_index = FolderIndex(self.drive) if self.drive else None
         self.s3_client = self._initialize_s3()
         self.dropbox_client = self._initialize_dropbox()
 
     def _authenticate_drive(self) -> Optional[GoogleDrive]:
-        """Authenticates and creates a Google Drive instance.
+        """Returns the shared Google Drive client from the credential manager.
 
         Returns:
             Optional[GoogleDrive]: Authenticated Google Drive instance or None if authentication fails.
         """
         try:
-            gauth = GoogleAuth()
-            
-            # Set up authentication settings
-            gauth.settings['get_refresh_token'] = True
-            gauth.settings['oauth_scope'] = ['https://www.googleapis.com/auth/drive']
-            gauth.settings['client_config_file'] = 'client_secrets.json'
-            
-            # Create credentials directory in user's home
-            creds_dir = os.path.join(os.path.expanduser('~'), '.colabdrive')
-            creds_file = os.path.join(creds_dir, 'mycreds.txt')
-            os.makedirs(creds_dir, exist_ok=True)
-            
-            # Try to load existing credentials
-            gauth.LoadCredentialsFile(creds_file)
-            
-            if gauth.credentials is None:
-                # No credentials found, start new authentication
-                gauth.GetFlow()
-                gauth.flow.params.update({
-                    'access_type': 'offline',
-                    'approval_prompt': 'force'
-                })
-                gauth.LocalWebserverAuth(port_numbers=[8080])
-            elif gauth.access_token_expired:
-                # Refresh expired token
-                gauth.Refresh()
-            else:
-                # Reauthorize with existing credentials
-                gauth.Authorize()
-            
-            # Save the current credentials
-            gauth.SaveCredentialsFile(creds_file)
-            
+            drive = credential_manager.get_drive()
             logger.info("Google Drive authentication successful.")
-            return GoogleDrive(gauth)
+            return drive
         except Exception as e:
             logger.error(f"Google Drive authentication failed: {e}")
             return None
@@ -79,7 +51,7 @@ class CloudStorage:
             boto3.client: S3 client instance.
         """
         try:
-            s3_client = boto3.client('s3')
+            s3_client = credential_manager.get_client('s3', lambda: boto3.client('s3'))
             logger.info("S3 client initialized successfully.")
             return s3_client
         except Exception as e:
@@ -93,34 +65,92 @@ class CloudStorage:
             dropbox.Dropbox: Dropbox client instance.
         """
         try:
-            dbx = dropbox.Dropbox('YOUR_ACCESS_TOKEN')  # Replace with your access token
+            dbx = credential_manager.get_client(
+                'dropbox', lambda: dropbox.Dropbox('YOUR_ACCESS_TOKEN')  # Replace with your access token
+            )
             logger.info("Dropbox client initialized successfully.")
             return dbx
         except Exception as e:
             logger.error(f"Failed to initialize Dropbox client: {e}")
             raise
 
-    def upload_to_drive(self, file: str) -> bool:
+    @metrics.instrumented('upload_to_drive', 'drive')
+    @profiling.profiled('upload_to_drive')
+    @disk_space.holds('file')
+    def upload_to_drive(self, file: str, compress: Optional[str] = None,
+                        if_exists: Optional[str] = None) -> bool:
         """Uploads a file to Google Drive.
 
         Args:
             file (str): The path to the file to upload.
+            compress (str, optional): Compression setting ("auto", "zstd", "gzip", "off");
+                defaults to the ``compression`` config value.
+            if_exists (str, optional): "skip", "update" or "duplicate" when My Drive already
+                holds the file; see ``FileOperations.upload_file``. Defaults to the
+                ``upload_if_exists`` config value.
 
         Returns:
-            bool: True if upload is successful, False otherwise.
+            bool: True if upload is successful or the file is already there, False otherwise.
         """
         try:
-            file_metadata = {'title': file.split('/')[-1]}
+            name = file.split('/')[-1]
+            codec = compression.choose_codec(file, compress)
+            duplicate, existing, md5 = check_existing(self.folder_index, 'root', file, name,
+                                                      if_exists_mode(if_exists), compressed=bool(codec))
+            if duplicate is not None:
+                return True
+            existing_id = existing['id'] if existing else None
+            if codec:
+                file_id = self._upload_compressed_to_drive(file, codec, md5, existing_id)
+                self.folder_index.remember('root', file_id, name, md5, None)
+                return True
+            file_metadata = {'id': existing_id, 'title': name} if existing_id else {'title': name}
             media = MediaFileUpload(file, resumable=True)
             uploaded_file = self.drive.CreateFile(file_metadata)
             uploaded_file.SetContentMedia(media)
-            uploaded_file.Upload()
-            logger.info(f"File uploaded to Google Drive successfully: {file}")
+            throttle.retry_call('drive', uploaded_file.Upload)
+            if existing and existing.get('compressed'):
+                clear_compression_marker(self.drive.auth.service, existing_id)
+            self.folder_index.remember('root', uploaded_file['id'], name,
+                                       md5 or uploaded_file.get('md5Checksum'), os.path.getsize(file))
+            logger.info(f"File uploaded to Google Drive successfully: {file} ({uploaded_file['id']})")
+            metrics.add_bytes(os.path.getsize(file))
             return True
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Failed to upload file to Google Drive {file}: {e}")
             return False
 
+    def _upload_compressed_to_drive(self, file: str, codec: str, md5: Optional[str] = None,
+                                    file_id: Optional[str] = None) -> str:
+        """Streams a file through the compressor into a Drive upload marked with the codec.
+
+        Returns:
+            str: ID of the created or updated Drive file.
+        """
+        name = file.split('/')[-1]
+        properties = compression.drive_properties(codec, os.path.getsize(file)) + \
+            ([md5_property(md5)] if md5 else [])
+        upload = DriveResumableUpload(self.drive.auth, name, properties=properties, file_id=file_id)
+        try:
+            with open(file, 'rb') as f:
+                reader = compression.CompressingReader(f, codec)
+                while True:
+                    chunk = reader.read(compression.READ_SIZE)
+                    if not chunk:
+                        break
+                    upload.write(chunk)
+            file_id = upload.close()
+        except BaseException:
+            upload.abort()
+            raise
+        reader.record(name)
+        logger.info(f"File uploaded to Google Drive successfully: {file} ({file_id})")
+        metrics.add_bytes(reader.bytes_out)
+        return file_id
+
+    @metrics.instrumented('download_from_drive', 'drive')
+    @profiling.profiled('download_from_drive')
     def download_from_drive(self, file_id: str, destination: str) -> bool:
         """Downloads a file from Google Drive.
 
@@ -133,31 +163,70 @@ class CloudStorage:
         """
         try:
             downloaded_file = self.drive.CreateFile({'id': file_id})
-            downloaded_file.GetContentFile(destination)
+            throttle.retry_call('drive', downloaded_file.FetchMetadata)
+            size = int(downloaded_file.get('fileSize') or 0)
+            codec = compression.drive_encoding(downloaded_file)
+            # Compressed files also need room for the decompressed copy while both exist.
+            needed = size + (compression.expected_size(
+                size, compression.drive_original_size(downloaded_file)) if codec else 0)
+            with disk_space.ledger.reserve(destination, needed):
+                throttle.retry_call('drive', lambda: downloaded_file.GetContentFile(destination))
+                if codec:
+                    compression.decompress_file(destination, destination, codec)
             logger.info(f"File downloaded from Google Drive successfully: {destination}")
+            metrics.add_bytes(os.path.getsize(destination))
             return True
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Failed to download file from Google Drive {file_id}: {e}")
             return False
 
-    def upload_to_s3(self, file: str, bucket_name: str) -> bool:
+    @metrics.instrumented('upload_to_s3', 's3')
+    @profiling.profiled('upload_to_s3')
+    @disk_space.holds('file')
+    def upload_to_s3(self, file: str, bucket_name: str, compress: Optional[str] = None,
+                     key: Optional[str] = None) -> bool:
         """Uploads a file to S3.
 
         Args:
             file (str): The path to the file to upload.
             bucket_name (str): The name of the S3 bucket.
+            compress (str, optional): Compression setting ("auto", "zstd", "gzip", "off");
+                defaults to the ``compression`` config value.
+            key (str, optional): Object key; defaults to the file's name.
 
         Returns:
             bool: True if upload is successful, False otherwise.
         """
         try:
-            self.s3_client.upload_file(file, bucket_name, file.split('/')[-1])
+            key = key or file.split('/')[-1]
+            codec = compression.choose_codec(file, compress)
+            if codec:
+                def upload():
+                    with open(file, 'rb') as f:
+                        reader = compression.CompressingReader(f, codec)
+                        self.s3_client.upload_fileobj(
+                            reader, bucket_name, key,
+                            ExtraArgs={'Metadata': {compression.ENCODING_KEY: codec,
+                                                    compression.SIZE_KEY: str(os.path.getsize(file))}})
+                    return reader
+                reader = throttle.retry_call('s3', upload)
+                reader.record(key)
+                sent = reader.bytes_out
+            else:
+                throttle.retry_call(
+                    's3', lambda: self.s3_client.upload_file(file, bucket_name, key))
+                sent = os.path.getsize(file)
             logger.info(f"File uploaded to S3 successfully: {file}")
+            metrics.add_bytes(sent)
             return True
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Failed to upload file to S3 {file}: {e}")
             return False
 
+    @metrics.instrumented('download_from_s3', 's3')
+    @profiling.profiled('download_from_s3')
     def download_from_s3(self, file_name: str, bucket_name: str, destination: str) -> bool:
         """Downloads a file from S3.
 
@@ -170,31 +239,82 @@ class CloudStorage:
             bool: True if download is successful, False otherwise.
         """
         try:
-            self.s3_client.download_file(bucket_name, file_name, destination)
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=file_name)
+            metadata = head.get('Metadata', {})
+            size = head.get('ContentLength') or 0
+            codec = metadata.get(compression.ENCODING_KEY)
+            original_size = metadata.get(compression.SIZE_KEY)
+            needed = size + (compression.expected_size(
+                size, int(original_size) if original_size else None) if codec else 0)
+            with disk_space.ledger.reserve(destination, needed):
+                throttle.retry_call(
+                    's3', lambda: self.s3_client.download_file(bucket_name, file_name, destination))
+                if codec:
+                    compression.decompress_file(destination, destination, codec)
             logger.info(f"File downloaded from S3 successfully: {destination}")
+            metrics.add_bytes(os.path.getsize(destination))
             return True
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Failed to download file from S3 {file_name}: {e}")
             return False
 
-    def upload_to_dropbox(self, file: str) -> bool:
+    @metrics.instrumented('upload_to_dropbox', 'dropbox')
+    @profiling.profiled('upload_to_dropbox')
+    @disk_space.holds('file')
+    def upload_to_dropbox(self, file: str, path: Optional[str] = None) -> bool:
         """Uploads a file to Dropbox.
 
         Args:
             file (str): The path to the file to upload.
+            path (str, optional): Dropbox path; defaults to the file's name in the root folder.
 
         Returns:
             bool: True if upload is successful, False otherwise.
         """
         try:
-            with open(file, 'rb') as f:
-                self.dropbox_client.files_upload(f.read(), '/' + file.split('/')[-1])
+            path = path or '/' + file.split('/')[-1]
+            size = os.path.getsize(file)
+            if size <= fastio.CHUNK_SIZE:
+                with open(file, 'rb') as f:
+                    data = f.read()
+                throttle.retry_call('dropbox', lambda: self.dropbox_client.files_upload(data, path))
+            else:
+                self._upload_dropbox_session(file, path, size)
             logger.info(f"File uploaded to Dropbox successfully: {file}")
+            metrics.add_bytes(os.path.getsize(file))
             return True
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Failed to upload file to Dropbox {file}: {e}")
             return False
 
+    def _upload_dropbox_session(self, file: str, path: str, size: int) -> None:
+        """Uploads a large file to Dropbox chunk by chunk through an upload session.
+
+        The SDK only accepts bytes bodies, so each mapped chunk is copied once
+        and memory stays around one chunk however large the file is.
+        """
+        session_id = None
+        offset = 0
+        for chunk in fastio.iter_chunks(file):
+            data = bytes(chunk)
+            if session_id is None:
+                session_id = throttle.retry_call(
+                    'dropbox', lambda: self.dropbox_client.files_upload_session_start(data)).session_id
+            else:
+                cursor = dropbox.files.UploadSessionCursor(session_id=session_id, offset=offset)
+                if offset + len(data) < size:
+                    throttle.retry_call(
+                        'dropbox', lambda: self.dropbox_client.files_upload_session_append_v2(data, cursor))
+                else:
+                    commit = dropbox.files.CommitInfo(path=path)
+                    throttle.retry_call(
+                        'dropbox', lambda: self.dropbox_client.files_upload_session_finish(data, cursor, commit))
+            offset += len(data)
+
+    @metrics.instrumented('download_from_dropbox', 'dropbox')
+    @profiling.profiled('download_from_dropbox')
     def download_from_dropbox(self, file_name: str, destination: str) -> bool:
         """Downloads a file from Dropbox.
 
@@ -206,11 +326,14 @@ class CloudStorage:
             bool: True if download is successful, False otherwise.
         """
         try:
+            metadata, res = throttle.retry_call(
+                'dropbox', lambda: self.dropbox_client.files_download(path='/' + file_name))
             with open(destination, 'wb') as f:
-                metadata, res = self.dropbox_client.files_download(path='/' + file_name)
                 f.write(res.content)
             logger.info(f"File downloaded from Dropbox successfully: {destination}")
+            metrics.add_bytes(os.path.getsize(destination))
             return True
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Failed to download file from Dropbox {file_name}: {e}")
             return False
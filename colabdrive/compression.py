@@ -0,0 +1,199 @@
+## compression.py
+
+import gzip
+import os
+import shutil
+import time
+import zlib
+from typing import IO, Optional
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive import metrics
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install colabdrive[compression]
+    zstandard = None
+
+# Key of the marker stored in S3 object metadata and Drive file properties.
+ENCODING_KEY = 'colabdrive-encoding'
+# Uncompressed size, stored next to the marker so downloads can reserve disk for it.
+SIZE_KEY = 'colabdrive-size'
+# Assumed for files compressed before their size was recorded.
+UNKNOWN_SIZE_RATIO = 4
+
+COMPRESSIBLE_EXTENSIONS = {
+    'csv', 'tsv', 'json', 'jsonl', 'txt', 'md', 'log', 'xml', 'html', 'yaml', 'yml',
+    'py', 'ipynb', 'sql', 'svg',
+}
+INCOMPRESSIBLE_EXTENSIONS = {
+    'safetensors', 'ckpt', 'pt', 'pth', 'bin', 'gguf', 'onnx',
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'mp4', 'mkv', 'mp3',
+    'gz', 'tgz', 'zip', 'zst', 'bz2', 'xz', '7z', 'rar', 'parquet',
+}
+SAMPLE_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+
+metrics.registry.help.update({
+    'colabdrive_compression_input_bytes_total': 'Bytes fed to transfer compression.',
+    'colabdrive_compression_output_bytes_total': 'Bytes produced by transfer compression.',
+    'colabdrive_compression_cpu_seconds_total': 'CPU time spent compressing and decompressing.',
+})
+
+
+def default_codec() -> str:
+    """zstd when the zstandard package is installed, gzip otherwise."""
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def choose_codec(path: str, compress: Optional[str] = None) -> Optional[str]:
+    """Decides whether and how to compress a file before upload.
+
+    Args:
+        path (str): Local file about to be uploaded.
+        compress (str, optional): "zstd", "gzip", "auto", or "off"; defaults to the
+            ``compression`` config setting, which is off unless set.
+
+    Returns:
+        Optional[str]: Codec to use, or None to upload the file as is.
+    """
+    setting = (compress or config.get('compression') or 'off').lower()
+    if setting in ('off', 'none', 'false', '0'):
+        return None
+    codec = default_codec() if setting == 'auto' else setting
+    if codec == 'zstd' and zstandard is None:
+        logger.warning("zstandard is not installed; compressing with gzip instead")
+        codec = 'gzip'
+    if codec not in ('zstd', 'gzip'):
+        raise ValueError(f"Unknown compression codec: {codec}")
+
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in INCOMPRESSIBLE_EXTENSIONS:
+        return None
+    if extension in COMPRESSIBLE_EXTENSIONS:
+        return codec
+    # Unknown type: compress only if a fast pass over the head of the file pays off.
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+    if not sample or len(zlib.compress(sample, 1)) > 0.9 * len(sample):
+        return None
+    return codec
+
+
+class CompressingReader:
+    """Read-only file object that yields the compressed form of another stream.
+
+    Compression happens as the consumer reads, so an upload never needs the
+    whole compressed file in memory or on disk.
+    """
+
+    def __init__(self, source: IO[bytes], codec: str, level: Optional[int] = None) -> None:
+        self.source = source
+        self.codec = codec
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self._pending = bytearray()
+        self._done = False
+        level = level if level is not None else config.get('compression_level')
+        if codec == 'zstd':
+            level = level if level is not None else 3
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            level = level if level is not None else 6
+            # wbits=31 selects the gzip container.
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._done and (size < 0 or len(self._pending) < size):
+            chunk = self.source.read(READ_SIZE)
+            start = time.thread_time()
+            if chunk:
+                self.bytes_in += len(chunk)
+                self._pending += self._compressor.compress(chunk)
+            else:
+                self._pending += self._compressor.flush()
+                self._done = True
+            self.cpu_seconds += time.thread_time() - start
+        if size < 0:
+            size = len(self._pending)
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        self.bytes_out += len(data)
+        return data
+
+    def record(self, name: str) -> None:
+        """Logs and exports the bytes saved and CPU spent on this stream."""
+        labels = {'codec': self.codec, 'direction': 'compress'}
+        metrics.registry.inc('colabdrive_compression_input_bytes_total', self.bytes_in, **labels)
+        metrics.registry.inc('colabdrive_compression_output_bytes_total', self.bytes_out, **labels)
+        metrics.registry.inc('colabdrive_compression_cpu_seconds_total', self.cpu_seconds, **labels)
+        ratio = self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+        logger.info(f"Compressed {name} with {self.codec}: {self.bytes_in} -> {self.bytes_out} bytes "
+                    f"({ratio:.1%}), saved {self.bytes_in - self.bytes_out} bytes "
+                    f"for {self.cpu_seconds:.2f}s CPU")
+
+
+def decompress_file(source: str, destination: str, codec: str) -> str:
+    """Decompresses ``source`` into ``destination`` via a temporary file.
+
+    ``source`` and ``destination`` may be the same path.
+    """
+    temp_path = destination + '.decompress'
+    start = time.thread_time()
+    try:
+        with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+            if codec == 'zstd':
+                if zstandard is None:
+                    raise RuntimeError("zstandard is required to decompress this file")
+                zstandard.ZstdDecompressor().copy_stream(src, dst, read_size=READ_SIZE)
+            elif codec == 'gzip':
+                with gzip.GzipFile(fileobj=src) as gz:
+                    shutil.copyfileobj(gz, dst, READ_SIZE)
+            else:
+                raise ValueError(f"Unknown compression codec: {codec}")
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    compressed_size = os.path.getsize(source)
+    os.replace(temp_path, destination)
+    labels = {'codec': codec, 'direction': 'decompress'}
+    metrics.registry.inc('colabdrive_compression_input_bytes_total', compressed_size, **labels)
+    metrics.registry.inc('colabdrive_compression_output_bytes_total', os.path.getsize(destination), **labels)
+    metrics.registry.inc('colabdrive_compression_cpu_seconds_total', time.thread_time() - start, **labels)
+    return destination
+
+
+def drive_encoding(file_metadata) -> Optional[str]:
+    """Reads the compression marker from Drive file metadata, if present."""
+    for prop in file_metadata.get('properties') or []:
+        if prop.get('key') == ENCODING_KEY:
+            return prop.get('value')
+    return None
+
+
+def drive_properties(codec: str, size: Optional[int] = None) -> list:
+    """Drive v2 file properties that mark an upload as compressed with ``codec``."""
+    properties = [{'key': ENCODING_KEY, 'value': codec, 'visibility': 'PRIVATE'}]
+    if size is not None:
+        properties.append({'key': SIZE_KEY, 'value': str(size), 'visibility': 'PRIVATE'})
+    return properties
+
+
+def drive_original_size(file_metadata) -> Optional[int]:
+    """Reads the uncompressed size recorded with a compressed Drive file, if present."""
+    for prop in file_metadata.get('properties') or []:
+        if prop.get('key') == SIZE_KEY:
+            return int(prop.get('value'))
+    return None
+
+
+def expected_size(compressed_size: int, original_size: Optional[int]) -> int:
+    """Disk needed for the decompressed copy of a file of ``compressed_size`` bytes."""
+    if original_size is not None:
+        return original_size
+    return compressed_size * UNKNOWN_SIZE_RATIO
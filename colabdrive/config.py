@@ -30,7 +30,31 @@ class Config:
                 "privacy_policy_url": "http://127.0.0.1:8080/privacy_policy.html",
                 "project_id": "colabdrive-test-20241202",
                 "region": "us-east5",
-                "zone": "us-east5-a"
+                "zone": "us-east5-a",
+                "metrics_port": 9464,
+                "metrics_events_file": os.path.join(os.path.expanduser('~'), '.colabdrive', 'metrics.jsonl'),
+                "metrics_sample_rate": 1.0,
+                "log_file": "app.log",
+                "log_max_bytes": 10 * 1024 * 1024,
+                "log_backup_count": 5,
+                "log_rotate_seconds": 24 * 60 * 60,
+                "profiling": None,
+                "profile_dir": os.path.join(os.path.expanduser('~'), '.colabdrive', 'profiles'),
+                "compression": None,
+                "compression_level": None,
+                "model_catalog_db": os.path.join(os.path.expanduser('~'), '.colabdrive', 'models.sqlite3'),
+                "disk_headroom": 1024 * 1024 * 1024,
+                "disk_eviction": False,
+                "disk_eviction_grace": 10 * 60,
+                "watch_settle_seconds": 5.0,
+                "search_index_db": os.path.join(os.path.expanduser('~'), '.colabdrive', 'search.sqlite3'),
+                "thumbnail_dir": os.path.join(os.path.expanduser('~'), '.colabdrive', 'thumbnails'),
+                "thumbnail_cache_bytes": 256 * 1024 * 1024,
+                "upload_if_exists": "skip",
+                "job_store_db": os.path.join(os.path.expanduser('~'), '.colabdrive', 'jobs.sqlite3'),
+                # Worker processes for UI transfers and conversions; 0 runs them in the server.
+                "job_workers": 0,
+                "ui_concurrency": 8
             },
             "colab": {
                 "model_path": "/content/drive/My Drive/models",
@@ -39,7 +63,32 @@ class Config:
                 "server_port": 7680,
                 "GRADIO_SERVER_PORT": 7681,
                 "oauth_redirect_uri": "http://127.0.0.1:8080/",
-                "allowed_paths": ["/content", "/content/drive"]
+                "allowed_paths": ["/content", "/content/drive"],
+                "metrics_port": 9464,
+                "metrics_events_file": "/content/colabdrive_metrics.jsonl",
+                "metrics_sample_rate": 1.0,
+                "log_file": "app.log",
+                "log_max_bytes": 10 * 1024 * 1024,
+                "log_backup_count": 5,
+                "log_rotate_seconds": 24 * 60 * 60,
+                "profiling": None,
+                "profile_dir": "/content/colabdrive_profiles",
+                "compression": None,
+                "compression_level": None,
+                # Kept off the Drive mount: SQLite locking does not work over FUSE.
+                "model_catalog_db": "/content/colabdrive_models.sqlite3",
+                # Colab's VM disk degrades badly when nearly full.
+                "disk_headroom": 2 * 1024 * 1024 * 1024,
+                "disk_eviction": False,
+                "disk_eviction_grace": 10 * 60,
+                "watch_settle_seconds": 5.0,
+                "search_index_db": "/content/colabdrive_search.sqlite3",
+                "thumbnail_dir": "/content/colabdrive_thumbnails",
+                "thumbnail_cache_bytes": 256 * 1024 * 1024,
+                "upload_if_exists": "skip",
+                "job_store_db": "/content/colabdrive_jobs.sqlite3",
+                "job_workers": 0,
+                "ui_concurrency": 8
             }
         }
         return base_config[self.env]
@@ -0,0 +1,164 @@
+## credentials.py
+
+import datetime
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+from pydrive2.auth import GoogleAuth
+from pydrive2.drive import GoogleDrive
+from colabdrive.logger import logger
+
+CREDS_DIR = os.path.join(os.path.expanduser('~'), '.colabdrive')
+CREDS_FILE = os.path.join(CREDS_DIR, 'mycreds.txt')
+
+
+class CredentialManager:
+    """Process-wide owner of Google credentials and authorized clients.
+
+    Credentials are loaded from disk once, and clients are built once per
+    backend and shared. A background thread refreshes the access token shortly
+    before it expires, so transfers never block on a refresh. All methods are
+    thread-safe.
+    """
+
+    def __init__(self, creds_file: str = CREDS_FILE, client_secrets: str = 'client_secrets.json',
+                 refresh_margin: float = 300.0) -> None:
+        """
+        Args:
+            creds_file (str): Where OAuth credentials are saved between sessions.
+            client_secrets (str): OAuth client configuration file.
+            refresh_margin (float): Seconds before expiry at which the token is refreshed.
+        """
+        self.creds_file = creds_file
+        self.client_secrets = client_secrets
+        self.refresh_margin = refresh_margin
+        self._lock = threading.RLock()
+        self._gauth: Optional[GoogleAuth] = None
+        self._clients: Dict[str, Any] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+
+    def get_auth(self, interactive: bool = True) -> Optional[GoogleAuth]:
+        """Returns the shared, authorized GoogleAuth instance.
+
+        Args:
+            interactive (bool): Run the browser OAuth flow if no saved credentials exist.
+
+        Returns:
+            Optional[GoogleAuth]: Authorized instance, or None if there are no usable credentials.
+        """
+        with self._lock:
+            if self._gauth is not None:
+                return self._gauth
+            gauth = GoogleAuth()
+            gauth.settings['get_refresh_token'] = True
+            gauth.settings['oauth_scope'] = ['https://www.googleapis.com/auth/drive']
+            gauth.settings['client_config_file'] = self.client_secrets
+            os.makedirs(os.path.dirname(self.creds_file), exist_ok=True)
+
+            if os.path.exists(self.creds_file):
+                gauth.LoadCredentialsFile(self.creds_file)
+            if gauth.credentials is None:
+                if not interactive:
+                    return None
+                gauth.GetFlow()
+                gauth.flow.params.update({
+                    'access_type': 'offline',
+                    'approval_prompt': 'force'
+                })
+                gauth.LocalWebserverAuth(port_numbers=[8080])
+            elif gauth.access_token_expired:
+                gauth.Refresh()
+            else:
+                gauth.Authorize()
+
+            gauth.SaveCredentialsFile(self.creds_file)
+            self._gauth = gauth
+            self._start_refresher()
+            logger.info("Google credentials loaded.")
+            return gauth
+
+    def get_drive(self, interactive: bool = True) -> Optional[GoogleDrive]:
+        """Returns the shared GoogleDrive client, authenticating on first use."""
+        def build():
+            gauth = self.get_auth(interactive)
+            return GoogleDrive(gauth) if gauth else None
+        return self.get_client('drive', build)
+
+    def get_client(self, backend: str, factory: Callable[[], Any]) -> Any:
+        """Returns the cached client for ``backend``, building it with ``factory`` once.
+
+        Args:
+            backend (str): Cache key such as "drive", "s3" or "dropbox".
+            factory (Callable): Creates the client; a None result is not cached.
+        """
+        with self._lock:
+            client = self._clients.get(backend)
+            if client is None:
+                client = factory()
+                if client is not None:
+                    self._clients[backend] = client
+            return client
+
+    def refresh(self, gauth: Optional[GoogleAuth] = None) -> None:
+        """Refreshes the access token if it is still expired once the lock is held.
+
+        Concurrent callers that find the token expired wait here, and only the
+        first one actually refreshes.
+        """
+        with self._lock:
+            gauth = gauth or self._gauth
+            if gauth is None or not gauth.access_token_expired:
+                return
+            gauth.Refresh()
+            if gauth is self._gauth:
+                gauth.SaveCredentialsFile(self.creds_file)
+            logger.info("Google access token refreshed.")
+
+    def clear(self) -> None:
+        """Forgets cached clients and removes the saved credentials file."""
+        with self._lock:
+            self._gauth = None
+            self._clients.clear()
+            self._wake.set()
+            if os.path.exists(self.creds_file):
+                os.remove(self.creds_file)
+                logger.info("Credentials cleared successfully")
+
+    def _seconds_until_refresh(self) -> float:
+        """Seconds until the token enters the refresh margin."""
+        gauth = self._gauth
+        expiry = getattr(getattr(gauth, 'credentials', None), 'token_expiry', None)
+        if expiry is None:
+            return 3600.0
+        remaining = (expiry - datetime.datetime.utcnow()).total_seconds()
+        return max(0.0, remaining - self.refresh_margin)
+
+    def _start_refresher(self) -> None:
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop, name='colabdrive-token-refresh',
+                                           daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while self._gauth is not None:
+            self._wake.wait(self._seconds_until_refresh())
+            self._wake.clear()
+            gauth = self._gauth
+            if gauth is None:
+                return
+            if self._seconds_until_refresh() > 0:
+                continue
+            try:
+                with self._lock:
+                    gauth.Refresh()
+                    gauth.SaveCredentialsFile(self.creds_file)
+                logger.info("Google access token refreshed ahead of expiry.")
+            except Exception as e:
+                logger.error(f"Background token refresh failed: {e}")
+                self._wake.wait(30)
+
+
+# Create a singleton instance
+credential_manager = CredentialManager()
@@ -0,0 +1,177 @@
+## dedup.py
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive.drive_paths import FOLDER_MIME_TYPE
+from colabdrive import compression, fastio, metrics
+
+# What an upload does when its destination folder already holds the file:
+# "skip" returns the existing file when the content matches, "update" also
+# uploads changed content as a new revision of the same-named file, and
+# "duplicate" always creates a new file.
+IF_EXISTS_CHOICES = ('skip', 'update', 'duplicate')
+# Compressed uploads store the original content's MD5 here, since Drive's
+# md5Checksum then describes the compressed bytes.
+ORIGINAL_MD5_KEY = 'colabdrive-md5'
+CHILD_FIELDS = 'nextPageToken,items(id,title,md5Checksum,fileSize,properties)'
+
+
+def if_exists_mode(if_exists: Optional[str]) -> str:
+    """Validates an ``if_exists`` argument, falling back to the ``upload_if_exists`` setting."""
+    mode = (if_exists or config.get('upload_if_exists') or 'skip').lower()
+    if mode not in IF_EXISTS_CHOICES:
+        raise ValueError(f"if_exists must be one of {IF_EXISTS_CHOICES}, not {if_exists}")
+    return mode
+
+
+def md5_property(md5: str) -> Dict[str, str]:
+    """Drive v2 property recording the MD5 of the uncompressed content."""
+    return {'key': ORIGINAL_MD5_KEY, 'value': md5, 'visibility': 'PRIVATE'}
+
+
+class _LocalHashes:
+    """Remembers file MD5s by path, size and mtime so unchanged files are hashed once."""
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def md5(self, path: str) -> str:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = fastio.file_md5(path)
+        with self._lock:
+            if len(self._hashes) >= self.max_entries:
+                self._hashes.pop(next(iter(self._hashes)))
+            self._hashes[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+
+local_hashes = _LocalHashes()
+
+
+class FolderIndex:
+    """Cached listing of the files in Drive folders, for duplicate checks.
+
+    Each folder is listed with one paged request and reused for ``ttl``
+    seconds; uploads made through this process are added as they finish, so
+    repeated uploads into the same folder cost no extra API calls.
+    """
+
+    def __init__(self, drive, ttl: float = 300.0) -> None:
+        """
+        Args:
+            drive: Authenticated pydrive2 GoogleDrive instance.
+            ttl (float): Seconds a folder listing stays valid.
+        """
+        self.drive = drive
+        self.ttl = ttl
+        self._folders: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._lock = threading.Lock()
+
+    def children(self, parent_id: str) -> List[Dict]:
+        """Files directly inside a folder as dicts with id, title, md5 and size."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._folders.get(parent_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        query = f"'{parent_id}' in parents and trashed=false and mimeType != '{FOLDER_MIME_TYPE}'"
+        entries = []
+        for page in self.drive.ListFile({'q': query, 'maxResults': 1000, 'fields': CHILD_FIELDS}):
+            for item in page:
+                original = {p.get('key'): p.get('value') for p in item.get('properties') or []}
+                entries.append({
+                    'id': item['id'],
+                    'compressed': compression.ENCODING_KEY in original,
+                    'title': item['title'],
+                    'md5': original.get(ORIGINAL_MD5_KEY) or item.get('md5Checksum'),
+                    # Compressed files are matched on the original MD5 alone.
+                    'size': None if ORIGINAL_MD5_KEY in original else int(item.get('fileSize') or 0),
+                })
+        with self._lock:
+            self._folders[parent_id] = (now + self.ttl, entries)
+        return entries
+
+    def find_duplicate(self, parent_id: str, md5: str, size: int) -> Optional[Dict]:
+        """An existing file in the folder with the same content, if any."""
+        for entry in self.children(parent_id):
+            if entry['md5'] == md5 and entry['size'] in (None, size):
+                return entry
+        return None
+
+    def find_by_name(self, parent_id: str, title: str) -> Optional[Dict]:
+        """An existing file in the folder with this name, if any."""
+        return next((entry for entry in self.children(parent_id) if entry['title'] == title), None)
+
+    def remember(self, parent_id: str, file_id: str, title: str, md5: Optional[str],
+                 size: Optional[int]) -> None:
+        """Records a finished upload in the cached listing, replacing any older entry."""
+        with self._lock:
+            cached = self._folders.get(parent_id)
+            if cached is None:
+                return
+            entries = [entry for entry in cached[1] if entry['id'] != file_id]
+            entries.append({'id': file_id, 'title': title, 'md5': md5, 'size': size,
+                            'compressed': size is None})
+            self._folders[parent_id] = (cached[0], entries)
+
+    def invalidate(self, parent_id: Optional[str] = None) -> None:
+        with self._lock:
+            if parent_id is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(parent_id, None)
+
+
+def clear_compression_marker(service, file_id: str) -> None:
+    """Removes the compression properties after a file is updated with uncompressed content."""
+    for key in (compression.ENCODING_KEY, compression.SIZE_KEY, ORIGINAL_MD5_KEY):
+        try:
+            service.properties().delete(fileId=file_id, propertyKey=key, visibility='PRIVATE').execute()
+        except Exception as e:
+            if '404' not in str(e):
+                raise
+
+
+def check_existing(index: FolderIndex, parent_id: str, path: str, title: str,
+                   if_exists: str, compressed: bool = False
+                   ) -> Tuple[Optional[Dict], Optional[Dict], Optional[str]]:
+    """Decides what an upload of ``path`` into ``parent_id`` should do.
+
+    The file is only hashed when the folder holds a file it could match (same
+    size, or compressed) or when ``compressed`` uploads need the MD5 recorded,
+    so most new uploads skip the extra full read.
+
+    Returns:
+        Tuple: (duplicate entry to return instead of uploading, entry of the file to
+        update in place, local MD5 if computed). All three are None with
+        ``if_exists="duplicate"``.
+    """
+    if if_exists == 'duplicate':
+        return None, None, None
+    size = os.path.getsize(path)
+    existing = index.find_by_name(parent_id, title) if if_exists == 'update' else None
+    candidates = any(entry['size'] in (None, size) for entry in index.children(parent_id))
+    if not candidates and not compressed:
+        return None, existing, None
+    md5 = local_hashes.md5(path)
+    duplicate = index.find_duplicate(parent_id, md5, size)
+    if duplicate is not None:
+        metrics.registry.inc('colabdrive_upload_skipped_bytes_total', size)
+        logger.info(f"{path} is already in Drive as {duplicate['title']} ({duplicate['id']}); skipping upload")
+        return duplicate, None, md5
+    return None, existing, md5
+
+
+metrics.registry.help['colabdrive_upload_skipped_bytes_total'] = \
+    'Bytes not uploaded because identical content was already in Drive.'
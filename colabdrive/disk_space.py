@@ -0,0 +1,238 @@
+## disk_space.py
+
+import contextlib
+import functools
+import inspect
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive import metrics
+
+
+class DiskSpaceError(IOError):
+    """Not enough free space for a download, even after any eviction."""
+
+    def __init__(self, path: str, needed: int, available: int) -> None:
+        super().__init__(f"Not enough space for {path}: need {needed / 2 ** 20:.1f} MB, "
+                         f"{max(available, 0) / 2 ** 20:.1f} MB available")
+        self.needed = needed
+        self.available = available
+
+
+class _Reservation:
+    """Space promised to one in-flight download."""
+
+    def __init__(self, path: str, nbytes: int) -> None:
+        self.path = path
+        self.nbytes = nbytes
+
+    def outstanding(self) -> int:
+        """Reserved bytes not yet allocated on disk by the download itself.
+
+        Downloads write to ``path`` (a file, or a directory for snapshots) or
+        ``path.part``; blocks they have already
+        allocated show up in free space, so they are not counted twice.
+        """
+        allocated = max(_allocated(self.path), _allocated(self.path + '.part'))
+        return max(self.nbytes - allocated, 0)
+
+
+def _allocated(path: str) -> int:
+    """Bytes allocated on disk for a file, or for everything under a directory."""
+    try:
+        if os.path.isdir(path):
+            return sum(os.stat(os.path.join(directory, name)).st_blocks * 512
+                       for directory, _, files in os.walk(path) for name in files)
+        return os.stat(path).st_blocks * 512
+    except (OSError, AttributeError):
+        return 0
+
+
+class DiskLedger:
+    """Admission control for downloads against the free space of each filesystem.
+
+    Every admitted download holds a reservation until it finishes, so jobs
+    started concurrently see each other's claims instead of all passing the
+    same free-space check. When space is short and eviction is enabled, the
+    least recently used files in the registered cache directories on the same
+    filesystem are deleted to make room. Files held open by uploads and
+    conversions (see ``in_use``) and files used within the grace window, such
+    as a finished step's output waiting for the next step, are never evicted.
+    """
+
+    def __init__(self, headroom: Optional[int] = None, evict: Optional[bool] = None,
+                 grace: Optional[float] = None) -> None:
+        """
+        Args:
+            headroom (int, optional): Bytes always left free; defaults to the
+                ``disk_headroom`` setting.
+            evict (bool, optional): Evict cached files when space is short; defaults
+                to the ``disk_eviction`` setting.
+            grace (float, optional): Seconds after its last modification or access
+                during which a file is not evicted; defaults to the
+                ``disk_eviction_grace`` setting.
+        """
+        self.headroom = (config.get('disk_headroom') or 0) if headroom is None else headroom
+        self.evict = bool(config.get('disk_eviction')) if evict is None else evict
+        self.grace = (config.get('disk_eviction_grace') or 0) if grace is None else grace
+        self._lock = threading.Lock()
+        self._reservations: Dict[int, List[_Reservation]] = {}
+        self._in_use: Dict[str, int] = {}
+        self._cache_dirs: Set[str] = set()
+
+    def add_cache_dir(self, path: str) -> None:
+        """Marks a directory whose files may be evicted to make room."""
+        with self._lock:
+            self._cache_dirs.add(os.path.abspath(path))
+
+    @contextlib.contextmanager
+    def in_use(self, *paths: str) -> Iterator[None]:
+        """Keeps files (or everything under directories) from being evicted while they are read."""
+        paths = tuple(os.path.abspath(path) for path in paths)
+        with self._lock:
+            for path in paths:
+                self._in_use[path] = self._in_use.get(path, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for path in paths:
+                    self._in_use[path] -= 1
+                    if not self._in_use[path]:
+                        del self._in_use[path]
+
+    @staticmethod
+    def _existing_dir(path: str) -> str:
+        """Nearest existing directory at or above ``path``; the target may not exist yet."""
+        path = os.path.abspath(path)
+        while not os.path.isdir(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return path
+
+    def available(self, path: str) -> int:
+        """Free bytes on ``path``'s filesystem, less headroom and other jobs' reservations."""
+        directory = self._existing_dir(path)
+        device = os.stat(directory).st_dev
+        with self._lock:
+            reserved = sum(r.outstanding() for r in self._reservations.get(device, []))
+        return shutil.disk_usage(directory).free - self.headroom - reserved
+
+    @contextlib.contextmanager
+    def reserve(self, path: str, nbytes: Optional[int], evict: Optional[bool] = None) -> Iterator[None]:
+        """Admits a download of ``nbytes`` to ``path`` and holds the space until it ends.
+
+        Args:
+            path (str): Destination file.
+            nbytes (int, optional): Expected size. Unknown sizes are admitted unreserved.
+            evict (bool, optional): Overrides the ledger's eviction setting.
+
+        Raises:
+            DiskSpaceError: If the space cannot be found.
+        """
+        if not nbytes:
+            yield
+            return
+        path = os.path.abspath(path)
+        directory = self._existing_dir(os.path.dirname(path))
+        device = os.stat(directory).st_dev
+        # Space already held by a previous copy of the file is freed on replace.
+        nbytes = max(nbytes - _allocated(path), 0)
+        reservation = _Reservation(path, nbytes)
+        with self._lock:
+            reserved = sum(r.outstanding() for r in self._reservations.get(device, []))
+            available = shutil.disk_usage(directory).free - self.headroom - reserved
+            if available < nbytes and (self.evict if evict is None else evict):
+                available += self._evict(device, nbytes - available, path)
+            if available < nbytes:
+                raise DiskSpaceError(path, nbytes, available)
+            self._reservations.setdefault(device, []).append(reservation)
+            self._publish(device)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reservations[device].remove(reservation)
+                self._publish(device)
+
+    def _publish(self, device: int) -> None:
+        metrics.registry.set('colabdrive_disk_reserved_bytes',
+                             sum(r.nbytes for r in self._reservations[device]), device=str(device))
+
+    def _candidates(self, device: int, target: str) -> List[Tuple[float, int, str]]:
+        """Cached files on ``device`` as (last use, allocated bytes, path)."""
+        in_use = {p for reservations in self._reservations.values() for r in reservations
+                  for p in (r.path, r.path + '.part')}
+        in_use.update(self._in_use)
+        in_use.add(target)
+        recent = time.time() - self.grace
+        found = []
+        for root in self._cache_dirs:
+            if not os.path.isdir(root):
+                continue
+            for directory, _, files in os.walk(root):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    if path in in_use or name.endswith('.part') or \
+                            any(path.startswith(p + os.sep) for p in in_use):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    # relatime only updates atime daily, so fall back on mtime.
+                    last_use = max(stat.st_atime, stat.st_mtime)
+                    if stat.st_dev == device and last_use < recent:
+                        found.append((last_use, stat.st_blocks * 512, path))
+        return sorted(set(found))
+
+    def _evict(self, device: int, needed: int, target: str) -> int:
+        """Deletes least recently used cached files until ``needed`` bytes are freed.
+
+        Returns:
+            int: Bytes freed.
+        """
+        freed = 0
+        for _, size, path in self._candidates(device, target):
+            if freed >= needed:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not evict {path}: {e}")
+                continue
+            freed += size
+            logger.info(f"Evicted {path} ({size / 2 ** 20:.1f} MB) to free disk space")
+        if freed:
+            metrics.registry.inc('colabdrive_disk_evicted_bytes_total', freed)
+        return freed
+
+
+def holds(argument: str) -> Callable:
+    """Decorator keeping the file(s) passed as ``argument`` from eviction during the call."""
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            value = signature.bind(*args, **kwargs).arguments.get(argument)
+            paths = value if isinstance(value, (list, tuple)) else [value]
+            with ledger.in_use(*[path for path in paths if isinstance(path, str)]):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+metrics.registry.help.update({
+    'colabdrive_disk_reserved_bytes': 'Bytes reserved by in-flight downloads per filesystem.',
+    'colabdrive_disk_evicted_bytes_total': 'Bytes of cached files evicted to admit downloads.',
+})
+
+# Create a singleton instance shared by every download path.
+ledger = DiskLedger()
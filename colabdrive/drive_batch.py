@@ -0,0 +1,101 @@
+## drive_batch.py
+
+import random
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from googleapiclient.errors import HttpError
+from colabdrive.logger import logger
+from colabdrive import metrics, throttle
+
+# Drive accepts at most 100 calls per HTTP batch request.
+MAX_BATCH_SIZE = 100
+
+
+class DriveBatch:
+    """Coalesces Drive API calls into HTTP batch requests.
+
+    Calls are given as factories returning a fresh ``HttpRequest`` so that
+    rate-limited items can be rebuilt and retried. Retries go out in smaller
+    batches after the server's Retry-After or an exponential backoff, and count
+    as throttling against the shared "drive" concurrency limiter; every other
+    error is returned as the item's result.
+    """
+
+    def __init__(self, service, batch_size: int = MAX_BATCH_SIZE, max_rounds: int = 5,
+                 base_delay: float = 1.0) -> None:
+        """
+        Args:
+            service: Drive API resource, e.g. ``gauth.service`` from pydrive2.
+            batch_size (int): Calls per batch request, at most 100.
+            max_rounds (int): Attempts for rate-limited items before giving up.
+            base_delay (float): First backoff delay in seconds; doubles each round.
+        """
+        self.service = service
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_rounds = max_rounds
+        self.base_delay = base_delay
+
+    def execute(self, calls: Dict[Hashable, Callable[[], Any]]) -> Dict[Hashable, Any]:
+        """Runs the calls and returns each one's response, or the exception it raised.
+
+        Args:
+            calls (Dict): Maps a caller-chosen key to a factory building the request.
+
+        Returns:
+            Dict: Key to response body, or to an ``Exception`` for failed items.
+        """
+        results: Dict[Hashable, Any] = {}
+        pending: List[Hashable] = list(calls)
+        batch_size = self.batch_size
+        for round_number in range(self.max_rounds):
+            throttled: List[Tuple[Hashable, Optional[float], Exception]] = []
+            for start in range(0, len(pending), batch_size):
+                throttled.extend(self._run_batch(pending[start:start + batch_size], calls, results))
+            if not throttled:
+                return results
+            if round_number == self.max_rounds - 1:
+                # Out of rounds: report the last throttling error rather than dropping the keys.
+                for key, _, error in throttled:
+                    results[key] = error
+                logger.warning(f"{len(throttled)} Drive calls still rate limited after "
+                               f"{self.max_rounds} rounds; giving up")
+                break
+            pending = [key for key, _, _ in throttled]
+            batch_size = max(1, batch_size // 2)
+            hinted = [delay for _, delay, _ in throttled if delay is not None]
+            delay = max(hinted) if hinted else self.base_delay * (2 ** round_number) * (1 + random.random())
+            # A provider asking for hours would otherwise stall the whole batch that long.
+            delay = min(delay, throttle.MAX_BACKOFF)
+            throttle.limiter_for('drive').on_throttle(delay)
+            logger.warning(f"{len(pending)} Drive calls rate limited; retrying in batches of "
+                           f"{batch_size} after {delay:.1f}s")
+            for _ in pending:
+                metrics.add_retry()
+            time.sleep(delay)
+        return results
+
+    def _run_batch(self, keys: List[Hashable], calls: Dict[Hashable, Callable[[], Any]],
+                   results: Dict[Hashable, Any]) -> List[Tuple[Hashable, Optional[float], Exception]]:
+        """Sends one batch request; returns the rate-limited keys with any Retry-After and the error."""
+        throttled: List[Tuple[Hashable, Optional[float], Exception]] = []
+        index = {str(i): key for i, key in enumerate(keys)}
+
+        def callback(request_id, response, exception):
+            key = index[request_id]
+            if exception is not None and throttle.is_throttled(exception):
+                throttled.append((key, throttle.retry_after(exception), exception))
+                return
+            results[key] = exception if exception is not None else response
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for request_id, key in index.items():
+            batch.add(calls[key](), request_id=request_id)
+        try:
+            batch.execute()
+        except HttpError as e:
+            # The batch envelope itself was rejected; retry the whole group if throttled.
+            if throttle.is_throttled(e):
+                return [(key, throttle.retry_after(e), e) for key in keys]
+            for key in keys:
+                results.setdefault(key, e)
+        return throttled
@@ -1,15 +1,100 @@
 import os
-from typing import List, Optional
+import fnmatch
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import requests
 from colabdrive.logger import logger
+from colabdrive import compression, metrics, throttle
+from colabdrive.drive_paths import DrivePathResolver
+from colabdrive.ranged_download import DRIVE_FILES_URL, drive_media_url, parallel_download, sequential_copy
+from colabdrive.stream_upload import drive_auth_headers
+
+
+class FileEntry(NamedTuple):
+    """A single directory entry returned by ``DriveOperations.walk``."""
+    path: str
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+    depth: int
+
+
+class StatCache:
+    """Caches directory listings with their stat results.
+
+    A cached listing is reused while the directory's own mtime is unchanged and
+    the entry is younger than ``ttl``, so repeat browsing costs one ``stat`` per
+    directory instead of a full listing over the FUSE mount.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_dirs: int = 4096) -> None:
+        """
+        Args:
+            ttl (float): Seconds a listing stays valid even if the mtime is unchanged.
+            max_dirs (int): Maximum number of directories kept in the cache.
+        """
+        self.ttl = ttl
+        self.max_dirs = max_dirs
+        self._entries: Dict[str, Tuple[float, float, List[Tuple[str, bool, int, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def listdir(self, directory: str) -> List[Tuple[str, bool, int, float]]:
+        """Returns (name, is_dir, size, mtime) tuples for a directory."""
+        dir_mtime = os.stat(directory).st_mtime
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(directory)
+        if cached and cached[0] == dir_mtime and cached[1] > now:
+            return cached[2]
+
+        listing = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                    st = entry.stat()
+                    listing.append((entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+                except OSError:
+                    continue
+        listing.sort(key=lambda item: (not item[1], item[0].lower()))
+
+        with self._lock:
+            if len(self._entries) >= self.max_dirs:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[directory] = (dir_mtime, now + self.ttl, listing)
+        return listing
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drops cached listings for ``path`` and everything below it, or all if omitted."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(path).rstrip(os.sep)
+            for directory in [d for d in self._entries
+                              if d == path or d.startswith(path + os.sep)]:
+                del self._entries[directory]
+
 
 class DriveOperations:
     """Class for Google Drive specific operations in Colab environment."""
     
-    def __init__(self) -> None:
-        """Initialize DriveOperations."""
+    def __init__(self, gauth=None) -> None:
+        """Initialize DriveOperations.
+
+        Args:
+            gauth: Authenticated pydrive2 GoogleAuth instance, used to read mounted
+                files through the Drive API instead of the FUSE mount.
+        """
+        self.gauth = gauth
+        self.path_resolver: Optional[DrivePathResolver] = None
+        self.local_dir = os.path.expanduser("~/colabdrive_files/downloads")
         self.is_mounted = False
         self.mount_point = '/content/drive'
         self.is_colab = self._check_colab_environment()
+        self.stat_cache = StatCache()
         
     def _check_colab_environment(self) -> bool:
         """Check if running in Google Colab environment."""
@@ -34,6 +119,7 @@ class DriveOperations:
                 from google.colab import drive
                 drive.mount(self.mount_point)
                 self.is_mounted = True
+                self.stat_cache.invalidate()
                 logger.log_info("Google Drive mounted successfully")
             return True
         except Exception as e:
@@ -50,11 +136,151 @@ class DriveOperations:
             Optional[List[str]]: List of filenames if successful, None if failed
         """
         try:
-            files = os.listdir(directory)
-            return files
+            return [name for name, _, _, _ in self.stat_cache.listdir(os.path.abspath(directory))]
         except FileNotFoundError:
-            logger.log_error(f"Directory not found: {directory}")
+            logger.error(f"Directory not found: {directory}")
             return None
         except Exception as e:
-            logger.log_error(f"Error listing files: {e}")
+            logger.error(f"Error listing files: {e}")
+            return None
+
+    def walk(self, directory: str = '.', max_depth: int = 0, pattern: Optional[str] = None,
+             offset: int = 0, limit: Optional[int] = None) -> Optional[List[FileEntry]]:
+        """Recursively list a directory with sizes, mtimes and types.
+
+        Args:
+            directory (str): Path to the directory to walk
+            max_depth (int): How many levels below ``directory`` to descend; 0 lists only it
+            pattern (str, optional): Glob matched against entry names, e.g. "*.safetensors";
+                directories are still descended into when they do not match
+            offset (int): Number of matching entries to skip, for pagination
+            limit (int, optional): Maximum number of entries to return
+
+        Returns:
+            Optional[List[FileEntry]]: Matching entries, directory by directory, None if failed
+        """
+        root = os.path.abspath(directory)
+        results: List[FileEntry] = []
+        skipped = 0
+        stack = [(root, 0)]
+        try:
+            while stack:
+                current, depth = stack.pop()
+                try:
+                    listing = self.stat_cache.listdir(current)
+                except (PermissionError, NotADirectoryError) as e:
+                    if current == root:
+                        raise
+                    logger.warning(f"Skipping {current}: {e}")
+                    continue
+                subdirs = []
+                for name, is_dir, size, mtime in listing:
+                    path = os.path.join(current, name)
+                    if is_dir and depth < max_depth:
+                        subdirs.append(path)
+                    if pattern and not fnmatch.fnmatch(name, pattern):
+                        continue
+                    if skipped < offset:
+                        skipped += 1
+                        continue
+                    results.append(FileEntry(path, name, is_dir, size, mtime, depth))
+                    if limit is not None and len(results) >= limit:
+                        return results
+                stack.extend((path, depth + 1) for path in reversed(subdirs))
+            return results
+        except FileNotFoundError:
+            logger.error(f"Directory not found: {directory}")
+            return None
+        except Exception as e:
+            logger.error(f"Error walking directory {directory}: {e}")
+            return None
+
+
+    @metrics.instrumented('fetch_to_local', 'drive')
+    def fetch_to_local(self, path: str, destination_dir: Optional[str] = None,
+                       workers: int = 8) -> Optional[str]:
+        """Copy a file from the mounted drive to local disk as fast as possible.
+
+        The file's Drive ID is resolved and its contents pulled with parallel
+        ranged API requests, bypassing the FUSE mount. Without API access the
+        file is copied from the mount with a large sequential buffer. Files
+        uploaded compressed are decompressed after the copy; that needs API
+        access, since the compression marker is not visible on the mount.
+
+        Args:
+            path (str): Path of the file under the mount point
+            destination_dir (str, optional): Local directory to copy into
+            workers (int): Number of concurrent range requests
+
+        Returns:
+            Optional[str]: Local path of the copy, None if failed
+        """
+        try:
+            path = os.path.abspath(path)
+            if not os.path.isfile(path):
+                logger.error(f"File not found: {path}")
+                return None
+            final_destination_dir = destination_dir if destination_dir else self.local_dir
+            os.makedirs(final_destination_dir, exist_ok=True)
+            destination = os.path.join(final_destination_dir, os.path.basename(path))
+            size = os.path.getsize(path)
+
+            file_id = self._resolve_mounted_id(path)
+            codec = self._drive_encoding(file_id) if file_id else None
+            copied = False
+            if file_id:
+                try:
+                    parallel_download(drive_media_url(file_id), destination, size,
+                                      headers=lambda: drive_auth_headers(self.gauth),
+                                      workers=workers)
+                    copied = True
+                except Exception as e:
+                    logger.warning(f"API fetch of {path} failed, copying from mount instead: {e}")
+
+            if not copied:
+                sequential_copy(path, destination)
+                logger.info(f"Copied {path} from mounted drive to {destination}")
+            if codec:
+                compression.decompress_file(destination, destination, codec)
+            metrics.add_bytes(size)
+            return destination
+        except Exception as e:
+            metrics.note_error(e)
+            logger.error(f"Error fetching {path} to local disk: {e}")
+            return None
+
+    def _drive_encoding(self, file_id: str) -> Optional[str]:
+        """Compression codec a Drive file was uploaded with, if any."""
+        def fetch() -> Dict:
+            response = requests.get(f"{DRIVE_FILES_URL}/{file_id}", params={'fields': 'properties'},
+                                    headers=drive_auth_headers(self.gauth), timeout=30)
+            throttle.check_response(response)
+            response.raise_for_status()
+            return response.json()
+        return compression.drive_encoding(throttle.retry_call('drive', fetch))
+
+    def drive_id(self, path: str) -> Optional[str]:
+        """Drive file ID of a file on the mount, or None without API access."""
+        return self._resolve_mounted_id(os.path.abspath(path))
+
+    def _resolve_mounted_id(self, path: str) -> Optional[str]:
+        """Find the Drive ID of a file on the mount, or None without API access."""
+        if not self.gauth or not getattr(self.gauth, 'credentials', None):
+            return None
+        # Colab's Drive FUSE exposes each file's ID as an extended attribute.
+        try:
+            return os.getxattr(path, 'user.drive.id').decode()
+        except (AttributeError, OSError):
+            pass
+
+        relative = os.path.relpath(path, self.mount_point)
+        if relative.startswith('..') or not relative.startswith('My Drive'):
+            return None
+        try:
+            if self.path_resolver is None:
+                from colabdrive.credentials import credential_manager
+                self.path_resolver = DrivePathResolver(credential_manager.get_drive(interactive=False))
+            return self.path_resolver.resolve_file(relative)
+        except Exception as e:
+            logger.warning(f"Could not resolve Drive ID for {path}: {e}")
             return None
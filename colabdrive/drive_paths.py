@@ -0,0 +1,140 @@
+## drive_paths.py
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from colabdrive.logger import logger
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+ROOT_ALIASES = ('My Drive', 'root')
+
+
+def looks_like_path(value: str) -> bool:
+    """Tells a Drive path apart from a raw file/folder ID.
+
+    Drive IDs never contain slashes, so anything with one (or a root alias)
+    is treated as a path.
+    """
+    return '/' in value or value in ROOT_ALIASES
+
+
+def split_path(path: str) -> List[str]:
+    """Splits a Drive path into segments, dropping the leading root alias."""
+    segments = [segment for segment in path.strip().split('/') if segment]
+    if segments and segments[0] in ROOT_ALIASES:
+        segments = segments[1:]
+    return segments
+
+
+def _escape(name: str) -> str:
+    """Escapes a name for use inside a Drive query string literal."""
+    return name.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class DrivePathResolver:
+    """Resolves slash-separated Drive paths to file IDs.
+
+    Each (parent ID, name) lookup is memoized for ``ttl`` seconds, so resolving
+    a path costs one API call per segment the first time and none afterwards.
+    """
+
+    def __init__(self, drive, ttl: float = 300.0) -> None:
+        """
+        Args:
+            drive: Authenticated pydrive2 GoogleDrive instance.
+            ttl (float): Seconds a cached lookup stays valid.
+        """
+        self.drive = drive
+        self.ttl = ttl
+        self._cache: Dict[Tuple[str, str], Tuple[Dict[str, str], float]] = {}
+        self._lock = threading.Lock()
+
+    def resolve_folder(self, path: str, create: bool = False) -> Optional[str]:
+        """Resolves a folder path to its ID.
+
+        Args:
+            path (str): Path such as ``My Drive/models/sdxl``.
+            create (bool): Create missing folders along the way.
+
+        Returns:
+            Optional[str]: Folder ID, or None if a segment does not exist.
+        """
+        parent_id = 'root'
+        for name in split_path(path):
+            entry = self._lookup(parent_id, name, folders_only=True)
+            if entry is None:
+                if not create:
+                    return None
+                entry = self._create_folder(parent_id, name)
+            parent_id = entry['id']
+        return parent_id
+
+    def resolve_file(self, path: str) -> Optional[str]:
+        """Resolves a file path to its ID.
+
+        Args:
+            path (str): Path such as ``My Drive/models/sdxl/model.safetensors``.
+
+        Returns:
+            Optional[str]: File ID, or None if the path does not exist.
+        """
+        segments = split_path(path)
+        if not segments:
+            return None
+        parent_id = self.resolve_folder('/'.join(segments[:-1]))
+        if parent_id is None:
+            return None
+        entry = self._lookup(parent_id, segments[-1], folders_only=False)
+        return entry['id'] if entry else None
+
+    def invalidate(self, parent_id: Optional[str] = None) -> None:
+        """Drops cached lookups.
+
+        Args:
+            parent_id (str, optional): Only drop entries under this folder; all if omitted.
+        """
+        with self._lock:
+            if parent_id is None:
+                self._cache.clear()
+            else:
+                for key in [key for key in self._cache if key[0] == parent_id]:
+                    del self._cache[key]
+
+    def remember(self, parent_id: str, name: str, file_id: str, mime_type: str = '') -> None:
+        """Records an ID the caller already knows, e.g. right after an upload."""
+        with self._lock:
+            self._cache[(parent_id, name)] = ({'id': file_id, 'mimeType': mime_type},
+                                              time.monotonic() + self.ttl)
+
+    def _lookup(self, parent_id: str, name: str, folders_only: bool) -> Optional[Dict[str, str]]:
+        """Finds a child of ``parent_id`` by name, using the cache when fresh."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get((parent_id, name))
+        if cached and cached[1] > now:
+            entry = cached[0]
+            if not folders_only or entry['mimeType'] == FOLDER_MIME_TYPE:
+                return entry
+
+        query = f"'{parent_id}' in parents and title = '{_escape(name)}' and trashed=false"
+        if folders_only:
+            query += f" and mimeType = '{FOLDER_MIME_TYPE}'"
+        matches = self.drive.ListFile({'q': query, 'maxResults': 2}).GetList()
+        if not matches:
+            return None
+        if len(matches) > 1:
+            logger.warning(f"Multiple Drive entries named {name} under {parent_id}; using the first")
+        self.remember(parent_id, name, matches[0]['id'], matches[0]['mimeType'])
+        return {'id': matches[0]['id'], 'mimeType': matches[0]['mimeType']}
+
+    def _create_folder(self, parent_id: str, name: str) -> Dict[str, str]:
+        """Creates a folder and caches its ID."""
+        folder = self.drive.CreateFile({
+            'title': name,
+            'mimeType': FOLDER_MIME_TYPE,
+            'parents': [{'id': parent_id}]
+        })
+        folder.Upload()
+        logger.info(f"Created Drive folder {name} under {parent_id}")
+        self.remember(parent_id, name, folder['id'], FOLDER_MIME_TYPE)
+        return {'id': folder['id'], 'mimeType': FOLDER_MIME_TYPE}
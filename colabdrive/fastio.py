@@ -0,0 +1,137 @@
+## fastio.py
+
+import contextlib
+import hashlib
+import mmap
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, Optional
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+@contextlib.contextmanager
+def mapped(path: str) -> Iterator[Optional[mmap.mmap]]:
+    """Maps a file read-only for the duration of the block.
+
+    Yields None for empty files, which cannot be mapped. Readers get their
+    bytes straight from the page cache, with no read() copies into Python
+    buffers, and the kernel is told the access is sequential.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mapping, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapping.madvise(mmap.MADV_SEQUENTIAL)
+        try:
+            yield mapping
+        finally:
+            try:
+                mapping.close()
+            except BufferError:
+                # A caller still holds a slice; the mapping is freed with it.
+                pass
+
+
+def iter_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[memoryview]:
+    """Yields consecutive ``memoryview`` slices of a file without copying it.
+
+    Each slice is only valid until the next one is requested; consumers that
+    keep data (such as upload buffers) must copy what they keep. Pages behind
+    a consumed slice are dropped from this process's mapping, so resident
+    memory stays around one chunk however large the file is.
+    """
+    chunk_size = max(mmap.PAGESIZE, chunk_size - chunk_size % mmap.PAGESIZE)
+    with mapped(path) as mapping:
+        if mapping is None:
+            return
+        view = memoryview(mapping)
+        release_pages = hasattr(mapping, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+        try:
+            for start in range(0, len(view), chunk_size):
+                chunk = view[start:start + chunk_size]
+                try:
+                    yield chunk
+                finally:
+                    chunk.release()
+                if release_pages:
+                    # The data stays in the page cache; only our mapping of it is released.
+                    mapping.madvise(mmap.MADV_DONTNEED, start, min(chunk_size, len(view) - start))
+        finally:
+            view.release()
+
+
+def hash_file(path: str, algorithms: Iterable[str] = ('md5',),
+              chunk_size: int = CHUNK_SIZE) -> Dict[str, str]:
+    """Computes several digests of a file in one pass over its mapped pages.
+
+    hashlib releases the GIL while hashing large buffers, so hashing in
+    worker threads runs in parallel.
+    """
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    for chunk in iter_chunks(path, chunk_size):
+        for hasher in hashers.values():
+            hasher.update(chunk)
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+def file_md5(path: str) -> str:
+    """MD5 hex digest of a file; Drive reports the same value as ``md5Checksum``."""
+    return hash_file(path, ('md5',))['md5']
+
+
+def _copy_range(source_fd: int, destination_fd: int, size: int) -> int:
+    """Copies up to ``size`` bytes inside the kernel; returns how many were copied."""
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < size:
+                sent = os.copy_file_range(source_fd, destination_fd, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return copied
+        except OSError:
+            # Unsupported across these filesystems (e.g. FUSE); sendfile picks up where it stopped.
+            pass
+    if hasattr(os, 'sendfile'):
+        try:
+            while copied < size:
+                sent = os.sendfile(destination_fd, source_fd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return copied
+        except OSError:
+            pass
+    return copied
+
+
+def fast_copy(source: str, destination: str) -> str:
+    """Copies a file and its metadata like ``shutil.copy2``, without user-space buffers.
+
+    Uses ``copy_file_range`` (which can reflink on btrfs/XFS and copy
+    server-side on NFS) or ``sendfile``, falling back to a buffered copy.
+
+    Returns:
+        str: The destination path.
+
+    Raises:
+        shutil.SameFileError: If ``destination`` is ``source``; opening it for
+            writing would truncate the source.
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    if os.path.exists(destination) and os.path.samefile(source, destination):
+        raise shutil.SameFileError(f"{source!r} and {destination!r} are the same file")
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        size = os.fstat(src.fileno()).st_size
+        copied = _copy_range(src.fileno(), dst.fileno(), size)
+        if copied < size:
+            src.seek(copied)
+            dst.seek(copied)
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    shutil.copystat(source, destination)
+    return destination
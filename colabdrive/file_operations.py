@@ -1,19 +1,27 @@
 ## file_operations.py
 
+import concurrent.futures
 import os
-import shutil
+import tempfile
 import logging
-from typing import Optional, List, Dict, Tuple
+from typing import Callable, Optional, List, Dict, Tuple
 from pathlib import Path
 import mimetypes
+import requests
 from PIL import Image
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
-from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
+from colabdrive.credentials import credential_manager
+from colabdrive.dedup import FolderIndex, check_existing, clear_compression_marker, if_exists_mode, md5_property
+from colabdrive.drive_batch import DriveBatch
+from colabdrive.drive_paths import DrivePathResolver, looks_like_path
+from colabdrive.ranged_download import drive_media_url, parallel_download
+from colabdrive.stream_upload import DriveResumableUpload, DriveTarget, drive_auth_headers
 
 # Import the logger instance from logger.py
 from colabdrive.logger import logger
+from colabdrive import compression, disk_space, fastio, metrics, model_conversion, packing, profiling, throttle
 
 class FileOperations:
     """Class for handling file uploads, downloads, and conversions."""
@@ -44,13 +52,22 @@ class FileOperations:
         'document': {
             'source': ['txt', 'md', 'json', 'csv'],
             'target': ['txt', 'md', 'json', 'csv', 'pdf']
+        },
+        'model': {
+            'source': model_conversion.CHECKPOINT_FORMATS,
+            'target': ['safetensors']
         }
     }
 
+    # Files smaller than this are fetched with a single request.
+    PARALLEL_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+
     def __init__(self) -> None:
         """Initializes the FileOperations class."""
         self.gauth = None
         self.drive = None
+        self.path_resolver: Optional[DrivePathResolver] = None
+        self.folder_index: Optional[FolderIndex] = None
         self.base_dir = os.path.expanduser("~/colabdrive_files")
         self.downloads_dir = os.path.join(self.base_dir, "downloads")
         self.uploads_dir = os.path.join(self.base_dir, "uploads")
@@ -59,6 +76,8 @@ class FileOperations:
         # Create necessary directories
         for directory in [self.base_dir, self.downloads_dir, self.uploads_dir, self.converted_dir]:
             os.makedirs(directory, exist_ok=True)
+        disk_space.ledger.add_cache_dir(self.downloads_dir)
+        disk_space.ledger.add_cache_dir(self.converted_dir)
             
         try:
             self._setup_drive()
@@ -68,29 +87,48 @@ class FileOperations:
     def _setup_drive(self) -> None:
         """Sets up Google Drive authentication if credentials are available."""
         if os.path.exists('client_secrets.json'):
-            self.gauth = GoogleAuth()
             self.drive = self._authenticate_drive()
+            self.gauth = credential_manager.get_auth()
+            self.path_resolver = DrivePathResolver(self.drive)
+            self.folder_index = FolderIndex(self.drive)
 
     def _authenticate_drive(self) -> GoogleDrive:
-        """Authenticates and creates a Google Drive instance.
+        """Returns the shared Google Drive client from the credential manager.
 
         Returns:
             GoogleDrive: Authenticated Google Drive instance.
         """
         try:
-            self.gauth.LocalWebserverAuth()  # Creates a local webserver for authentication
+            drive = credential_manager.get_drive()
             logger.info("Google Drive authentication successful.")
-            return GoogleDrive(self.gauth)
+            return drive
         except Exception as e:
             logger.error(f"Google Drive authentication failed: {e}")
             raise
 
-    def upload_file(self, file: str, destination_dir: Optional[str] = None) -> Tuple[bool, str]:
+    @metrics.instrumented('upload_file', 'drive')
+    @profiling.profiled('upload_file')
+    @disk_space.holds('file')
+    def upload_file(self, file: str, destination_dir: Optional[str] = None,
+                    compress: Optional[str] = None, if_exists: Optional[str] = None,
+                    stage: bool = True) -> Tuple[bool, str]:
         """Uploads a file to Google Drive.
 
         Args:
             file (str): The path to the file to upload.
-            destination_dir (str, optional): The destination directory in Google Drive.
+            destination_dir (str, optional): The destination folder ID, or a path such as
+                "My Drive/models/sdxl". Missing folders in a path are created.
+            compress (str, optional): Compression setting ("auto", "zstd", "gzip", "off");
+                defaults to the ``compression`` config value. Compressed files are
+                marked so ``download_file`` restores them transparently.
+            if_exists (str, optional): "skip" returns the existing file when the folder
+                already holds the same content (matched by MD5 and size), "update" also
+                uploads changed content as a new revision of the same-named file, and
+                "duplicate" always creates a new file. Defaults to the
+                ``upload_if_exists`` config value.
+            stage (bool): Upload from a copy kept in the uploads folder, so the source
+                may change meanwhile. False uploads straight from ``file``, which must
+                then stay unchanged until the upload ends, and keeps no local copy.
 
         Returns:
             Tuple[bool, str]: (Success status, Message with details)
@@ -102,32 +140,121 @@ class FileOperations:
             return False, f"File not found: {file}"
             
         try:
-            # First copy to uploads directory
             filename = os.path.basename(file)
-            upload_path = os.path.join(self.uploads_dir, filename)
-            shutil.copy2(file, upload_path)
-            
+            timer = profiling.current()
+
             # Prepare drive path
             drive_path = destination_dir if destination_dir else '/'
-            file_metadata = {
-                'title': filename,
-                'parents': [{'id': drive_path}] if drive_path != '/' else []
-            }
-            
-            # Upload to drive
-            media = MediaFileUpload(upload_path, resumable=True)
-            uploaded_file = self.drive.CreateFile(file_metadata)
-            uploaded_file.SetContentMedia(media)
-            uploaded_file.Upload()
-            
+            parent_id = drive_path
+            if drive_path != '/' and looks_like_path(drive_path):
+                parent_id = self.path_resolver.resolve_folder(drive_path, create=True)
+
+            folder_id = parent_id if drive_path != '/' else 'root'
+            codec = compression.choose_codec(file, compress)
+            duplicate, existing, md5 = check_existing(self.folder_index, folder_id, file, filename,
+                                                      if_exists_mode(if_exists), compressed=bool(codec))
+            if duplicate is not None:
+                return True, (f"Skipped upload: {filename} is already in {drive_path} "
+                              f"as {duplicate['title']} (ID {duplicate['id']})")
+            existing_id = existing['id'] if existing else None
+            action = "Updated" if existing_id else "Successfully uploaded"
+
+            if codec:
+                file_id, sent = self._upload_compressed(file, filename, codec,
+                                                        parent_id if drive_path != '/' else None,
+                                                        md5=md5, file_id=existing_id)
+                self.path_resolver.remember(folder_id, filename, file_id)
+                self.folder_index.remember(folder_id, file_id, filename, md5, None)
+                metrics.add_bytes(sent)
+                logger.info(f"File uploaded successfully: {filename} to {drive_path} ({codec})")
+                return True, f"{action} {filename} in {drive_path} (compressed with {codec}, ID {file_id})"
+
+            # First copy to uploads directory, under a unique name: concurrent uploads of
+            # same-named files from different folders would otherwise share one copy.
+            upload_path = os.path.join(self.uploads_dir, filename) if stage else file
+            if not stage or os.path.exists(upload_path) and os.path.samefile(file, upload_path):
+                staged_path = upload_path
+            else:
+                fd, staged_path = tempfile.mkstemp(prefix=f"{filename}.", suffix='.part', dir=self.uploads_dir)
+                os.close(fd)
+            try:
+                if staged_path != upload_path:
+                    with timer.phase('read'):
+                        fastio.fast_copy(file, staged_path)
+                size = os.path.getsize(staged_path)
+                uploaded_file = self._upload_staged(staged_path, filename, existing_id, parent_id, drive_path)
+                if staged_path != upload_path:
+                    os.replace(staged_path, upload_path)
+            finally:
+                if staged_path != upload_path and os.path.exists(staged_path):
+                    os.remove(staged_path)
+            if existing and existing.get('compressed'):
+                clear_compression_marker(self.gauth.service, existing_id)
+            self.path_resolver.remember(folder_id, filename, uploaded_file['id'])
+            # Drive reports the MD5 of uncompressed uploads, so unhashed files still get one.
+            self.folder_index.remember(folder_id, uploaded_file['id'], filename,
+                                       md5 or uploaded_file.get('md5Checksum'), size)
+
+            metrics.add_bytes(size)
             logger.info(f"File uploaded successfully: {filename} to {drive_path}")
-            return True, f"Successfully uploaded {filename} to {drive_path}"
-            
+            return True, f"{action} {filename} in {drive_path} (ID {uploaded_file['id']})"
+
         except Exception as e:
+            metrics.note_error(e)
             error_msg = f"Failed to upload file {file}: {str(e)}"
             logger.error(error_msg)
             return False, error_msg
 
+    def _upload_staged(self, staged_path: str, filename: str, existing_id: Optional[str],
+                       parent_id: str, drive_path: str):
+        """Uploads a staged copy as ``filename``, or as a new revision of ``existing_id``."""
+        if existing_id:
+            # Uploading to an existing ID stores the content as a new revision.
+            file_metadata = {'id': existing_id, 'title': filename}
+        else:
+            file_metadata = {
+                'title': filename,
+                'parents': [{'id': parent_id}] if drive_path != '/' else []
+            }
+
+        # Upload to drive
+        media = MediaFileUpload(staged_path, resumable=True)
+        uploaded_file = self.drive.CreateFile(file_metadata)
+        uploaded_file.SetContentMedia(media)
+        with profiling.current().phase('write'):
+            uploaded_file.Upload()
+        return uploaded_file
+
+    def _upload_compressed(self, file: str, filename: str, codec: str, parent_id: Optional[str],
+                           md5: Optional[str] = None, file_id: Optional[str] = None) -> Tuple[str, int]:
+        """Streams a file through the compressor into a Drive upload marked with the codec.
+
+        Args:
+            md5 (str, optional): MD5 of the uncompressed file, stored for duplicate checks.
+            file_id (str, optional): Existing file to update with a new revision.
+
+        Returns:
+            Tuple[str, int]: (Drive file ID, compressed bytes sent)
+        """
+        timer = profiling.current()
+        properties = compression.drive_properties(codec, os.path.getsize(file)) + \
+            ([md5_property(md5)] if md5 else [])
+        upload = DriveResumableUpload(self.gauth, filename, parent_id,
+                                      properties=properties, file_id=file_id)
+        try:
+            with open(file, 'rb') as f:
+                reader = compression.CompressingReader(f, codec)
+                for chunk in timer.iterate('read', iter(lambda: reader.read(compression.READ_SIZE), b'')):
+                    with timer.phase('write'):
+                        upload.write(chunk)
+            with timer.phase('write'):
+                file_id = upload.close()
+        except BaseException:
+            upload.abort()
+            raise
+        reader.record(filename)
+        return file_id, reader.bytes_out
+
     def list_available_files(self) -> List[Dict[str, str]]:
         """Lists all available files in Google Drive.
 
@@ -145,12 +272,127 @@ class FileOperations:
             logger.error(f"Failed to list files: {e}")
             return []
 
-    def download_file(self, file_id: str, destination_dir: Optional[str] = None) -> Tuple[bool, str]:
+    def _resolve_ids(self, file_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Maps each given ID or Drive path to a file ID (None if a path does not exist)."""
+        return {item: self.path_resolver.resolve_file(item) if looks_like_path(item) else item
+                for item in file_ids}
+
+    @metrics.instrumented('get_metadata_many', 'drive')
+    def get_metadata_many(self, file_ids: List[str],
+                          fields: str = 'id,title,mimeType,fileSize,md5Checksum,modifiedDate,parents'
+                          ) -> Dict[str, Optional[Dict]]:
+        """Fetches metadata for many files using batched Drive requests.
+
+        Args:
+            file_ids (List[str]): File IDs or Drive paths.
+            fields (str): Drive fields to return for each file.
+
+        Returns:
+            Dict[str, Optional[Dict]]: Metadata per requested item; None where
+                the file could not be found or read.
+        """
+        if not self.drive:
+            return {item: None for item in file_ids}
+
+        service = self.gauth.service
+        resolved = self._resolve_ids(file_ids)
+        calls = {item: (lambda fid=fid: service.files().get(fileId=fid, fields=fields))
+                 for item, fid in resolved.items() if fid}
+        responses = DriveBatch(service).execute(calls)
+
+        results: Dict[str, Optional[Dict]] = {}
+        for item in file_ids:
+            response = responses.get(item)
+            if isinstance(response, Exception):
+                logger.error(f"Failed to fetch metadata for {item}: {response}")
+                response = None
+            results[item] = response
+        return results
+
+    @metrics.instrumented('delete_many', 'drive')
+    def delete_many(self, file_ids: List[str], permanent: bool = False) -> Dict[str, Tuple[bool, str]]:
+        """Moves many files to the trash (or deletes them) using batched Drive requests.
+
+        Args:
+            file_ids (List[str]): File IDs or Drive paths.
+            permanent (bool): Delete outright instead of trashing.
+
+        Returns:
+            Dict[str, Tuple[bool, str]]: (Success status, Message) per requested item.
+        """
+        if not self.drive:
+            return {item: (False, "Google Drive not configured.") for item in file_ids}
+
+        service = self.gauth.service
+        action = service.files().delete if permanent else service.files().trash
+        resolved = self._resolve_ids(file_ids)
+        calls = {item: (lambda fid=fid: action(fileId=fid))
+                 for item, fid in resolved.items() if fid}
+        responses = DriveBatch(service).execute(calls)
+        self.path_resolver.invalidate()
+
+        verb = "Deleted" if permanent else "Trashed"
+        return {item: self._batch_outcome(item, responses, f"{verb} {item}") for item in file_ids}
+
+    @metrics.instrumented('move_many', 'drive')
+    def move_many(self, file_ids: List[str], destination_dir: str) -> Dict[str, Tuple[bool, str]]:
+        """Moves many files into one folder using batched Drive requests.
+
+        Args:
+            file_ids (List[str]): File IDs or Drive paths.
+            destination_dir (str): Destination folder ID or Drive path; missing
+                folders in a path are created.
+
+        Returns:
+            Dict[str, Tuple[bool, str]]: (Success status, Message) per requested item.
+        """
+        if not self.drive:
+            return {item: (False, "Google Drive not configured.") for item in file_ids}
+
+        parent_id = destination_dir
+        if looks_like_path(destination_dir):
+            parent_id = self.path_resolver.resolve_folder(destination_dir, create=True)
+
+        # One batch to learn the current parents, one to re-parent.
+        current = self.get_metadata_many(file_ids, fields='id,parents')
+        service = self.gauth.service
+        calls = {}
+        for item, metadata in current.items():
+            if metadata:
+                old_parents = ','.join(p['id'] for p in metadata.get('parents', []) if p['id'] != parent_id)
+                calls[item] = (lambda fid=metadata['id'], old=old_parents:
+                               service.files().patch(fileId=fid, body={}, addParents=parent_id,
+                                                     removeParents=old or None, fields='id,parents'))
+        responses = DriveBatch(service).execute(calls)
+        self.path_resolver.invalidate()
+
+        return {item: self._batch_outcome(item, responses, f"Moved {item} to {destination_dir}")
+                for item in file_ids}
+
+    @staticmethod
+    def _batch_outcome(item: str, responses: Dict, success_msg: str) -> Tuple[bool, str]:
+        """Turns one batched response into the (success, message) pair used by this class."""
+        if item not in responses:
+            return False, f"File not found: {item}"
+        response = responses[item]
+        if isinstance(response, Exception):
+            error_msg = f"Failed for {item}: {response}"
+            logger.error(error_msg)
+            return False, error_msg
+        return True, success_msg
+
+    @metrics.instrumented('download_file', 'drive')
+    @profiling.profiled('download_file')
+    def download_file(self, file_id: str, destination_dir: Optional[str] = None,
+                      parallel: bool = True, workers: int = 8) -> Tuple[bool, str]:
         """Downloads a file from Google Drive.
 
         Args:
-            file_id (str): The ID of the file to download.
+            file_id (str): The ID of the file to download, or its Drive path
+                such as "My Drive/models/sdxl/model.safetensors".
             destination_dir (str, optional): Custom destination directory.
+            parallel (bool): Fetch large files as concurrent byte ranges.
+            workers (int): Number of concurrent connections for parallel downloads.
 
         Returns:
             Tuple[bool, str]: (Success status, Message with details)
@@ -162,10 +404,18 @@ class FileOperations:
             return False, "Error: Not authenticated with Google Drive. Please authenticate first."
             
         try:
+            if looks_like_path(file_id):
+                path = file_id
+                file_id = self.path_resolver.resolve_file(path)
+                if file_id is None:
+                    return False, f"Error: No file found at Drive path {path}"
+
             # Verify file exists and is accessible
+            timer = profiling.current()
             try:
                 downloaded_file = self.drive.CreateFile({'id': file_id})
-                downloaded_file.FetchMetadata()
+                with timer.phase('connect'):
+                    downloaded_file.FetchMetadata()
             except Exception as e:
                 if 'accessNotConfigured' in str(e):
                     return False, "Error: Google Drive API not properly configured. Please check your credentials."
@@ -185,8 +435,35 @@ class FileOperations:
             os.makedirs(final_destination_dir, exist_ok=True)
             destination_path = os.path.join(final_destination_dir, filename)
             
-            # Download file with progress tracking
-            downloaded_file.GetContentFile(destination_path)
+            # Download to a temporary name and rename once complete; the metadata
+            # fetched above already tells us the size, so no extra round trip.
+            file_size = int(downloaded_file.get('fileSize') or 0)
+            codec = compression.drive_encoding(downloaded_file)
+            # Compressed files also need room for the decompressed copy while both exist.
+            needed = file_size + (compression.expected_size(
+                file_size, compression.drive_original_size(downloaded_file)) if codec else 0)
+            try:
+                with disk_space.ledger.reserve(destination_path, needed):
+                    with timer.phase('read'):
+                        if parallel and file_size >= self.PARALLEL_DOWNLOAD_THRESHOLD:
+                            parallel_download(
+                                downloaded_file.get('downloadUrl') or drive_media_url(file_id),
+                                destination_path, file_size,
+                                headers=lambda: drive_auth_headers(self.gauth),
+                                workers=workers
+                            )
+                        else:
+                            temp_path = destination_path + '.part'
+                            downloaded_file.GetContentFile(temp_path)
+                            os.replace(temp_path, destination_path)
+
+                    if codec:
+                        with timer.phase('decompress'):
+                            compression.decompress_file(destination_path, destination_path, codec)
+            except disk_space.DiskSpaceError as e:
+                metrics.note_error(e)
+                logger.error(str(e))
+                return False, f"Error: {e}"
             
             # Verify download
             if not os.path.exists(destination_path):
@@ -196,15 +473,168 @@ class FileOperations:
                 os.remove(destination_path)
                 return False, "Error: Download failed - empty file"
                 
+            metrics.add_bytes(os.path.getsize(destination_path))
             success_msg = f"Success: File downloaded to {destination_path}"
             logger.info(success_msg)
             return True, success_msg
             
         except Exception as e:
+            metrics.note_error(e)
             error_msg = f"Error downloading file: {str(e)}"
             logger.error(error_msg)
             return False, error_msg
 
+    @metrics.instrumented('upload_packed', 'drive')
+    @profiling.profiled('upload_packed')
+    @disk_space.holds('sources')
+    def upload_packed(self, sources: List[str], destination_dir: Optional[str] = None,
+                      name: Optional[str] = None, shard_size: int = 256 * 1024 * 1024,
+                      workers: int = 4) -> Tuple[bool, str]:
+        """Uploads many small files as tar shards plus a manifest.
+
+        Files are streamed straight into the shard uploads, so nothing is staged
+        locally. The manifest records each file's shard and byte offset, which
+        lets ``download_packed`` fetch single files with range requests.
+
+        Args:
+            sources (List[str]): Files and directories to pack.
+            destination_dir (str, optional): Destination folder ID or Drive path.
+            name (str, optional): Base name of the shards and manifest; defaults to
+                the first source's name.
+            shard_size (int): Target shard size in bytes.
+            workers (int): Shards uploaded concurrently.
+
+        Returns:
+            Tuple[bool, str]: (Success status, Message with the manifest file ID)
+        """
+        if not self.drive:
+            return False, "Google Drive not configured. Upload not available."
+
+        try:
+            parent_id = destination_dir
+            if destination_dir and looks_like_path(destination_dir):
+                parent_id = self.path_resolver.resolve_folder(destination_dir, create=True)
+            name = name or os.path.basename(os.path.normpath(sources[0]))
+            target = DriveTarget(self.gauth, parent_id)
+
+            with profiling.current().phase('write'):
+                manifest = packing.pack(sources, target.open, name, shard_size, workers)
+                if not manifest['members']:
+                    return False, "No files found to pack"
+                upload = target.open(f"{name}.manifest.json")
+                upload.write(packing.dump_manifest(manifest))
+                manifest_id = upload.close()
+            self.path_resolver.invalidate(parent_id or 'root')
+
+            metrics.add_bytes(sum(m['size'] for m in manifest['members'].values()))
+            msg = (f"Packed {len(manifest['members'])} files into {len(manifest['shards'])} shards; "
+                   f"manifest ID: {manifest_id}")
+            logger.info(msg)
+            return True, msg
+
+        except Exception as e:
+            metrics.note_error(e)
+            error_msg = f"Failed to upload packed files: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+
+    @metrics.instrumented('download_packed', 'drive')
+    @profiling.profiled('download_packed')
+    def download_packed(self, manifest_id: str, destination_dir: Optional[str] = None,
+                        members: Optional[List[str]] = None, workers: int = 4) -> Tuple[bool, str]:
+        """Downloads files uploaded with ``upload_packed``.
+
+        Args:
+            manifest_id (str): File ID or Drive path of the pack manifest.
+            destination_dir (str, optional): Where to extract; defaults to the downloads folder.
+            members (List[str], optional): Only fetch these files, each with a single
+                range request into its shard. All shards are streamed and extracted if omitted.
+            workers (int): Concurrent requests.
+
+        Returns:
+            Tuple[bool, str]: (Success status, Message with details)
+        """
+        if not self.drive:
+            return False, "Error: Google Drive not configured. Please authenticate first."
+
+        try:
+            if looks_like_path(manifest_id):
+                path = manifest_id
+                manifest_id = self.path_resolver.resolve_file(path)
+                if manifest_id is None:
+                    return False, f"Error: No file found at Drive path {path}"
+            manifest = packing.load_manifest(self.drive.CreateFile({'id': manifest_id}).GetContentString())
+            final_destination_dir = destination_dir if destination_dir else self.downloads_dir
+            os.makedirs(final_destination_dir, exist_ok=True)
+
+            def get(file_id: str, consume: Callable[[requests.Response], Tuple[int, int]],
+                    byte_range: Optional[Tuple[int, int]] = None) -> int:
+                # The body is read inside the retried call so the "drive" slot is
+                # held for the whole transfer, not just the request.
+                def attempt() -> Tuple[int, int]:
+                    headers = drive_auth_headers(self.gauth)
+                    if byte_range:
+                        headers['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+                    response = requests.get(drive_media_url(file_id), headers=headers, stream=True, timeout=60)
+                    with response:
+                        throttle.check_response(response)
+                        response.raise_for_status()
+                        return consume(response)
+                files, _ = throttle.retry_call('drive', attempt, work=lambda outcome: outcome[1])
+                return files
+
+            def fetch_member(member: str) -> int:
+                shard, first, last = packing.member_range(manifest, member)
+                destination_path = packing.safe_destination(final_destination_dir, member)
+                os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+                if last < first:
+                    # Empty member: "bytes=X-(X-1)" is not a valid range and would fetch the whole shard.
+                    open(destination_path, 'wb').close()
+                    return 1
+                temp_path = destination_path + '.part'
+
+                def consume(response: requests.Response) -> Tuple[int, int]:
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=1024 * 1024):
+                            f.write(chunk)
+                    size = os.path.getsize(temp_path)
+                    if size != last - first + 1:
+                        os.remove(temp_path)
+                        raise IOError(f"Short read for {member}")
+                    os.replace(temp_path, destination_path)
+                    return 1, size
+
+                return get(shard['location'], consume, (first, last))
+
+            def fetch_shard(shard: Dict) -> int:
+                def consume(response: requests.Response) -> Tuple[int, int]:
+                    response.raw.decode_content = True
+                    files = packing.extract_stream(response.raw, final_destination_dir)
+                    return files, response.raw.tell()
+
+                return get(shard['location'], consume)
+
+            wanted = members or list(manifest['members'])
+            total_size = sum(manifest['members'].get(m, {}).get('size', 0) for m in wanted)
+            with disk_space.ledger.reserve(final_destination_dir, total_size), \
+                    profiling.current().phase('read'):
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                    if members:
+                        count = sum(executor.map(fetch_member, members))
+                    else:
+                        count = sum(executor.map(fetch_shard, manifest['shards']))
+
+            metrics.add_bytes(total_size)
+            success_msg = f"Success: Extracted {count} files to {final_destination_dir}"
+            logger.info(success_msg)
+            return True, success_msg
+
+        except Exception as e:
+            metrics.note_error(e)
+            error_msg = f"Error downloading packed files: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+
     def get_supported_formats(self) -> Dict[str, Dict[str, List[str]]]:
         """Returns supported formats for conversion.
 
@@ -213,14 +643,22 @@ class FileOperations:
         """
         return self.VALID_CONVERSIONS
 
+    @metrics.instrumented('convert_file', 'local')
+    @profiling.profiled('convert_file')
+    @disk_space.holds('input_file')
     def convert_file(self, input_file: str, output_format: str, 
-                    output_dir: Optional[str] = None) -> Tuple[bool, str]:
+                    output_dir: Optional[str] = None, dtype: Optional[str] = None,
+                    max_shard_size: Optional[int] = None) -> Tuple[bool, str]:
         """Converts a file to a specified format.
 
         Args:
             input_file (str): The path to the input file.
             output_format (str): The desired output format.
             output_dir (str, optional): Custom output directory.
+            dtype (str, optional): For model checkpoints, cast floating-point
+                tensors to "fp16", "bf16" or "fp32".
+            max_shard_size (int, optional): For model checkpoints, split the output
+                into safetensors shards of at most this many bytes.
 
         Returns:
             Tuple[bool, str]: (Success status, Message with details)
@@ -261,16 +699,26 @@ class FileOperations:
             os.makedirs(final_output_dir, exist_ok=True)
             output_path = os.path.join(final_output_dir, f"{base_name}.{output_format}")
             
+            timer = profiling.current()
+
+            # Handle model checkpoint conversions
+            if conversion_category == 'model':
+                with timer.phase('convert'):
+                    written = model_conversion.convert_checkpoint(
+                        input_file, final_output_dir, cast=dtype, max_shard_size=max_shard_size)
+                output_path = written[-1]
+
             # Handle image conversions
-            if input_ext in self.SUPPORTED_IMAGE_FORMATS and output_format in self.SUPPORTED_IMAGE_FORMATS:
-                with Image.open(input_file) as img:
+            elif input_ext in self.SUPPORTED_IMAGE_FORMATS and output_format in self.SUPPORTED_IMAGE_FORMATS:
+                with timer.phase('convert'), Image.open(input_file) as img:
                     img.save(output_path)
                     
             # Handle document conversions
             elif input_ext in self.SUPPORTED_DOCUMENT_FORMATS and output_format in self.SUPPORTED_DOCUMENT_FORMATS:
                 # For now, just copy text-based files
                 if input_ext in ['txt', 'md', 'json', 'csv'] and output_format in ['txt', 'md', 'json', 'csv']:
-                    shutil.copy2(input_file, output_path)
+                    with timer.phase('convert'):
+                        fastio.fast_copy(input_file, output_path)
                 else:
                     return False, f"Document conversion from {input_ext} to {output_format} not implemented yet"
             
@@ -279,6 +727,7 @@ class FileOperations:
             return True, success_msg
             
         except Exception as e:
+            metrics.note_error(e)
             error_msg = f"Failed to convert file {input_file}: {str(e)}"
             logger.error(error_msg)
             return False, error_msg
@@ -0,0 +1,362 @@
+## headless.py
+
+"""Runs a manifest of transfers and conversions without the web UI.
+
+    colabdrive-run manifest.yaml --workers 4
+
+A manifest lists steps; each has a ``type``, an optional ``id`` and the
+arguments of that type. Steps run in parallel unless one depends on another,
+either explicitly through ``after: [id, ...]`` or by referencing its output
+as ``{id}`` in an argument::
+
+    workers: 4
+    steps:
+      - id: base
+        type: huggingface
+        repo: stabilityai/stable-diffusion-xl-base-1.0
+        file: sd_xl_base_1.0.safetensors
+      - id: fp16
+        type: convert
+        input: "{base}"
+        format: safetensors
+        dtype: fp16
+      - type: drive_upload
+        file: "{fp16}"
+        destination: My Drive/models/sdxl
+
+Step types: huggingface (``file`` for one file, otherwise the whole repo),
+civitai, git, drive_upload, drive_download, drive_pack, fetch (copy off the
+Drive mount), s3_upload and convert. Nothing here imports gradio.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from colabdrive.logger import logger
+
+REFERENCE = re.compile(r'\{([A-Za-z0-9_.-]+)\}')
+# Arguments each step type cannot run without; ``plan`` rejects steps missing them.
+REQUIRED_ARGS: Dict[str, Tuple[str, ...]] = {
+    'huggingface': ('repo',),
+    'civitai': ('url',),
+    'git': ('url',),
+    'drive_upload': ('file',),
+    'drive_download': ('file',),
+    'drive_pack': ('sources',),
+    's3_upload': ('file', 'bucket'),
+    'fetch': ('path',),
+    'convert': ('input', 'format'),
+}
+
+
+class StepError(Exception):
+    """A step failed or its manifest entry is invalid."""
+
+
+class Step:
+    """One manifest entry and, once run, its outcome."""
+
+    def __init__(self, index: int, spec: Dict[str, Any]) -> None:
+        if 'type' not in spec:
+            raise StepError(f"Step {index + 1} has no type")
+        self.spec = dict(spec)
+        self.type = self.spec.pop('type')
+        self.id = str(self.spec.pop('id', f"{self.type}-{index + 1}"))
+        after = self.spec.pop('after', [])
+        self.after = set([after] if isinstance(after, str) else after)
+        for value in self.spec.values():
+            for text in (value if isinstance(value, list) else [value]):
+                if isinstance(text, str):
+                    self.after.update(REFERENCE.findall(text))
+        self.status = 'pending'
+        self.output: Optional[str] = None
+        self.error: Optional[str] = None
+        self.seconds = 0.0
+        self.bytes = 0
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Reads a YAML or JSON manifest.
+
+    Raises:
+        ValueError: The file does not parse or its top level is not a mapping.
+    """
+    with open(path) as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        import yaml
+        try:
+            manifest = yaml.safe_load(text) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"Malformed YAML: {e}") from e
+    else:
+        manifest = json.loads(text)
+    if not isinstance(manifest, dict):
+        raise ValueError("The top level must be a mapping with a 'steps' list")
+    return manifest
+
+
+def plan(manifest: Dict[str, Any]) -> List[Step]:
+    """Builds steps and checks their types and required arguments, and that
+    dependencies exist and contain no cycles.
+
+    Returns:
+        List[Step]: The steps in a valid execution order.
+    """
+    specs = manifest.get('steps') or []
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+        raise StepError("'steps' must be a list of mappings")
+    steps = [Step(i, spec) for i, spec in enumerate(specs)]
+    by_id = {}
+    for step in steps:
+        if step.type not in REQUIRED_ARGS:
+            raise StepError(f"Step {step.id} has unknown type {step.type}; "
+                            f"expected one of {', '.join(sorted(REQUIRED_ARGS))}")
+        missing_args = [name for name in REQUIRED_ARGS[step.type] if step.spec.get(name) in (None, '')]
+        if missing_args:
+            raise StepError(f"Step {step.id} ({step.type}) is missing {', '.join(missing_args)}")
+        if step.id in by_id:
+            raise StepError(f"Duplicate step id: {step.id}")
+        by_id[step.id] = step
+    for step in steps:
+        missing = step.after - by_id.keys()
+        if missing:
+            raise StepError(f"Step {step.id} depends on unknown steps: {sorted(missing)}")
+
+    ordered: List[Step] = []
+    state: Dict[str, str] = {}
+
+    def visit(step: Step, chain: List[str]) -> None:
+        if state.get(step.id) == 'done':
+            return
+        if state.get(step.id) == 'visiting':
+            raise StepError(f"Dependency cycle: {' -> '.join(chain + [step.id])}")
+        state[step.id] = 'visiting'
+        for dependency in sorted(step.after):
+            visit(by_id[dependency], chain + [step.id])
+        state[step.id] = 'done'
+        ordered.append(step)
+
+    for step in steps:
+        visit(step, [])
+    return ordered
+
+
+class Runner:
+    """Executes planned steps on a thread pool as their dependencies complete."""
+
+    def __init__(self, workers: int = 4) -> None:
+        self.workers = max(1, workers)
+        self._components: Dict[str, Any] = {}
+        # Reentrant: the Drive component reuses the authentication of the files component.
+        self._lock = threading.RLock()
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], str]] = {
+            'huggingface': self._huggingface,
+            'civitai': self._civitai,
+            'git': self._git,
+            'drive_upload': self._drive_upload,
+            'drive_download': self._drive_download,
+            'drive_pack': self._drive_pack,
+            's3_upload': self._s3_upload,
+            'fetch': self._fetch,
+            'convert': self._convert,
+        }
+
+    def _component(self, name: str) -> Any:
+        """Creates each backend once, on first use, so unused backends need no credentials."""
+        with self._lock:
+            if name not in self._components:
+                if name == 'models':
+                    from colabdrive.model_operations import ModelOperations
+                    self._components[name] = ModelOperations()
+                elif name == 'files':
+                    from colabdrive.file_operations import FileOperations
+                    self._components[name] = FileOperations()
+                elif name == 'drive':
+                    from colabdrive.drive_operations import DriveOperations
+                    self._components[name] = DriveOperations(gauth=self._component('files').gauth)
+                elif name == 'cloud':
+                    from colabdrive.cloud_storage import CloudStorage
+                    self._components[name] = CloudStorage()
+            return self._components[name]
+
+    @staticmethod
+    def _check(result: Any, step_type: str) -> Any:
+        """Turns the repo's failure returns (None, False, (False, msg)) into StepError."""
+        if isinstance(result, tuple):
+            if not result[0]:
+                raise StepError(result[1])
+            return result
+        if not result:
+            raise StepError(f"{step_type} failed; see the log for details")
+        return result
+
+    def _huggingface(self, args: Dict[str, Any]) -> str:
+        models = self._component('models')
+        if args.get('file'):
+            return self._check(models.download_from_huggingface(args['repo'], args['file']), 'huggingface')
+        return self._check(models.download_huggingface_repo(
+            args['repo'], args.get('revision', 'main'), args.get('include')), 'huggingface')
+
+    def _civitai(self, args: Dict[str, Any]) -> str:
+        return self._check(self._component('models').download_civitai_model(args['url']), 'civitai')
+
+    def _git(self, args: Dict[str, Any]) -> str:
+        return self._check(self._component('models').clone_github_repo(args['url']), 'git')
+
+    def _drive_upload(self, args: Dict[str, Any]) -> str:
+        files = self._component('files')
+        self._check(files.upload_file(args['file'], args.get('destination'), args.get('compress'),
+                                      args.get('if_exists')), 'drive_upload')
+        return args['file']
+
+    def _drive_download(self, args: Dict[str, Any]) -> str:
+        _, message = self._check(self._component('files').download_file(
+            args['file'], args.get('destination')), 'drive_download')
+        return message
+
+    def _drive_pack(self, args: Dict[str, Any]) -> str:
+        sources = args['sources'] if isinstance(args['sources'], list) else [args['sources']]
+        _, message = self._check(self._component('files').upload_packed(
+            sources, args.get('destination'), args.get('name'),
+            workers=args.get('workers', 4)), 'drive_pack')
+        return message
+
+    def _s3_upload(self, args: Dict[str, Any]) -> str:
+        self._check(self._component('cloud').upload_to_s3(args['file'], args['bucket'],
+                                                          args.get('compress')), 's3_upload')
+        return f"s3://{args['bucket']}/{os.path.basename(args['file'])}"
+
+    def _fetch(self, args: Dict[str, Any]) -> str:
+        return self._check(self._component('drive').fetch_to_local(args['path'], args.get('destination')),
+                           'fetch')
+
+    def _convert(self, args: Dict[str, Any]) -> str:
+        files = self._component('files')
+        output_format = args['format'].lower().strip('.')
+        output_dir = args.get('output_dir') or files.converted_dir
+        self._check(files.convert_file(args['input'], output_format, output_dir,
+                                       dtype=args.get('dtype'),
+                                       max_shard_size=args.get('max_shard_size')), 'convert')
+        base_name = os.path.splitext(os.path.basename(args['input']))[0]
+        output = os.path.join(output_dir, f"{base_name}.{output_format}")
+        index = f"{output}.index.json"
+        return index if not os.path.exists(output) and os.path.exists(index) else output
+
+    @staticmethod
+    def _resolve(value: Any, outputs: Dict[str, str]) -> Any:
+        """Substitutes ``{id}`` references with the outputs of earlier steps."""
+        if isinstance(value, list):
+            return [Runner._resolve(item, outputs) for item in value]
+        if isinstance(value, str):
+            return REFERENCE.sub(lambda m: outputs[m.group(1)], value)
+        return value
+
+    def _execute(self, step: Step, outputs: Dict[str, str]) -> None:
+        handler = self.handlers.get(step.type)
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise StepError(f"Unknown step type {step.type}")
+            args = {key: self._resolve(value, outputs) for key, value in step.spec.items()}
+            step.output = handler(args)
+            step.status = 'ok'
+            step.bytes = _size_of(step.output) or _size_of(args.get('file') or args.get('input'))
+        except Exception as e:
+            step.status = 'failed'
+            step.error = str(e) if isinstance(e, StepError) else f"{type(e).__name__}: {e}"
+            logger.error(f"Step {step.id} failed: {step.error}")
+        step.seconds = time.perf_counter() - start
+
+    def run(self, steps: List[Step]) -> List[Step]:
+        """Runs every step whose dependencies succeeded; the rest are marked skipped."""
+        by_id = {step.id: step for step in steps}
+        outputs: Dict[str, str] = {}
+        waiting = list(steps)
+        running: Dict[concurrent.futures.Future, Step] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while waiting or running:
+                for step in list(waiting):
+                    dependencies = [by_id[d] for d in step.after]
+                    if any(d.status in ('failed', 'skipped') for d in dependencies):
+                        step.status = 'skipped'
+                        step.error = 'dependency failed'
+                        waiting.remove(step)
+                    elif all(d.status == 'ok' for d in dependencies):
+                        waiting.remove(step)
+                        step.status = 'running'
+                        logger.info(f"Starting step {step.id} ({step.type})")
+                        running[executor.submit(self._execute, step, dict(outputs))] = step
+                if not running:
+                    continue
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    if step.status == 'ok':
+                        outputs[step.id] = step.output
+        return steps
+
+
+def _size_of(path: Any) -> int:
+    """Total size of a local file or directory, 0 if ``path`` is not local."""
+    if not isinstance(path, str) or not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(path) for name in files)
+
+
+def summarize(steps: List[Step], seconds: float) -> str:
+    """Formats a per-step table with throughput, followed by totals."""
+    lines = [f"{'step':24} {'type':13} {'status':8} {'time':>8} {'size':>10} {'MB/s':>8}"]
+    for step in steps:
+        rate = step.bytes / 2 ** 20 / step.seconds if step.seconds and step.bytes else 0
+        lines.append(f"{step.id[:24]:24} {step.type:13} {step.status:8} {step.seconds:7.1f}s "
+                     f"{step.bytes / 2 ** 20:8.1f}MB {rate:8.1f}")
+        if step.error:
+            lines.append(f"    {step.error}")
+    total_bytes = sum(step.bytes for step in steps if step.status == 'ok')
+    counts = {status: sum(1 for step in steps if step.status == status)
+              for status in ('ok', 'failed', 'skipped')}
+    lines.append(f"{counts['ok']} ok, {counts['failed']} failed, {counts['skipped']} skipped; "
+                 f"{total_bytes / 2 ** 20:.1f} MB in {seconds:.1f}s "
+                 f"({total_bytes / 2 ** 20 / seconds if seconds else 0:.1f} MB/s overall)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='colabdrive-run', description=__doc__.split('\n\n')[0])
+    parser.add_argument('manifest', help='YAML or JSON manifest file')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Steps run in parallel (default: manifest "workers" or 4)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the execution plan and exit')
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = load_manifest(args.manifest)
+        steps = plan(manifest)
+    except (OSError, ValueError, StepError) as e:
+        print(f"Invalid manifest: {e}", file=sys.stderr)
+        return 2
+
+    if args.dry_run:
+        for step in steps:
+            after = f" after {', '.join(sorted(step.after))}" if step.after else ""
+            print(f"{step.id} ({step.type}){after}")
+        return 0
+
+    start = time.perf_counter()
+    Runner(args.workers or manifest.get('workers') or 4).run(steps)
+    print(summarize(steps, time.perf_counter() - start))
+    return 0 if all(step.status == 'ok' for step in steps) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
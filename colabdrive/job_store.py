@@ -0,0 +1,336 @@
+## job_store.py
+
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    args TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    worker INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+JOB_STATUSES = ('queued', 'running', 'ok', 'failed', 'cancelled')
+# A job whose worker died this many times is failed instead of queued again,
+# so a job that crashes its worker (e.g. out of memory) cannot loop forever.
+MAX_ATTEMPTS = 2
+# Finished jobs older than this are deleted when a pool starts.
+KEEP_SECONDS = 7 * 24 * 60 * 60
+# A worker exiting within STARTUP_SECONDS of being started counts as a failed start.
+# Failed starts are retried after RESTART_DELAY, doubling up to MAX_RESTART_DELAY,
+# and the worker is given up after MAX_FAILED_STARTS of them in a row.
+STARTUP_SECONDS = 10.0
+RESTART_DELAY = 2.0
+MAX_RESTART_DELAY = 60.0
+MAX_FAILED_STARTS = 5
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Queue of transfer and conversion jobs in a local SQLite file.
+
+    The store is the only state shared between the web UI and the worker
+    processes: handlers add jobs and read their status, workers claim queued
+    jobs one at a time and record the outcome. Jobs are the step types of
+    ``colabdrive.headless`` with the same arguments.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        """
+        Args:
+            db_path (str, optional): SQLite file; defaults to the ``job_store_db`` setting.
+        """
+        self.db_path = db_path or config.get('job_store_db')
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so each process opens its own.
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # Autocommit; claims open their own write transaction.
+            self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['args'] = json.loads(job['args'])
+        return job
+
+    def submit(self, kind: str, args: Dict[str, Any]) -> int:
+        """Queues a job.
+
+        Args:
+            kind (str): Step type, e.g. "huggingface" or "convert".
+            args (Dict[str, Any]): Step arguments; must be JSON serializable.
+
+        Returns:
+            int: The job ID.
+        """
+        with self._lock:
+            cursor = self._connect().execute(
+                "INSERT INTO jobs (kind, args, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (kind, json.dumps(args), time.time()))
+        logger.info(f"Queued job {cursor.lastrowid} ({kind})")
+        return cursor.lastrowid
+
+    def claim(self, worker: int) -> Optional[Dict[str, Any]]:
+        """Marks the oldest queued job as running on ``worker``.
+
+        The write lock taken by ``BEGIN IMMEDIATE`` makes the claim atomic across
+        processes, so no two workers run the same job.
+
+        Returns:
+            Optional[Dict[str, Any]]: The claimed job, None if the queue is empty.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                                 "started_at = ? WHERE id = ?", (worker, time.time(), row['id']))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return self._row(row) if row is not None else None
+
+    def finish(self, job_id: int, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Records the outcome of a running job; ``error`` marks it failed."""
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ('failed' if error is not None else 'ok', result, error, time.time(), job_id))
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a job that has not started yet.
+
+        Returns:
+            bool: True if the job was still queued.
+        """
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id))
+        return cursor.rowcount > 0
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The newest jobs first."""
+        with self._lock:
+            rows = self._connect().execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status; also published as a gauge."""
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({status: count for status, count in rows})
+        for status, count in counts.items():
+            metrics.registry.set('colabdrive_jobs', count, status=status)
+        return counts
+
+    def recover(self) -> int:
+        """Requeues running jobs whose worker process has exited, and prunes old jobs.
+
+        Returns:
+            int: Number of jobs requeued or failed.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute("SELECT id, worker, attempts FROM jobs WHERE status = 'running'").fetchall()
+            recovered = 0
+            for row in rows:
+                if _pid_alive(row['worker']):
+                    continue
+                if row['attempts'] >= MAX_ATTEMPTS:
+                    conn.execute("UPDATE jobs SET status = 'failed', error = 'worker exited', finished_at = ? "
+                                 "WHERE id = ? AND status = 'running'", (now, row['id']))
+                else:
+                    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ? "
+                                 "AND status = 'running'", (row['id'],))
+                logger.warning(f"Worker {row['worker']} exited while running job {row['id']}")
+                recovered += 1
+            conn.execute("DELETE FROM jobs WHERE status IN ('ok', 'failed', 'cancelled') AND finished_at < ?",
+                         (now - KEEP_SECONDS,))
+        return recovered
+
+
+def _worker_main(db_path: str, poll_interval: float, parent: int) -> None:
+    """Worker process: runs queued jobs one at a time until SIGTERM or its parent exits.
+
+    Stopping is signalled rather than shared through a multiprocessing
+    primitive, whose lock a killed worker could leave held.
+    """
+    stopping = []
+    # Ctrl+C in the notebook or terminal is for the UI process, which stops the pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The current job is finished before exiting.
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    from colabdrive.headless import Runner, StepError
+
+    store = JobStore(db_path)
+    runner = Runner(workers=1)
+    pid = os.getpid()
+    while not stopping and os.getppid() == parent:
+        job = store.claim(pid)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        logger.info(f"Worker {pid} running job {job['id']} ({job['kind']})")
+        handler = runner.handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise StepError(f"Unknown job kind {job['kind']}")
+            result = handler(job['args'])
+            store.finish(job['id'], result=str(result))
+        except Exception as e:
+            error = str(e) if isinstance(e, StepError) else f"{type(e).__name__}: {e}"
+            logger.error(f"Job {job['id']} failed: {error}")
+            store.finish(job['id'], error=error)
+
+
+class WorkerPool:
+    """Worker processes that execute the jobs of a ``JobStore``.
+
+    Jobs run outside the web server's process, so a conversion holding the
+    GIL or a transfer saturating a thread pool does not slow down request
+    handling. Workers are started with ``spawn`` because the UI process has
+    threads running, and a supervisor thread replaces any worker that dies,
+    requeueing the job it was running. Workers that die right after starting
+    (e.g. a broken import) are restarted with backoff and eventually given up.
+    """
+
+    def __init__(self, workers: Optional[int] = None, db_path: Optional[str] = None,
+                 poll_interval: float = 0.5) -> None:
+        """
+        Args:
+            workers (int, optional): Worker processes; defaults to the ``job_workers`` setting.
+            db_path (str, optional): Job store file; defaults to the ``job_store_db`` setting.
+            poll_interval (float): Seconds an idle worker waits before checking the queue again.
+        """
+        self.workers = max(1, workers or config.get('job_workers') or 1)
+        self.store = JobStore(db_path)
+        self.poll_interval = poll_interval
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = threading.Event()
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._started: List[float] = []
+        self._failed_starts: List[int] = []
+        self._restart_at: List[Optional[float]] = []
+        self._supervisor: Optional[threading.Thread] = None
+
+    def _spawn(self) -> multiprocessing.Process:
+        process = self._context.Process(target=_worker_main, name='colabdrive-worker', daemon=True,
+                                        args=(self.store.db_path, self.poll_interval, os.getpid()))
+        process.start()
+        return process
+
+    def start(self) -> None:
+        if self._supervisor is not None:
+            return
+        self._stop.clear()
+        self.store.recover()
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        self._started = [time.monotonic()] * self.workers
+        self._failed_starts = [0] * self.workers
+        self._restart_at = [None] * self.workers
+        self._supervisor = threading.Thread(target=self._supervise, name='colabdrive-worker-supervisor',
+                                            daemon=True)
+        self._supervisor.start()
+        logger.info(f"Started {self.workers} job workers on {self.store.db_path}")
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(1.0):
+            now = time.monotonic()
+            for i, process in enumerate(self._processes):
+                if process is None or process.is_alive():
+                    continue
+                if self._restart_at[i] is None:
+                    self.store.recover()
+                    if now - self._started[i] < STARTUP_SECONDS:
+                        self._failed_starts[i] += 1
+                    else:
+                        self._failed_starts[i] = 0
+                    failed = self._failed_starts[i]
+                    if failed >= MAX_FAILED_STARTS:
+                        logger.error(f"Job worker exited with code {process.exitcode} right after starting "
+                                     f"{failed} times in a row; not restarting it")
+                        self._processes[i] = None
+                        continue
+                    delay = min(RESTART_DELAY * 2 ** (failed - 1), MAX_RESTART_DELAY) if failed else 0.0
+                    logger.warning(f"Job worker {process.pid} exited with code {process.exitcode}; "
+                                   f"restarting in {delay:.0f}s")
+                    self._restart_at[i] = now + delay
+                if now >= self._restart_at[i]:
+                    self._processes[i] = self._spawn()
+                    self._started[i] = now
+                    self._restart_at[i] = None
+
+    def alive(self) -> int:
+        """Number of worker processes running."""
+        return sum(1 for process in self._processes if process is not None and process.is_alive())
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Lets workers finish their current job, then terminates any still running after ``timeout``."""
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+            self._supervisor = None
+        processes = [process for process in self._processes if process is not None]
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        self._processes = []
+
+
+metrics.registry.help['colabdrive_jobs'] = 'Jobs in the job store by status.'
@@ -1,7 +1,79 @@
 ## logger.py
 
+import atexit
+import gzip
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import time
+from typing import Optional
+
+from colabdrive.config import config
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """File handler that rotates on size or age and gzips rotated files.
+
+    Rotated files are named ``app.log.1.gz``, ``app.log.2.gz``, ... and at most
+    ``backupCount`` of them are kept, so disk use stays bounded.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 interval: Optional[float] = 24 * 60 * 60) -> None:
+        """
+        Args:
+            filename (str): Path of the active log file.
+            max_bytes (int): Rotate once the file would grow past this size; 0 disables.
+            backup_count (int): Number of compressed rotated files to keep.
+            interval (float, optional): Rotate after this many seconds; None disables.
+        """
+        super().__init__(filename, mode='a', maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, destination: str) -> None:
+        """Gzips a rotated log file into place."""
+        with open(source, 'rb') as src, gzip.open(destination, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves line formatting to the writer thread.
+
+    The stock ``prepare`` formats and copies every record in the calling
+    thread; here only the message arguments are merged (so mutable arguments
+    are captured as they were) and the timestamp/level formatting happens in
+    the background. Package records reach no other handler, so the record is
+    reused rather than copied.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
 
 class Logger:
     """Logger class for setting up logging configuration."""
@@ -19,20 +91,38 @@ class Logger:
         self._setup_logging()
 
     def _setup_logging(self) -> None:
-        """Sets up the logging configuration."""
-        logging.basicConfig(
-            filename=self.log_file,
-            filemode='a',  # Append mode
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            level=self.level
+        """Sets up the logging configuration.
+
+        Records are put on an in-memory queue by the calling thread and written
+        by a single background thread, so transfer workers never wait on file I/O
+        or on each other for the handler lock.
+        """
+        package_logger = logging.getLogger('colabdrive')
+        package_logger.setLevel(self.level)
+        if any(isinstance(h, DeferredQueueHandler) for h in package_logger.handlers):
+            return
+
+        file_handler = CompressingRotatingFileHandler(
+            self.log_file,
+            max_bytes=config.get('log_max_bytes') or 0,
+            backup_count=config.get('log_backup_count') or 0,
+            interval=config.get('log_rotate_seconds')
         )
-        logging.info("Logging is set up.")
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(log_queue, file_handler,
+                                                       respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+        package_logger.addHandler(DeferredQueueHandler(log_queue))
+        # Keep package records out of the root logger so nothing is written twice.
+        package_logger.propagate = False
+        package_logger.info("Logging is set up.")
+
 
-    # Remove custom log methods since we're using standard logging
+Logger(os.environ.get('COLABDRIVE_LOG_FILE', config.get('log_file') or 'app.log'))
 
-# Create a logger instance with root logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-handler = logging.FileHandler('app.log')
-handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
+# Create a logger instance for the package
+logger = logging.getLogger('colabdrive')
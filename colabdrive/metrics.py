@@ -0,0 +1,295 @@
+## metrics.py
+
+import functools
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from colabdrive.logger import logger
+from colabdrive.config import config
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+SIZE_BUCKETS = tuple(1024 ** 2 * n for n in (1, 16, 128, 1024, 4096, 16384))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms.
+
+    Updates take one short lock, so recording a finished operation costs
+    microseconds and is safe from transfer worker threads.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.help: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Adds ``value`` to a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Sets a gauge."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DURATION_BUCKETS,
+                **labels: str) -> None:
+        """Records a histogram observation."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def render_prometheus(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, series in sorted(metrics.items()):
+                    if name in self.help:
+                        lines.append(f"# HELP {name} {self.help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for labels, value in sorted(series.items()):
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items(), key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (('le', _format_bound(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    inf_labels = labels + (('le', '+Inf'),)
+                    lines.append(f"{name}_bucket{_format_labels(inf_labels)} {histogram.total}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.total}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{key}="{_escape_label(str(value))}"' for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else repr(float(bound))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class EventLog:
+    """Appends sampled per-operation events to a JSON lines file.
+
+    Successful operations are written with probability ``sample_rate``; failures
+    are always written. Counters and histograms see every operation regardless.
+    """
+
+    def __init__(self, path: Optional[str], sample_rate: float = 1.0) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, event: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        if event.get('error') is None and random.random() >= self.sample_rate:
+            return
+        line = json.dumps(event, sort_keys=True) + "\n"
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to write metrics event: {e}")
+
+
+class OperationEvent:
+    """Mutable record of one operation, filled in while it runs."""
+
+    __slots__ = ('operation', 'backend', 'bytes', 'retries', 'error', 'start')
+
+    def __init__(self, operation: str, backend: str) -> None:
+        self.operation = operation
+        self.backend = backend
+        self.bytes = 0
+        self.retries = 0
+        self.error: Optional[str] = None
+        self.start = time.perf_counter()
+
+
+registry = MetricsRegistry()
+registry.help.update({
+    'colabdrive_operations_total': 'Completed operations by outcome.',
+    'colabdrive_bytes_total': 'Bytes moved by successful operations.',
+    'colabdrive_retries_total': 'Retried requests within operations.',
+    'colabdrive_errors_total': 'Failed operations by error class.',
+    'colabdrive_operation_duration_seconds': 'Wall time of operations.',
+    'colabdrive_operation_bytes': 'Size of successful operations.',
+})
+event_log = EventLog(
+    os.environ.get('COLABDRIVE_METRICS_EVENTS', config.get('metrics_events_file')),
+    float(os.environ.get('COLABDRIVE_METRICS_SAMPLE_RATE', config.get('metrics_sample_rate') or 1.0))
+)
+_current = threading.local()
+
+
+def record(event: OperationEvent) -> None:
+    """Publishes a finished operation to the registry and the event log."""
+    duration = time.perf_counter() - event.start
+    status = 'error' if event.error else 'ok'
+    labels = {'operation': event.operation, 'backend': event.backend}
+    registry.inc('colabdrive_operations_total', status=status, **labels)
+    registry.observe('colabdrive_operation_duration_seconds', duration, **labels)
+    if event.retries:
+        registry.inc('colabdrive_retries_total', event.retries, **labels)
+    if event.error:
+        registry.inc('colabdrive_errors_total', error_class=event.error, **labels)
+    elif event.bytes:
+        registry.inc('colabdrive_bytes_total', event.bytes, **labels)
+        registry.observe('colabdrive_operation_bytes', event.bytes, SIZE_BUCKETS, **labels)
+    event_log.write({
+        'ts': time.time(),
+        'operation': event.operation,
+        'backend': event.backend,
+        'bytes': event.bytes,
+        'duration': round(duration, 6),
+        'retries': event.retries,
+        'error': event.error,
+    })
+
+
+def _failed(result: Any) -> bool:
+    """Recognizes the repo's failure return values: False, None or (False, message)."""
+    if isinstance(result, tuple) and result:
+        return result[0] is False
+    return result is None or result is False
+
+
+def instrumented(operation: str, backend: str) -> Callable:
+    """Decorator that records an operation's duration, bytes, retries and outcome.
+
+    The wrapped function reports progress with ``add_bytes``/``add_retry`` and
+    failure causes with ``note_error``; a falsy return value counts as a failure.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            event = OperationEvent(operation, backend)
+            previous = getattr(_current, 'event', None)
+            _current.event = event
+            try:
+                result = fn(*args, **kwargs)
+                if _failed(result) and not event.error:
+                    event.error = 'OperationFailed'
+                return result
+            except BaseException as e:
+                event.error = type(e).__name__
+                raise
+            finally:
+                _current.event = previous
+                record(event)
+        return wrapper
+    return decorator
+
+
+def current_event() -> Optional[OperationEvent]:
+    """Returns the operation running on this thread, to hand to worker threads."""
+    return getattr(_current, 'event', None)
+
+
+def add_bytes(count: int) -> None:
+    """Adds to the byte count of the operation running on this thread."""
+    event = getattr(_current, 'event', None)
+    if event is not None:
+        event.bytes += count
+
+
+def add_retry() -> None:
+    """Counts a retried request against the operation running on this thread."""
+    event = getattr(_current, 'event', None)
+    if event is not None:
+        event.retries += 1
+
+
+def note_error(error: BaseException) -> None:
+    """Records why the operation running on this thread failed."""
+    event = getattr(_current, 'event', None)
+    if event is not None:
+        event.error = type(error).__name__
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = '127.0.0.1') -> Optional[ThreadingHTTPServer]:
+    """Serves ``/metrics`` in the Prometheus text format on a background thread.
+
+    Args:
+        port (int, optional): Port to listen on; defaults to the ``metrics_port`` setting.
+        host (str): Interface to bind.
+
+    Returns:
+        Optional[ThreadingHTTPServer]: The running server, or None if it could not start.
+    """
+    port = port if port is not None else config.get('metrics_port')
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info(f"Metrics endpoint listening on http://{host}:{server.server_address[1]}/metrics")
+        return server
+    except OSError as e:
+        logger.error(f"Failed to start metrics endpoint on port {port}: {e}")
+        return None
@@ -0,0 +1,248 @@
+## model_catalog.py
+
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive import fastio
+
+MODEL_EXTENSIONS = {'.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.gguf', '.onnx'}
+# Headers above this size are rejected as corrupt rather than read into memory.
+MAX_HEADER_BYTES = 100 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    source TEXT,
+    revision TEXT,
+    sha256 TEXT,
+    tensor_count INTEGER,
+    parameter_count INTEGER,
+    dtypes TEXT,
+    metadata TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_name ON models (name);
+"""
+
+COLUMNS = ('path', 'name', 'format', 'size', 'mtime', 'source', 'revision', 'sha256',
+           'tensor_count', 'parameter_count', 'dtypes', 'metadata', 'indexed_at')
+
+
+def _escape_like(text: str) -> str:
+    """Escapes LIKE wildcards so ``text`` matches literally with ``ESCAPE '\\'``."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def read_safetensors_header(path: str) -> Dict[str, Any]:
+    """Summarizes a safetensors file from its JSON header, without touching the weights.
+
+    Returns:
+        Dict[str, Any]: ``tensor_count``, ``parameter_count``, ``dtypes`` (tensors per
+        dtype) and ``metadata`` (the free-form ``__metadata__`` block).
+    """
+    with open(path, 'rb') as f:
+        (length,) = struct.unpack('<Q', f.read(8))
+        if length > MAX_HEADER_BYTES:
+            raise ValueError(f"Implausible safetensors header size {length} in {path}")
+        header = json.loads(f.read(length))
+    metadata = header.pop('__metadata__', {}) or {}
+    dtypes: Dict[str, int] = {}
+    parameters = 0
+    for tensor in header.values():
+        dtypes[tensor['dtype']] = dtypes.get(tensor['dtype'], 0) + 1
+        count = 1
+        for dim in tensor['shape']:
+            count *= dim
+        parameters += count
+    return {'tensor_count': len(header), 'parameter_count': parameters,
+            'dtypes': dtypes, 'metadata': metadata}
+
+
+class ModelCatalog:
+    """SQLite index of the model files under the model directory.
+
+    ``refresh`` only re-inspects files whose size or mtime changed, and
+    inspection reads safetensors headers only, so keeping the catalog current
+    costs one ``stat`` per file. Listing and searching never touch the files.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, root: Optional[str] = None) -> None:
+        """
+        Args:
+            db_path (str, optional): SQLite file; defaults to the ``model_catalog_db`` setting.
+            root (str, optional): Directory to index; defaults to the ``model_path`` setting.
+        """
+        self.db_path = db_path or config.get('model_catalog_db')
+        self.root = root or config.get('model_path')
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _inspect(self, path: str, size: int, mtime: float, with_hash: bool) -> Dict[str, Any]:
+        """Builds the catalog row for one file."""
+        extension = os.path.splitext(path)[1].lower()
+        row: Dict[str, Any] = {
+            'path': path, 'name': os.path.basename(path), 'format': extension.lstrip('.'),
+            'size': size, 'mtime': mtime, 'sha256': None, 'tensor_count': None,
+            'parameter_count': None, 'dtypes': None, 'metadata': None, 'indexed_at': time.time(),
+        }
+        if extension == '.safetensors':
+            try:
+                summary = read_safetensors_header(path)
+                row.update(tensor_count=summary['tensor_count'],
+                           parameter_count=summary['parameter_count'],
+                           dtypes=json.dumps(summary['dtypes'], sort_keys=True),
+                           metadata=json.dumps(summary['metadata'], sort_keys=True))
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                logger.warning(f"Could not read safetensors header of {path}: {e}")
+        if with_hash:
+            row['sha256'] = fastio.hash_file(path, ('sha256',))['sha256']
+        return row
+
+    def _scan(self, root: str) -> Dict[str, Tuple[int, float]]:
+        """Returns size and mtime of every model file under ``root``."""
+        found: Dict[str, Tuple[int, float]] = {}
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in MODEL_EXTENSIONS:
+                            stat = entry.stat()
+                            found[entry.path] = (stat.st_size, stat.st_mtime)
+            except OSError as e:
+                logger.warning(f"Skipping unreadable directory while indexing models: {e}")
+        return found
+
+    def refresh(self, with_hash: bool = False) -> Dict[str, int]:
+        """Brings the catalog up to date with the model directory.
+
+        Args:
+            with_hash (bool): Also compute SHA-256 of new or changed files.
+
+        Returns:
+            Dict[str, int]: Number of files ``added``, ``updated``, ``removed`` and ``unchanged``.
+        """
+        root = os.path.abspath(self.root)
+        found = self._scan(root) if os.path.isdir(root) else {}
+        with self._lock:
+            conn = self._connect()
+            known = {row['path']: (row['size'], row['mtime'])
+                     for row in conn.execute('SELECT path, size, mtime FROM models')}
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        rows = []
+        for path, (size, mtime) in found.items():
+            if known.get(path) == (size, mtime):
+                counts['unchanged'] += 1
+                continue
+            counts['updated' if path in known else 'added'] += 1
+            rows.append(self._inspect(path, size, mtime, with_hash))
+        removed = [(path,) for path in known if path not in found]
+        counts['removed'] = len(removed)
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._upsert(conn, rows)
+                conn.executemany('DELETE FROM models WHERE path = ?', removed)
+        if rows or removed:
+            logger.info(f"Model catalog refreshed: {counts}")
+        return counts
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> None:
+        """Inserts or updates rows, keeping any recorded source and revision."""
+        fields = [c for c in COLUMNS if c not in ('source', 'revision')]
+        updates = ', '.join(f"{c} = excluded.{c}" for c in fields if c != 'path')
+        conn.executemany(
+            f"INSERT INTO models ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))}) "
+            f"ON CONFLICT(path) DO UPDATE SET {updates}",
+            [tuple(row[c] for c in fields) for row in rows]
+        )
+
+    def record_download(self, path: str, source: str, revision: Optional[str] = None) -> None:
+        """Indexes a freshly downloaded file and remembers where it came from.
+
+        Args:
+            path (str): Local path of the downloaded file.
+            source (str): Origin such as a HuggingFace repo or CivitAI URL.
+            revision (str, optional): Branch, tag or commit of the source.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self._inspect(path, stat.st_size, stat.st_mtime, with_hash=False)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._upsert(conn, [row])
+                conn.execute('UPDATE models SET source = ?, revision = ? WHERE path = ?',
+                             (source, revision, path))
+
+    def list(self, limit: int = 200, offset: int = 0) -> List[Dict[str, Any]]:
+        """Returns catalog entries ordered by name."""
+        return self._query('SELECT * FROM models ORDER BY name LIMIT ? OFFSET ?', (limit, offset))
+
+    def search(self, query: str, format: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """Finds entries whose name, path, source or metadata contain ``query``.
+
+        Paths under the model directory are matched relative to it, so a query
+        does not match every file through the directory's own name.
+
+        Args:
+            query (str): Case-insensitive substring; ``%`` and ``_`` match literally.
+            format (str, optional): Restrict to a file format such as "safetensors".
+            limit (int): Maximum number of entries.
+        """
+        pattern = f"%{_escape_like(query.strip())}%"
+        prefix = os.path.join(os.path.abspath(self.root), '')
+        sql = ("SELECT * FROM models WHERE (name LIKE ?1 ESCAPE '\\' "
+               "OR (CASE WHEN substr(path, 1, length(?2)) = ?2 THEN substr(path, length(?2) + 1) "
+               "ELSE path END) LIKE ?1 ESCAPE '\\' "
+               "OR source LIKE ?1 ESCAPE '\\' OR metadata LIKE ?1 ESCAPE '\\')")
+        params: List[Any] = [pattern, prefix]
+        if format:
+            sql += ' AND format = ?'
+            params.append(format.lower().lstrip('.'))
+        sql += ' ORDER BY name LIMIT ?'
+        params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Returns the entry for one file, if indexed."""
+        rows = self._query('SELECT * FROM models WHERE path = ?', (os.path.abspath(path),))
+        return rows[0] if rows else None
+
+    def _query(self, sql: str, params: Tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            entry = dict(row)
+            for key in ('dtypes', 'metadata'):
+                entry[key] = json.loads(entry[key]) if entry[key] else {}
+            results.append(entry)
+        return results
+
+
+# Create a singleton instance; the database is opened on first use.
+catalog = ModelCatalog()
@@ -0,0 +1,184 @@
+## model_conversion.py
+
+import json
+import os
+import struct
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from colabdrive.logger import logger
+
+CHECKPOINT_FORMATS = ['ckpt', 'bin', 'pt', 'pth', 'safetensors']
+
+# safetensors dtype names and element sizes, keyed by the torch dtype's name.
+SAFETENSORS_DTYPES = {
+    'float64': ('F64', 8), 'float32': ('F32', 4), 'float16': ('F16', 2), 'bfloat16': ('BF16', 2),
+    'int64': ('I64', 8), 'int32': ('I32', 4), 'int16': ('I16', 2), 'int8': ('I8', 1),
+    'uint8': ('U8', 1), 'bool': ('BOOL', 1),
+    'float8_e4m3fn': ('F8_E4M3', 1), 'float8_e5m2': ('F8_E5M2', 1),
+}
+CAST_TARGETS = {'fp32': 'float32', 'fp16': 'float16', 'bf16': 'bfloat16'}
+
+
+def _torch():
+    try:
+        import torch
+    except ImportError as e:
+        raise RuntimeError("Model conversion needs PyTorch: pip install torch") from e
+    return torch
+
+
+class _TensorSource:
+    """Read-only, name-addressable view of a checkpoint's tensors.
+
+    Tensors are only materialized by ``get`` and are backed by a memory
+    mapping of the input file, so untouched weights never enter memory.
+    """
+
+    def __init__(self, path: str, allow_pickle: bool = False) -> None:
+        torch = _torch()
+        self.path = path
+        if path.endswith('.safetensors'):
+            from safetensors import safe_open
+            self._handle = safe_open(path, framework='pt')
+            self.names = list(self._handle.keys())
+            self._get: Callable[[str], Any] = self._handle.get_tensor
+            self._meta = {name: self._handle.get_slice(name) for name in self.names}
+            return
+        try:
+            state = torch.load(path, map_location='cpu', mmap=True, weights_only=not allow_pickle)
+        except RuntimeError as e:
+            if 'mmap' not in str(e):
+                raise
+            # Legacy (pre-zipfile) checkpoints cannot be mapped and are read in full.
+            logger.warning(f"{path} uses the legacy format; loading it without mmap")
+            state = torch.load(path, map_location='cpu', weights_only=not allow_pickle)
+        # Lightning / original Stable Diffusion checkpoints nest the weights.
+        while isinstance(state, dict) and isinstance(state.get('state_dict'), dict):
+            state = state['state_dict']
+        self._tensors = {name: value for name, value in state.items() if torch.is_tensor(value)}
+        skipped = len(state) - len(self._tensors)
+        if skipped:
+            logger.info(f"Skipping {skipped} non-tensor entries in {path}")
+        self.names = list(self._tensors)
+        self._get = self._tensors.__getitem__
+
+    def info(self, name: str) -> Tuple[str, List[int]]:
+        """Returns a tensor's torch dtype name and shape without loading its data."""
+        if hasattr(self, '_meta'):
+            meta = self._meta[name]
+            dtype = {v[0]: k for k, v in SAFETENSORS_DTYPES.items()}[meta.get_dtype()]
+            return dtype, list(meta.get_shape())
+        tensor = self._tensors[name]
+        return str(tensor.dtype).replace('torch.', ''), list(tensor.shape)
+
+    def get(self, name: str):
+        return self._get(name)
+
+
+def _target_dtype(dtype: str, cast: Optional[str]) -> str:
+    """Only floating-point tensors are cast; integer and bool tensors keep their type."""
+    if cast and dtype in ('float64', 'float32', 'float16', 'bfloat16'):
+        return CAST_TARGETS[cast]
+    return dtype
+
+
+def _plan(source: _TensorSource, cast: Optional[str],
+          max_shard_size: Optional[int]) -> List[List[Tuple[str, str, List[int], int]]]:
+    """Splits tensors into shards of at most ``max_shard_size`` bytes (one shard if None)."""
+    shards: List[List[Tuple[str, str, List[int], int]]] = [[]]
+    shard_bytes = 0
+    for name in source.names:
+        dtype, shape = source.info(name)
+        dtype = _target_dtype(dtype, cast)
+        if dtype not in SAFETENSORS_DTYPES:
+            raise ValueError(f"Tensor {name} has dtype {dtype}, which safetensors cannot store")
+        nbytes = SAFETENSORS_DTYPES[dtype][1]
+        for dim in shape:
+            nbytes *= dim
+        if max_shard_size and shards[-1] and shard_bytes + nbytes > max_shard_size:
+            shards.append([])
+            shard_bytes = 0
+        shards[-1].append((name, dtype, shape, nbytes))
+        shard_bytes += nbytes
+    return shards
+
+
+def _write_shard(path: str, source: _TensorSource,
+                 tensors: List[Tuple[str, str, List[int], int]], metadata: Dict[str, str]) -> int:
+    """Writes one safetensors file a tensor at a time; returns bytes of tensor data written.
+
+    The header is computed up front from shapes and dtypes, so each tensor
+    can be cast, written and released before the next is loaded.
+    """
+    torch = _torch()
+    header: Dict[str, Any] = {'__metadata__': metadata}
+    offset = 0
+    for name, dtype, shape, nbytes in tensors:
+        header[name] = {'dtype': SAFETENSORS_DTYPES[dtype][0], 'shape': shape,
+                        'data_offsets': [offset, offset + nbytes]}
+        offset += nbytes
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Pad so tensor data starts 8-byte aligned, as the format recommends.
+    encoded += b' ' * (-len(encoded) % 8)
+
+    temp_path = path + '.part'
+    with open(temp_path, 'wb') as f:
+        f.write(struct.pack('<Q', len(encoded)))
+        f.write(encoded)
+        for name, dtype, _, nbytes in tensors:
+            tensor = source.get(name).to(getattr(torch, dtype)).contiguous()
+            data = tensor.reshape(-1).view(torch.uint8).numpy()
+            if data.nbytes != nbytes:
+                raise IOError(f"Tensor {name} produced {data.nbytes} bytes, expected {nbytes}")
+            f.write(memoryview(data))
+            del tensor, data
+    os.replace(temp_path, path)
+    return offset
+
+
+def convert_checkpoint(input_path: str, output_dir: str, cast: Optional[str] = None,
+                       max_shard_size: Optional[int] = None, allow_pickle: bool = False) -> List[str]:
+    """Converts a PyTorch checkpoint (or safetensors file) to safetensors.
+
+    Tensors are read from a memory-mapped input and written one at a time, so
+    peak memory is roughly the largest single tensor rather than the model.
+
+    Args:
+        input_path (str): .ckpt, .bin, .pt, .pth or .safetensors file.
+        output_dir (str): Where to write the result.
+        cast (str, optional): "fp16", "bf16" or "fp32" to cast floating-point tensors.
+        max_shard_size (int, optional): Split the output into files of at most this
+            many bytes, with a ``.safetensors.index.json`` weight map.
+        allow_pickle (bool): Allow arbitrary pickled objects in the checkpoint.
+            Only enable this for files from a trusted source.
+
+    Returns:
+        List[str]: Paths of the files written (shards first, then any index).
+    """
+    if cast and cast not in CAST_TARGETS:
+        raise ValueError(f"Unsupported dtype {cast}; choose one of {sorted(CAST_TARGETS)}")
+    source = _TensorSource(input_path, allow_pickle=allow_pickle)
+    shards = _plan(source, cast, max_shard_size)
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    metadata = {'format': 'pt'}
+
+    if len(shards) == 1:
+        path = os.path.join(output_dir, f"{base_name}.safetensors")
+        _write_shard(path, source, shards[0], metadata)
+        logger.info(f"Converted {input_path} to {path}")
+        return [path]
+
+    written = []
+    weight_map: Dict[str, str] = {}
+    total = 0
+    for index, tensors in enumerate(shards, start=1):
+        shard_name = f"{base_name}-{index:05d}-of-{len(shards):05d}.safetensors"
+        total += _write_shard(os.path.join(output_dir, shard_name), source, tensors, metadata)
+        weight_map.update({name: shard_name for name, _, _, _ in tensors})
+        written.append(os.path.join(output_dir, shard_name))
+    index_path = os.path.join(output_dir, f"{base_name}.safetensors.index.json")
+    with open(index_path, 'w') as f:
+        json.dump({'metadata': {'total_size': total}, 'weight_map': weight_map}, f, indent=2)
+    written.append(index_path)
+    logger.info(f"Converted {input_path} into {len(shards)} shards in {output_dir}")
+    return written
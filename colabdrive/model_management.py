@@ -1,32 +1,81 @@
 ## model_management.py
 
-from typing import Optional
+import os
+from typing import Any, Dict, List, Optional
 from colabdrive.logger import logger
+from colabdrive.model_catalog import ModelCatalog, catalog
 
 class ModelManagement:
     """Class for loading and managing models from HuggingFace and CivitAI."""
 
-    def __init__(self) -> None:
-        """Initializes the ModelManagement class."""
+    def __init__(self, model_catalog: Optional[ModelCatalog] = None) -> None:
+        """Initializes the ModelManagement class.
+
+        Args:
+            model_catalog (ModelCatalog, optional): Catalog to use; defaults to the shared one.
+        """
         self.model = None
-        logger.log_info("ModelManagement initialized")
+        self.catalog = model_catalog or catalog
+        logger.info("ModelManagement initialized")
 
     def manage_model(self, model_id: str) -> bool:
         """
-        Manages a model by its ID (e.g., for CivitAI).
+        Adds a model to the catalog, or confirms it is already there.
 
         Args:
-            model_id (str): The ID of the model to manage.
+            model_id (str): Path of a model file, or the name of a catalogued model.
 
         Returns:
-            bool: True if management is successful, False otherwise.
+            bool: True if the model is in the catalog, False otherwise.
         """
         try:
-            # Placeholder for model management logic
-            logger.log_info(f"Managing model with ID: {model_id}")
-            # Implement actual management logic here
-            logger.log_info(f"Model management successful for ID: {model_id}")
-            return True
+            if os.path.isfile(model_id):
+                if self.catalog.get(model_id) is None:
+                    self.catalog.record_download(model_id, source='local')
+                logger.info(f"Model catalogued: {model_id}")
+                return True
+            if any(entry['name'] == model_id for entry in self.catalog.search(model_id)):
+                return True
+            logger.error(f"Model not found: {model_id}")
+            return False
         except Exception as e:
-            logger.log_error(f"Failed to manage model {model_id}: {e}")
+            logger.error(f"Failed to manage model {model_id}: {e}")
             return False
+
+    def refresh_catalog(self, with_hash: bool = False) -> Dict[str, int]:
+        """Re-indexes model files that were added, changed or removed since the last refresh.
+
+        Args:
+            with_hash (bool): Also compute SHA-256 of new or changed files.
+
+        Returns:
+            Dict[str, int]: Counts of added, updated, removed and unchanged files.
+        """
+        try:
+            return self.catalog.refresh(with_hash=with_hash)
+        except Exception as e:
+            logger.error(f"Failed to refresh model catalog: {e}")
+            return {}
+
+    def list_models(self, limit: int = 200, offset: int = 0) -> List[Dict[str, Any]]:
+        """Lists catalogued models by name without opening any model file."""
+        try:
+            return self.catalog.list(limit=limit, offset=offset)
+        except Exception as e:
+            logger.error(f"Failed to list models: {e}")
+            return []
+
+    def search_models(self, query: str, format: Optional[str] = None,
+                      limit: int = 200) -> List[Dict[str, Any]]:
+        """Searches catalogued models by name, path, source or header metadata.
+
+        Args:
+            query (str): Case-insensitive substring; empty lists everything.
+            format (str, optional): Restrict to a file format such as "safetensors".
+            limit (int): Maximum number of results.
+        """
+        try:
+            return self.catalog.search(query or '', format=format, limit=limit)
+        except Exception as e:
+            logger.error(f"Failed to search models: {e}")
+            return []
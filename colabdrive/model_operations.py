@@ -1,10 +1,13 @@
+import fnmatch
 import os
 import requests
-from typing import Optional
-from huggingface_hub import snapshot_download
+from typing import Callable, List, Optional, Tuple
+from huggingface_hub import HfApi, snapshot_download
 from git import Repo
 from colabdrive.logger import logger
 from colabdrive.config import config
+from colabdrive import disk_space, metrics, profiling, throttle
+from colabdrive.model_catalog import MODEL_EXTENSIONS, catalog
 
 class ModelOperations:
     """Class for handling model downloads from various sources."""
@@ -14,7 +17,13 @@ class ModelOperations:
         self.is_colab = self._check_colab_environment()
         self.default_path = config.get("model_path")
         os.makedirs(self.default_path, exist_ok=True)
+        mount_point = config.get("drive_mount_point")
+        # Models kept on the mounted Drive are the user's copies, not a cache.
+        if not (mount_point and os.path.abspath(self.default_path).startswith(mount_point)):
+            disk_space.ledger.add_cache_dir(self.default_path)
         self.chunk_size = 8192
+        self.stream_chunk_size = 1024 * 1024
+        self.hf_endpoint = os.environ.get("HF_ENDPOINT", "https://huggingface.co").rstrip('/')
         logger.info(f"Model operations initialized with path: {self.default_path}")
         
     def _check_colab_environment(self) -> bool:
@@ -26,57 +35,226 @@ class ModelOperations:
             logger.info("Not running in Colab environment")
             return False
             
-    def download_from_huggingface(self, model_name: str, file_name: str) -> Optional[str]:
-        """Download a specific file from HuggingFace."""
+    @metrics.instrumented('download_from_huggingface', 'huggingface')
+    @profiling.profiled('download_from_huggingface')
+    def download_from_huggingface(self, model_name: str, file_name: str,
+                                  stream_to=None) -> Optional[str]:
+        """Download a specific file from HuggingFace.
+
+        Args:
+            model_name (str): Name of the model/repo on HuggingFace
+            file_name (str): Name of file to download
+            stream_to (DriveTarget | S3Target, optional): Remote destination. When given,
+                the download is piped straight into an upload without touching local disk.
+
+        Returns:
+            Optional[str]: Local path, or remote location when streaming, None on failure
+        """
         try:
-            base_url = f"https://huggingface.co/{model_name}/resolve/main/{file_name}"
-            destination_path = os.path.join(self.default_path, file_name)
-            
-            response = requests.get(base_url, stream=True)
-            if response.status_code == 200:
+            base_url = f"{self.hf_endpoint}/{model_name}/resolve/main/{file_name}"
+            timer = profiling.current()
+
+            def consume(response: requests.Response) -> Tuple[Optional[str], int]:
+                if response.status_code != 200:
+                    logger.error(f"Failed to download from HuggingFace: {response.status_code}")
+                    return None, 0
+                if stream_to is not None:
+                    location, streamed = self._stream_response(response, os.path.basename(file_name), stream_to)
+                    logger.info(f"Streamed {file_name} from HuggingFace to {location}")
+                    return location, streamed
+                destination_path = os.path.join(self.default_path, file_name)
                 total_size = int(response.headers.get('content-length', 0))
                 block_size = 1024
-                with open(destination_path, 'wb') as f:
-                    for data in response.iter_content(block_size):
-                        f.write(data)
+                with disk_space.ledger.reserve(destination_path, total_size), \
+                        open(destination_path, 'wb') as f:
+                    for data in timer.iterate('read', response.iter_content(block_size)):
+                        with timer.phase('write'):
+                            f.write(data)
+                    timer.sync(f)
+                size = os.path.getsize(destination_path)
+                metrics.add_bytes(size)
+                self._catalog(destination_path, f"huggingface:{model_name}", 'main')
                 logger.info(f"Downloaded {file_name} from HuggingFace")
-                return destination_path
-            else:
-                logger.error(f"Failed to download from HuggingFace: {response.status_code}")
-                return None
+                return destination_path, size
+
+            return self._download('huggingface', base_url, consume)
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Error downloading from HuggingFace: {e}")
             return None
-            
+
+    @metrics.instrumented('download_huggingface_repo', 'huggingface')
+    @profiling.profiled('download_huggingface_repo')
+    def download_huggingface_repo(self, model_name: str, revision: str = "main",
+                                  allow_patterns: Optional[List[str]] = None) -> Optional[str]:
+        """Download a whole repository (or the files matching patterns) from HuggingFace.
+
+        Args:
+            model_name (str): Name of the model/repo on HuggingFace
+            revision (str): Branch, tag or commit to download
+            allow_patterns (List[str], optional): Only download files matching these globs
+
+        Returns:
+            Optional[str]: Local directory of the snapshot, None on failure
+        """
+        try:
+            destination_path = os.path.join(self.default_path, model_name.split('/')[-1])
+            total_size = self._huggingface_repo_size(model_name, revision, allow_patterns)
+            with disk_space.ledger.reserve(destination_path, total_size), \
+                    profiling.current().phase('read'):
+                snapshot_download(repo_id=model_name, revision=revision, local_dir=destination_path,
+                                  allow_patterns=allow_patterns, endpoint=self.hf_endpoint)
+            for root, _, files in os.walk(destination_path):
+                for name in files:
+                    path = os.path.join(root, name)
+                    metrics.add_bytes(os.path.getsize(path))
+                    if os.path.splitext(name)[1].lower() in MODEL_EXTENSIONS:
+                        self._catalog(path, f"huggingface:{model_name}", revision)
+            logger.info(f"Downloaded {model_name}@{revision} from HuggingFace to {destination_path}")
+            return destination_path
+        except Exception as e:
+            metrics.note_error(e)
+            logger.error(f"Error downloading repository from HuggingFace: {e}")
+            return None
+
+    def _huggingface_repo_size(self, model_name: str, revision: str,
+                               allow_patterns: Optional[List[str]]) -> int:
+        """Total size of the repo files a snapshot would fetch; 0 if it cannot be determined."""
+        try:
+            info = HfApi(endpoint=self.hf_endpoint).model_info(model_name, revision=revision,
+                                                               files_metadata=True)
+        except Exception as e:
+            logger.warning(f"Could not size {model_name} before downloading: {e}")
+            return 0
+        return sum(sibling.size or 0 for sibling in info.siblings or []
+                   if not allow_patterns
+                   or any(fnmatch.fnmatch(sibling.rfilename, p) for p in allow_patterns))
+
+    @metrics.instrumented('clone_github_repo', 'github')
+    @profiling.profiled('clone_github_repo')
     def clone_github_repo(self, repo_url: str) -> Optional[str]:
         """Clone a GitHub repository."""
         try:
             repo_name = repo_url.split('/')[-1].replace('.git', '')
             destination_path = os.path.join(self.default_path, repo_name)
-            Repo.clone_from(repo_url, destination_path)
+            with profiling.current().phase('read'):
+                Repo.clone_from(repo_url, destination_path)
             logger.info(f"Cloned repository to {destination_path}")
             return destination_path
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Error cloning repository: {e}")
             return None
             
-    def download_civitai_model(self, model_url: str) -> Optional[str]:
-        """Download a model from CivitAI."""
+    @metrics.instrumented('download_civitai_model', 'civitai')
+    @profiling.profiled('download_civitai_model')
+    def download_civitai_model(self, model_url: str, stream_to=None) -> Optional[str]:
+        """Download a model from CivitAI.
+
+        Args:
+            model_url (str): URL of the model on CivitAI
+            stream_to (DriveTarget | S3Target, optional): Remote destination. When given,
+                the download is piped straight into an upload without touching local disk.
+
+        Returns:
+            Optional[str]: Local path, or remote location when streaming, None on failure
+        """
         try:
             model_name = model_url.split('/')[-1]
-            destination_path = os.path.join(self.default_path, model_name)
-            
-            response = requests.get(model_url, stream=True)
-            if response.status_code == 200:
-                with open(destination_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
+            timer = profiling.current()
+
+            def consume(response: requests.Response) -> Tuple[Optional[str], int]:
+                if response.status_code != 200:
+                    logger.error(f"Failed to download from CivitAI: {response.status_code}")
+                    return None, 0
+                if stream_to is not None:
+                    location, streamed = self._stream_response(response, model_name, stream_to)
+                    logger.info(f"Streamed model from CivitAI to {location}")
+                    return location, streamed
+                destination_path = os.path.join(self.default_path, model_name)
+                total_size = int(response.headers.get('content-length', 0))
+                with disk_space.ledger.reserve(destination_path, total_size), \
+                        open(destination_path, 'wb') as f:
+                    for chunk in timer.iterate('read', response.iter_content(chunk_size=8192)):
                         if chunk:
-                            f.write(chunk)
+                            with timer.phase('write'):
+                                f.write(chunk)
+                    timer.sync(f)
+                size = os.path.getsize(destination_path)
+                metrics.add_bytes(size)
+                self._catalog(destination_path, model_url)
                 logger.info(f"Downloaded model from CivitAI to {destination_path}")
-                return destination_path
-            else:
-                logger.error(f"Failed to download from CivitAI: {response.status_code}")
-                return None
+                return destination_path, size
+
+            return self._download('civitai', model_url, consume)
         except Exception as e:
+            metrics.note_error(e)
             logger.error(f"Error downloading from CivitAI: {e}")
             return None
+
+    def _catalog(self, path: str, source: str, revision: Optional[str] = None) -> None:
+        """Adds a downloaded file to the model catalog; failures only cost the entry."""
+        try:
+            catalog.record_download(path, source, revision)
+        except Exception as e:
+            logger.warning(f"Could not add {path} to the model catalog: {e}")
+
+    def _download(self, backend: str, url: str,
+                  consume: Callable[[requests.Response], Tuple[Optional[str], int]]) -> Optional[str]:
+        """Requests ``url`` and hands the response to ``consume``, retrying throttled attempts.
+
+        The backend's concurrency slot is held until the body has been consumed,
+        not just while connecting, so the adaptive limit bounds concurrent
+        transfers and its throughput samples count the bytes actually moved.
+
+        Args:
+            backend (str): Limiter to run under.
+            url (str): URL to download.
+            consume (Callable): Reads the response; returns (result, bytes transferred).
+
+        Returns:
+            Optional[str]: The result of ``consume``.
+        """
+        timer = profiling.current()
+
+        def attempt() -> Tuple[Optional[str], int]:
+            with timer.phase('connect'):
+                response = throttle.check_response(requests.get(url, stream=True))
+            with response:
+                return consume(response)
+
+        result, _ = throttle.retry_call(backend, attempt, work=lambda outcome: outcome[1])
+        return result
+
+    def _stream_response(self, response: requests.Response, name: str, target) -> Tuple[str, int]:
+        """Pipes a streaming HTTP response into a remote upload.
+
+        Args:
+            response (requests.Response): Open streaming response.
+            name (str): Name of the file at the destination.
+            target (DriveTarget | S3Target): Destination that opens the upload.
+
+        Returns:
+            Tuple[str, int]: Remote location of the uploaded file and bytes streamed.
+        """
+        content_length = response.headers.get('content-length')
+        total_size = int(content_length) if content_length else None
+        timer = profiling.current()
+        with timer.phase('connect'):
+            upload = target.open(name, total_size)
+        try:
+            streamed = 0
+            for chunk in timer.iterate('read', response.iter_content(chunk_size=self.stream_chunk_size)):
+                if chunk:
+                    with timer.phase('write'):
+                        upload.write(chunk)
+                    streamed += len(chunk)
+            with timer.phase('write'):
+                location = upload.close()
+            metrics.add_bytes(streamed)
+            return location, streamed
+        except Exception:
+            upload.abort()
+            raise
+        finally:
+            response.close()
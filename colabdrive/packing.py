@@ -0,0 +1,163 @@
+## packing.py
+
+import concurrent.futures
+import json
+import os
+import tarfile
+from typing import Callable, Dict, IO, Iterable, List, Optional, Tuple
+from colabdrive.logger import logger
+
+MANIFEST_VERSION = 1
+TAR_BLOCK = tarfile.BLOCKSIZE
+
+
+def collect_files(sources: Iterable[str]) -> List[Tuple[str, str, int]]:
+    """Expands files and directories into ``(path, archive name, size)`` entries.
+
+    Files inside a directory keep their path relative to that directory;
+    files given directly are stored under their base name.
+    """
+    entries = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    arcname = os.path.relpath(path, source).replace(os.sep, '/')
+                    entries.append((path, arcname, os.path.getsize(path)))
+        elif os.path.isfile(source):
+            entries.append((source, os.path.basename(source), os.path.getsize(source)))
+    return entries
+
+
+def plan_shards(entries: List[Tuple[str, str, int]], shard_size: int) -> List[List[Tuple[str, str, int]]]:
+    """Groups entries into shards of roughly ``shard_size`` bytes, keeping order."""
+    shards: List[List[Tuple[str, str, int]]] = []
+    current: List[Tuple[str, str, int]] = []
+    current_size = 0
+    for entry in entries:
+        # Header plus data padded to whole tar blocks.
+        packed_size = TAR_BLOCK + -(-entry[2] // TAR_BLOCK) * TAR_BLOCK
+        if current and current_size + packed_size > shard_size:
+            shards.append(current)
+            current, current_size = [], 0
+        current.append(entry)
+        current_size += packed_size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def write_shard(entries: List[Tuple[str, str, int]], stream: IO[bytes]) -> Dict[str, Dict[str, int]]:
+    """Streams entries into an uncompressed tar written to ``stream``.
+
+    The archive is written sequentially, so ``stream`` only needs ``write``
+    (an upload session works). Returns the byte offset and size of every
+    member's data inside the archive.
+    """
+    members: Dict[str, Dict[str, int]] = {}
+    with tarfile.open(fileobj=stream, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for path, arcname, _ in entries:
+            info = tar.gettarinfo(path, arcname)
+            with open(path, 'rb') as f:
+                tar.addfile(info, f)
+            # After addfile the archive offset sits just past the padded member data.
+            padded = -(-info.size // TAR_BLOCK) * TAR_BLOCK
+            members[arcname] = {'offset': tar.offset - padded, 'size': info.size,
+                                'mtime': int(info.mtime)}
+    return members
+
+
+def pack(sources: Iterable[str], open_upload: Callable[[str], object], name: str,
+         shard_size: int = 256 * 1024 * 1024, workers: int = 4) -> Dict:
+    """Packs files into tar shards, uploading the shards in parallel.
+
+    Args:
+        sources (Iterable[str]): Files and directories to pack.
+        open_upload (Callable): Opens an upload for a shard name; the result needs
+            ``write``, ``close`` (returning the remote location) and ``abort``.
+        name (str): Base name for shards, e.g. "dataset" gives "dataset-00000.tar".
+        shard_size (int): Target shard size in bytes.
+        workers (int): Shards written and uploaded concurrently.
+
+    Returns:
+        Dict: The manifest, mapping every member to its shard, offset and size.
+    """
+    shards = plan_shards(collect_files(sources), shard_size)
+
+    def upload_shard(index: int) -> Tuple[str, str, Dict[str, Dict[str, int]]]:
+        shard_name = f"{name}-{index:05d}.tar"
+        upload = open_upload(shard_name)
+        try:
+            members = write_shard(shards[index], upload)
+            location = upload.close()
+        except BaseException:
+            upload.abort()
+            raise
+        logger.info(f"Uploaded shard {shard_name} with {len(members)} files to {location}")
+        return shard_name, location, members
+
+    manifest = {'version': MANIFEST_VERSION, 'name': name, 'shards': [], 'members': {}}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(upload_shard, range(len(shards))))
+    for index, (shard_name, location, members) in enumerate(results):
+        manifest['shards'].append({'name': shard_name, 'location': location,
+                                   'files': len(members)})
+        for arcname, entry in members.items():
+            manifest['members'][arcname] = dict(entry, shard=index)
+    return manifest
+
+
+def dump_manifest(manifest: Dict) -> bytes:
+    return json.dumps(manifest, sort_keys=True).encode('utf-8')
+
+
+def load_manifest(data: bytes) -> Dict:
+    manifest = json.loads(data)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported pack manifest version: {manifest.get('version')}")
+    return manifest
+
+
+def member_range(manifest: Dict, member: str) -> Tuple[Dict, int, int]:
+    """Returns ``(shard, first byte, last byte)`` of a member's data in its shard.
+
+    For an empty member ``last`` is ``first - 1``; there is nothing to request.
+    """
+    entry = manifest['members'].get(member)
+    if entry is None:
+        raise KeyError(f"{member} is not in pack {manifest.get('name')}")
+    shard = manifest['shards'][entry['shard']]
+    return shard, entry['offset'], entry['offset'] + entry['size'] - 1
+
+
+def safe_destination(destination_dir: str, member: str) -> str:
+    """Joins a member name onto ``destination_dir``, refusing paths that escape it."""
+    root = os.path.abspath(destination_dir)
+    path = os.path.abspath(os.path.join(root, member))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Refusing to extract {member} outside {destination_dir}")
+    return path
+
+
+def extract_stream(stream: IO[bytes], destination_dir: str,
+                   members: Optional[Iterable[str]] = None) -> int:
+    """Extracts a tar shard read sequentially from ``stream``; returns files written."""
+    wanted = set(members) if members is not None else None
+    count = 0
+    with tarfile.open(fileobj=stream, mode='r|') as tar:
+        for info in tar:
+            if wanted is not None and info.name not in wanted:
+                continue
+            if hasattr(tarfile, 'data_filter'):
+                tar.extract(info, destination_dir, filter='data')
+            else:
+                # No extraction filters before Python 3.11.4: only plain files and
+                # directories, and only inside destination_dir.
+                if not (info.isfile() or info.isdir()):
+                    raise ValueError(f"Refusing to extract {info.name}: not a regular file")
+                safe_destination(destination_dir, info.name)
+                tar.extract(info, destination_dir)
+            count += 1
+    return count
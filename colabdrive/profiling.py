@@ -0,0 +1,208 @@
+## profiling.py
+
+import cProfile
+import collections
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive import metrics
+
+# COLABDRIVE_PROFILE=1 turns on phase timers; =cprofile also dumps cProfile and
+# folded stacks per job. The "profiling" config setting accepts the same values.
+_mode = str(os.environ.get('COLABDRIVE_PROFILE', config.get('profiling') or '')).lower()
+enabled = _mode not in ('', '0', 'false', 'off')
+capture_stacks = _mode == 'cprofile'
+
+_current = threading.local()
+# Only one cProfile profiler may be active per process (enforced from Python 3.12),
+# so concurrent jobs after the first get phase timers only.
+_profiler_lock = threading.Lock()
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class PhaseTimer:
+    """Accumulates wall time per phase (connect, first_byte, read, write, ...) for one job."""
+
+    def __init__(self, operation: str) -> None:
+        self.operation = operation
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = collections.defaultdict(float)
+        self.marks: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed block and adds it to ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def mark(self, name: str) -> None:
+        """Records the first time ``name`` happens, relative to the job start."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """Yields from ``iterable``, charging the time spent producing items to ``name``."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.phases[name] += time.perf_counter() - start
+                return
+            self.phases[name] += time.perf_counter() - start
+            self.mark('first_byte')
+            yield item
+
+    def sync(self, f) -> None:
+        """Flushes and fsyncs ``f`` so write-back time is attributed to the job."""
+        with self.phase('fsync'):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def report(self) -> Dict[str, object]:
+        total = time.perf_counter() - self.start
+        accounted = sum(self.phases.values())
+        return {
+            'operation': self.operation,
+            'total': round(total, 6),
+            'phases': {name: round(value, 6) for name, value in self.phases.items()},
+            'marks': {name: round(value, 6) for name, value in self.marks.items()},
+            'other': round(max(0.0, total - accounted), 6),
+        }
+
+
+class _NullTimer:
+    """Stand-in used when profiling is off; every method is a cheap no-op."""
+
+    def phase(self, name: str):
+        return _NULL_CONTEXT
+
+    def mark(self, name: str) -> None:
+        pass
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterable:
+        return iterable
+
+    def sync(self, f) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def current():
+    """Returns the timer for the job running on this thread, or a no-op timer."""
+    return getattr(_current, 'timer', None) or NULL_TIMER
+
+
+class StackSampler:
+    """Samples one thread's stack periodically and counts folded stacks.
+
+    The output (``frame;frame;frame count`` per line) is the input format of
+    flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.items())
+
+
+def _profile_dir() -> str:
+    directory = config.get('profile_dir') or os.path.join(os.path.expanduser('~'), '.colabdrive', 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def profiled(operation: str) -> Callable:
+    """Decorator that times a job's phases and optionally captures its stacks.
+
+    With profiling off the wrapper only checks a module flag before calling
+    through, so it can stay on hot paths permanently.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled or getattr(_current, 'timer', None) is not None:
+                return fn(*args, **kwargs)
+            timer = PhaseTimer(operation)
+            _current.timer = timer
+            profiler = sampler = None
+            if capture_stacks and _profiler_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler (e.g. a debugger's) is already active.
+                    profiler = None
+                    _profiler_lock.release()
+                else:
+                    sampler = StackSampler(threading.get_ident())
+                    sampler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current.timer = None
+                if profiler:
+                    profiler.disable()
+                    sampler.stop()
+                    _profiler_lock.release()
+                _publish(timer, profiler, sampler)
+        return wrapper
+    return decorator
+
+
+def _publish(timer: PhaseTimer, profiler: Optional[cProfile.Profile],
+             sampler: Optional[StackSampler]) -> None:
+    """Logs a job's phase breakdown and writes any captured profiles."""
+    report = timer.report()
+    for name, seconds in report['phases'].items():
+        metrics.registry.observe('colabdrive_phase_seconds', seconds,
+                                 operation=timer.operation, phase=name)
+    logger.info(f"Profile {timer.operation}: {json.dumps(report, sort_keys=True)}")
+    if not profiler:
+        return
+    try:
+        base = os.path.join(_profile_dir(), f"{timer.operation}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}")
+        profiler.dump_stats(base + '.prof')
+        with open(base + '.folded', 'w') as f:
+            f.write(sampler.folded())
+        with open(base + '.json', 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        logger.info(f"Wrote profile for {timer.operation} to {base}.prof/.folded")
+    except OSError as e:
+        logger.error(f"Failed to write profile for {timer.operation}: {e}")
@@ -0,0 +1,143 @@
+## ranged_download.py
+
+import os
+import shutil
+import threading
+import concurrent.futures
+from typing import Callable, Dict, Optional
+import requests
+from colabdrive.logger import logger
+from colabdrive import metrics, throttle
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v2/files"
+
+
+class _Cancelled(Exception):
+    """Another range failed, so this one stops early."""
+
+
+def drive_media_url(file_id: str, files_url: str = DRIVE_FILES_URL) -> str:
+    """Returns the URL that serves a Drive file's contents."""
+    return f"{files_url}/{file_id}?alt=media"
+
+
+def parallel_download(url: str, destination: str, size: int,
+                      headers: Optional[Callable[[], Dict[str, str]]] = None,
+                      workers: int = 8, chunk_size: int = 32 * 1024 * 1024,
+                      max_retries: int = 3, backend: str = 'drive') -> str:
+    """Downloads a file with concurrent HTTP range requests.
+
+    The file is preallocated under a temporary name, each worker writes its
+    ranges in place with ``os.pwrite``, and the result is renamed onto
+    ``destination`` only once every range has arrived. Range requests share
+    the backend's adaptive concurrency limit, so ``workers`` is an upper bound
+    that throttling responses scale back.
+
+    Args:
+        url (str): URL that honors ``Range`` headers.
+        destination (str): Final path of the downloaded file.
+        size (int): Total size in bytes.
+        headers (Callable, optional): Returns request headers; called per request so
+            refreshed auth tokens are picked up.
+        workers (int): Number of concurrent connections.
+        chunk_size (int): Bytes fetched per range request.
+        max_retries (int): Attempts per range before giving up on non-throttling errors.
+        backend (str): Concurrency limiter the range requests run under.
+
+    Returns:
+        str: The destination path.
+    """
+    temp_path = destination + '.part'
+    ranges = [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+    local = threading.local()
+    event = metrics.current_event()
+    # Set when any range fails, so the others stop instead of finishing a doomed download.
+    cancelled = threading.Event()
+
+    def count_retry():
+        if event is not None:
+            event.retries += 1
+
+    def fetch_once(start, end):
+        request_headers = dict(headers() if headers else {})
+        request_headers['Range'] = f"bytes={start}-{end}"
+        with local.session.get(url, headers=request_headers, stream=True, timeout=60) as response:
+            throttle.check_response(response)
+            if response.status_code != 206:
+                raise IOError(f"Range request returned {response.status_code}")
+            position = start
+            for block in response.iter_content(chunk_size=1024 * 1024):
+                if cancelled.is_set():
+                    raise _Cancelled()
+                position += os.pwrite(fd, block, position)
+        if position != end + 1:
+            raise IOError(f"Short read for bytes {start}-{end}")
+
+    def fetch(byte_range):
+        start, end = byte_range
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        for attempt in range(1, max_retries + 1):
+            if cancelled.is_set():
+                raise _Cancelled()
+            try:
+                throttle.retry_call(backend, lambda: fetch_once(start, end),
+                                    work=end - start + 1, on_retry=count_retry)
+                return
+            except Exception as e:
+                if attempt == max_retries or isinstance(e, _Cancelled):
+                    raise
+                count_retry()
+                logger.warning(f"Retrying bytes {start}-{end} of {destination} after error: {e}")
+
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, 'posix_fallocate') and size:
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                os.ftruncate(fd, size)
+        else:
+            os.ftruncate(fd, size)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(fetch, r) for r in ranges]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            except BaseException:
+                # Fail fast: drop queued ranges and stop running ones at their next block.
+                cancelled.set()
+                for future in futures:
+                    future.cancel()
+                raise
+    except BaseException:
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    os.close(fd)
+    os.replace(temp_path, destination)
+    logger.info(f"Downloaded {size} bytes to {destination} over {len(ranges)} ranges")
+    return destination
+
+
+def sequential_copy(source: str, destination: str, buffer_size: int = 16 * 1024 * 1024) -> str:
+    """Copies a file with a large read buffer, renaming into place on success.
+
+    Args:
+        source (str): Path to read from.
+        destination (str): Final path of the copy.
+        buffer_size (int): Bytes read per call; large buffers cut FUSE round trips.
+
+    Returns:
+        str: The destination path.
+    """
+    temp_path = destination + '.part'
+    try:
+        with open(source, 'rb', buffering=0) as src, open(temp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, buffer_size)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, destination)
+    return destination
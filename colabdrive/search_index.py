@@ -0,0 +1,431 @@
+## search_index.py
+
+import array
+import calendar
+import heapq
+import marshal
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive.drive_paths import FOLDER_MIME_TYPE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    file_id TEXT,
+    parent_id TEXT,
+    is_dir INTEGER NOT NULL,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS entries_source ON entries (source);
+CREATE TABLE IF NOT EXISTS dirs (
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (source, path)
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+COLUMNS = ('key', 'source', 'name', 'path', 'file_id', 'parent_id', 'is_dir', 'size', 'mtime')
+SEPARATORS = re.compile(r'[\s/\\_.\-]+')
+# Share of a query's trigrams a result must contain.
+MIN_SIMILARITY = 0.6
+DRIVE_FIELDS = 'nextPageToken,items(id,title,mimeType,fileSize,modifiedDate,parents(id),labels(trashed))'
+
+
+def _escape_like(text: str) -> str:
+    """Escapes LIKE wildcards so ``text`` matches literally with ``ESCAPE '\\'``."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in SEPARATORS.split(text.lower()) if word]
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word, padded with spaces so word starts and ends form their own."""
+    grams = set()
+    for word in _words(text):
+        word = f" {word} "
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def _query_trigrams(query: str) -> Set[str]:
+    """Like ``trigrams``, but the last word may be a prefix still being typed."""
+    words = _words(query)
+    grams = trigrams(' '.join(words[:-1]))
+    if words:
+        last = f" {words[-1]}"
+        grams.update(last[i:i + 3] for i in range(len(last) - 2))
+    return grams
+
+
+class SearchIndex:
+    """Fuzzy file-name search over Drive, the mounted drive and the model directory.
+
+    Entries are persisted in SQLite and sources are re-indexed incrementally:
+    local trees only re-list directories whose mtime changed, and Drive only
+    fetches files modified since the last sync. Searches run against an
+    in-memory trigram index, which is saved next to the database after each
+    update so later sessions load it instead of recomputing trigrams.
+    Queries count trigram hits over the postings lists and only score the
+    best-matching shortlist, so typos and reordered words still match.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        """
+        Args:
+            db_path (str, optional): SQLite file; defaults to the ``search_index_db`` setting.
+        """
+        self.db_path = db_path or config.get('search_index_db')
+        self.snapshot_path = self.db_path + '.trigrams'
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = False
+        self._rows: List[Optional[Tuple]] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, array.array] = {}
+        self._removed = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            # Older indexes kept directory mtimes without a source; they are only a
+            # scan cache, so drop them and let the next index rescan.
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(dirs)')]
+            if columns and 'source' not in columns:
+                self._conn.execute('DROP TABLE dirs')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    # In-memory index
+
+    def _add(self, row: Tuple) -> None:
+        key = row[0]
+        if key in self._ids:
+            self._drop(key)
+        entry_id = len(self._rows)
+        self._rows.append(row)
+        self._ids[key] = entry_id
+        # Ids only grow, so appending keeps every postings list sorted.
+        for gram in trigrams(row[3]):
+            self._postings.setdefault(gram, array.array('I')).append(entry_id)
+
+    def _drop(self, key: str) -> None:
+        entry_id = self._ids.pop(key, None)
+        if entry_id is not None:
+            # Left as a tombstone in the postings until the next rebuild.
+            self._rows[entry_id] = None
+            self._removed += 1
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded and self._removed <= len(self._ids):
+            return
+        start = time.perf_counter()
+        if not self._loaded and self._load_snapshot():
+            how = 'snapshot'
+        else:
+            self._rows, self._ids, self._postings, self._removed = [], {}, {}, 0
+            for row in self._connect().execute(f"SELECT {', '.join(COLUMNS)} FROM entries"):
+                self._add(tuple(row))
+            self._save_snapshot()
+            how = 'database'
+        self._loaded = True
+        logger.info(f"Search index loaded {len(self._ids)} entries from {how} "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    def _load_snapshot(self) -> bool:
+        """Loads the saved trigram index if it matches the database."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if snapshot.get('generation') != self._state('generation'):
+            return False
+        self._rows = snapshot['rows']
+        self._ids = {row[0]: i for i, row in enumerate(self._rows) if row is not None}
+        self._postings = {}
+        for gram, data in snapshot['postings'].items():
+            posting = array.array('I')
+            posting.frombytes(data)
+            self._postings[gram] = posting
+        self._removed = len(self._rows) - len(self._ids)
+        return True
+
+    def _save_snapshot(self) -> None:
+        generation = str(time.time_ns())
+        temp_path = self.snapshot_path + '.part'
+        try:
+            with open(temp_path, 'wb') as f:
+                marshal.dump({'generation': generation, 'rows': self._rows,
+                              'postings': {g: p.tobytes() for g, p in self._postings.items()}}, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not save search index snapshot: {e}")
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('generation', ?)", (generation,))
+
+    def _apply(self, rows: List[Tuple], removed: Iterable[str]) -> None:
+        """Writes changes to SQLite and mirrors them in memory and in the snapshot."""
+        removed = list(removed)
+        if not rows and not removed:
+            return
+        self._ensure_loaded()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO entries ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in removed])
+            # Invalidate the snapshot until the new one is written.
+            conn.execute("DELETE FROM state WHERE key = 'generation'")
+        for key in removed:
+            self._drop(key)
+        for row in rows:
+            self._add(row)
+        self._save_snapshot()
+
+    # Sources
+
+    def index_directory(self, root: str, source: str) -> Dict[str, int]:
+        """Indexes a local tree, re-listing only directories whose mtime changed.
+
+        Args:
+            root (str): Directory to index, e.g. the Drive mount or the model directory.
+            source (str): Label stored with the entries, such as "mount" or "models".
+
+        Returns:
+            Dict[str, int]: Number of directories ``scanned`` and entries ``added`` and ``removed``.
+        """
+        root = os.path.abspath(root)
+        counts = {'scanned': 0, 'added': 0, 'removed': 0}
+        with self._lock:
+            conn = self._connect()
+            known_dirs = dict(conn.execute(
+                "SELECT path, mtime FROM dirs WHERE source = ? AND (path = ? OR path LIKE ? ESCAPE '\\')",
+                (source, root, _escape_like(root + os.sep) + '%')))
+            seen_dirs: Dict[str, float] = {}
+            rows: List[Tuple] = []
+            removed: List[str] = []
+            stack = [root]
+            while stack:
+                directory = stack.pop()
+                try:
+                    dir_mtime = os.stat(directory).st_mtime
+                    with os.scandir(directory) as it:
+                        entries = list(it)
+                except OSError as e:
+                    logger.warning(f"Skipping {directory} while indexing: {e}")
+                    continue
+                seen_dirs[directory] = dir_mtime
+                subdirs = [e.path for e in entries if e.is_dir(follow_symlinks=False)]
+                stack.extend(subdirs)
+                if known_dirs.get(directory) == dir_mtime:
+                    continue
+                counts['scanned'] += 1
+                existing = {key for (key,) in conn.execute(
+                    'SELECT key FROM entries WHERE source = ? AND parent_id = ?', (source, directory))}
+                current = set()
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    key = f"{source}:{entry.path}"
+                    current.add(key)
+                    if key not in existing:
+                        counts['added'] += 1
+                    rows.append((key, source, entry.name, entry.path, None, directory,
+                                 int(is_dir), 0 if is_dir else stat.st_size, stat.st_mtime))
+                removed.extend(existing - current)
+
+            # Entries under directories that no longer exist.
+            for directory in set(known_dirs) - set(seen_dirs):
+                removed.extend(key for (key,) in conn.execute(
+                    'SELECT key FROM entries WHERE source = ? AND parent_id = ?', (source, directory)))
+            counts['removed'] = len(removed)
+            self._apply(rows, removed)
+            with conn:
+                conn.executemany('DELETE FROM dirs WHERE source = ? AND path = ?',
+                                 [(source, d) for d in set(known_dirs) - set(seen_dirs)])
+                conn.executemany('INSERT OR REPLACE INTO dirs (source, path, mtime) VALUES (?, ?, ?)',
+                                 [(source, d, mtime) for d, mtime in seen_dirs.items()])
+        logger.info(f"Indexed {root} as {source}: {counts}")
+        return counts
+
+    def index_drive(self, drive, full: bool = False) -> Dict[str, int]:
+        """Indexes Google Drive through the API.
+
+        Only files modified since the last sync are fetched; when a folder was
+        renamed or moved, the stored paths of everything under it are rewritten.
+        Trashed files are dropped as they are seen; permanently deleted ones only
+        disappear on a ``full`` rebuild.
+
+        Args:
+            drive (GoogleDrive): Authenticated pydrive2 client.
+            full (bool): Re-list everything instead of syncing changes.
+
+        Returns:
+            Dict[str, int]: Number of entries ``updated``, ``moved`` (under a renamed or
+            moved folder) and ``removed``.
+        """
+        with self._lock:
+            conn = self._connect()
+            since = None if full else self._state('drive_synced')
+            query = f"modifiedDate > '{since}'" if since else "trashed=false"
+            items = []
+            for page in drive.ListFile({'q': query, 'maxResults': 1000, 'fields': DRIVE_FIELDS}):
+                items.extend(page)
+
+            folders = {key.split(':', 1)[1]: (name, parent) for key, name, parent in conn.execute(
+                "SELECT key, name, parent_id FROM entries WHERE source = 'drive' AND is_dir = 1")}
+            moved_folders = set()
+            for item in items:
+                if item['mimeType'] == FOLDER_MIME_TYPE:
+                    parents = item.get('parents') or []
+                    folder = (item['title'], parents[0]['id'] if parents else None)
+                    if item['id'] in folders and folders[item['id']] != folder:
+                        moved_folders.add(item['id'])
+                    folders[item['id']] = folder
+
+            def path_of(parent: Optional[str], name: str) -> str:
+                parts = [name]
+                seen = set()
+                while parent in folders and parent not in seen:
+                    seen.add(parent)
+                    parent_name, parent = folders[parent]
+                    parts.append(parent_name)
+                return '/'.join(reversed(parts))
+
+            rows, removed = [], []
+            latest = since or ''
+            for item in items:
+                latest = max(latest, item.get('modifiedDate') or '')
+                key = f"drive:{item['id']}"
+                if (item.get('labels') or {}).get('trashed'):
+                    removed.append(key)
+                    continue
+                parents = item.get('parents') or []
+                parent = parents[0]['id'] if parents else None
+                modified = item.get('modifiedDate')
+                rows.append((key, 'drive', item['title'], path_of(parent, item['title']), item['id'],
+                             parent, int(item['mimeType'] == FOLDER_MIME_TYPE),
+                             int(item.get('fileSize') or 0),
+                             calendar.timegm(time.strptime(modified[:19], '%Y-%m-%dT%H:%M:%S')) if modified else None))
+            moved = self._repath_descendants(conn, moved_folders, {row[0] for row in rows}, path_of)
+            rows.extend(moved)
+            if full:
+                live = {row[0] for row in rows}
+                removed.extend(key for (key,) in conn.execute("SELECT key FROM entries WHERE source = 'drive'")
+                               if key not in live)
+            self._apply(rows, removed)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('drive_synced', ?)", (latest,))
+        counts = {'updated': len(rows) - len(moved), 'moved': len(moved), 'removed': len(removed)}
+        logger.info(f"Indexed Google Drive: {counts}")
+        return counts
+
+    @staticmethod
+    def _repath_descendants(conn: sqlite3.Connection, folder_ids: Set[str], fetched: Set[str],
+                            path_of) -> List[Tuple]:
+        """Rows under renamed or moved folders, with their paths recomputed.
+
+        Their own ``modifiedDate`` does not change, so an incremental sync would
+        otherwise keep the old paths. Rows in ``fetched`` are already up to date.
+        """
+        rows = []
+        parents, visited = list(folder_ids), set(folder_ids)
+        while parents:
+            batch, parents = parents[:500], parents[500:]
+            for row in conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM entries WHERE source = 'drive' "
+                    f"AND parent_id IN ({', '.join('?' * len(batch))})", batch):
+                row = list(row)
+                if row[0] not in fetched:
+                    row[3] = path_of(row[5], row[2])
+                    rows.append(tuple(row))
+                if row[6] and row[4] not in visited:
+                    visited.add(row[4])
+                    parents.append(row[4])
+        return rows
+
+    def _state(self, key: str) -> Optional[str]:
+        row = self._connect().execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    # Queries
+
+    def search(self, query: str, limit: int = 50, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Finds entries whose name or path approximately matches ``query``.
+
+        Args:
+            query (str): Words or fragments in any order; small typos are tolerated.
+            limit (int): Maximum number of results.
+            source (str, optional): Restrict to "drive", "mount", "models", ...
+
+        Returns:
+            List[Dict[str, Any]]: Best matches first, each with a ``score``.
+        """
+        grams = _query_trigrams(query)
+        if not grams:
+            return []
+        with self._lock:
+            self._ensure_loaded()
+            postings = [self._postings.get(g, ()) for g in grams]
+            needed = max(1, int(len(grams) * MIN_SIMILARITY + 0.999))
+            # Counting runs in C over the postings; only a shortlist is scored in Python.
+            hits: Counter = Counter()
+            for posting in postings:
+                hits.update(posting)
+            rows = self._rows
+            shortlist = heapq.nlargest(max(limit * 20, 200),
+                                       ((count, entry_id) for entry_id, count in hits.items()
+                                        if count >= needed and rows[entry_id] is not None
+                                        and (source is None or rows[entry_id][1] == source)))
+
+            words = _words(query)
+            scored = []
+            for count, entry_id in shortlist:
+                row = rows[entry_id]
+                name, path = row[2].lower(), row[3].lower()
+                # Matches within the file name count for more than ones spread over the path.
+                score = max(len(grams & trigrams(name)), 0.7 * count) / len(grams)
+                score += sum(0.5 if w in name else 0.2 if w in path else 0 for w in words) / len(words)
+                if name.startswith(words[0]):
+                    score += 0.25
+                # Shorter names are closer matches for the same hits.
+                score -= len(name) / 1000
+                scored.append((score, entry_id))
+            best = heapq.nlargest(limit, scored)
+            return [dict(zip(COLUMNS, self._rows[entry_id]), score=round(score, 3))
+                    for score, entry_id in best]
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._loaded:
+                return len(self._ids)
+            return self._connect().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+
+# Create a singleton instance; the database is opened on first use.
+search_index = SearchIndex()
@@ -0,0 +1,256 @@
+## stream_upload.py
+
+import json
+from typing import Optional
+import requests
+from colabdrive.logger import logger
+
+DRIVE_UPLOAD_URL = "https://www.googleapis.com/upload/drive/v2/files"
+
+# Drive requires every non-final resumable chunk to be a multiple of 256 KiB.
+DRIVE_CHUNK_ALIGNMENT = 256 * 1024
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last) and more than 10000 parts.
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PARTS = 10000
+
+
+def drive_auth_headers(gauth) -> dict:
+    """Returns an Authorization header for raw Drive API requests.
+
+    Args:
+        gauth: Authenticated pydrive2 GoogleAuth instance.
+
+    Returns:
+        dict: Headers carrying a valid bearer token.
+    """
+    if gauth.access_token_expired:
+        # Imported here so the stand-in auth used by benchmarks needs no pydrive2.
+        from colabdrive.credentials import credential_manager
+        credential_manager.refresh(gauth)
+    return {'Authorization': f"Bearer {gauth.credentials.access_token}"}
+
+
+class DriveResumableUpload:
+    """Streams bytes into a Google Drive resumable upload session.
+
+    Data passed to ``write`` is buffered only until a full chunk is available,
+    so memory use is bounded by ``chunk_size`` regardless of the file size.
+    """
+
+    def __init__(self, gauth, name: str, parent_id: Optional[str] = None,
+                 total_size: Optional[int] = None, chunk_size: int = 8 * 1024 * 1024,
+                 upload_url: str = DRIVE_UPLOAD_URL, properties: Optional[list] = None,
+                 file_id: Optional[str] = None) -> None:
+        """Opens a resumable upload session.
+
+        Args:
+            gauth: Authenticated pydrive2 GoogleAuth instance.
+            name (str): Title of the file to create in Drive.
+            parent_id (str, optional): ID of the destination folder.
+            total_size (int, optional): Final size in bytes, if known up front.
+            chunk_size (int): Bytes sent per request; rounded to the Drive alignment.
+            upload_url (str): Drive upload endpoint.
+            properties (list, optional): Drive file properties to set on the new file.
+            file_id (str, optional): Upload new content to this existing file, as a
+                new revision, instead of creating a file.
+        """
+        self.gauth = gauth
+        self.name = name
+        self.total_size = total_size
+        self.chunk_size = max(DRIVE_CHUNK_ALIGNMENT,
+                              chunk_size - chunk_size % DRIVE_CHUNK_ALIGNMENT)
+        self.http = requests.Session()
+        self.buffer = bytearray()
+        self.offset = 0
+        self.file_id: Optional[str] = None
+
+        metadata = {'title': name}
+        if parent_id and not file_id:
+            metadata['parents'] = [{'id': parent_id}]
+        if properties:
+            metadata['properties'] = properties
+        headers = dict(drive_auth_headers(gauth))
+        headers['Content-Type'] = 'application/json; charset=UTF-8'
+        if total_size is not None:
+            headers['X-Upload-Content-Length'] = str(total_size)
+        if file_id:
+            response = self.http.put(f"{upload_url}/{file_id}", params={'uploadType': 'resumable'},
+                                     headers=headers, data=json.dumps(metadata))
+        else:
+            response = self.http.post(upload_url, params={'uploadType': 'resumable'},
+                                      headers=headers, data=json.dumps(metadata))
+        response.raise_for_status()
+        self.session_url = response.headers['Location']
+
+    def write(self, data: bytes) -> None:
+        """Queues bytes for upload, sending full chunks as they become available.
+
+        Args:
+            data (bytes): Next slice of the file contents.
+        """
+        self.buffer += data
+        # Keep at least one byte back so the final request always carries the total size.
+        while len(self.buffer) > self.chunk_size:
+            self._send(self.chunk_size, final=False)
+
+    def close(self) -> str:
+        """Sends the remaining bytes and finalizes the upload.
+
+        Returns:
+            str: ID of the created (or updated) Drive file.
+        """
+        while self.file_id is None:
+            self._send(len(self.buffer), final=True)
+        self.http.close()
+        logger.info(f"Streamed {self.offset} bytes to Google Drive as {self.name}")
+        return self.file_id
+
+    def abort(self) -> None:
+        """Cancels the upload session."""
+        try:
+            self.http.delete(self.session_url, headers=drive_auth_headers(self.gauth))
+        except Exception as e:
+            logger.error(f"Failed to cancel Drive upload session for {self.name}: {e}")
+        finally:
+            self.http.close()
+
+    def _send(self, length: int, final: bool) -> None:
+        """Uploads the first ``length`` buffered bytes as one chunk."""
+        end = self.offset + length
+        total = str(end) if final else '*'
+        headers = dict(drive_auth_headers(self.gauth))
+        if length:
+            headers['Content-Range'] = f"bytes {self.offset}-{end - 1}/{total}"
+        else:
+            headers['Content-Range'] = f"bytes */{total}"
+        # requests keeps the body on response.request, so pass a copy rather than a
+        # view that would pin the buffer and stop it from being trimmed below.
+        response = self.http.put(self.session_url, headers=headers,
+                                 data=bytes(self.buffer[:length]))
+
+        if response.status_code in (200, 201):
+            self.file_id = response.json()['id']
+            committed = end
+        elif response.status_code == 308:
+            # Drive reports how much it persisted; anything past that is resent.
+            received = response.headers.get('Range')
+            committed = int(received.rsplit('-', 1)[1]) + 1 if received else self.offset
+        else:
+            response.raise_for_status()
+            raise IOError(f"Unexpected Drive upload response: {response.status_code}")
+
+        del self.buffer[:committed - self.offset]
+        self.offset = committed
+
+
+class S3MultipartUpload:
+    """Streams bytes into an S3 multipart upload with a bounded buffer."""
+
+    def __init__(self, s3_client, bucket: str, key: str, total_size: Optional[int] = None,
+                 part_size: int = 8 * 1024 * 1024) -> None:
+        """Creates the multipart upload.
+
+        Args:
+            s3_client: boto3 S3 client.
+            bucket (str): Destination bucket.
+            key (str): Destination object key.
+            total_size (int, optional): Final size in bytes, used to keep under the part limit.
+            part_size (int): Bytes per uploaded part.
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(S3_MIN_PART_SIZE, part_size)
+        if total_size:
+            self.part_size = max(self.part_size, -(-total_size // S3_MAX_PARTS))
+        self.buffer = bytearray()
+        self.parts = []
+        self.bytes_sent = 0
+        response = s3_client.create_multipart_upload(Bucket=bucket, Key=key)
+        self.upload_id = response['UploadId']
+
+    def write(self, data: bytes) -> None:
+        """Queues bytes for upload, sending full parts as they become available.
+
+        Args:
+            data (bytes): Next slice of the file contents.
+        """
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self._send(self.part_size)
+
+    def close(self) -> str:
+        """Uploads the final part and completes the multipart upload.
+
+        Returns:
+            str: ``s3://bucket/key`` location of the object.
+        """
+        if self.buffer or not self.parts:
+            self._send(len(self.buffer))
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
+        logger.info(f"Streamed {self.bytes_sent} bytes to s3://{self.bucket}/{self.key}")
+        return f"s3://{self.bucket}/{self.key}"
+
+    def abort(self) -> None:
+        """Aborts the multipart upload so S3 discards stored parts."""
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                                  UploadId=self.upload_id)
+        except Exception as e:
+            logger.error(f"Failed to abort S3 upload for {self.key}: {e}")
+
+    def _send(self, length: int) -> None:
+        """Uploads the first ``length`` buffered bytes as the next part."""
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=bytes(self.buffer[:length])
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.bytes_sent += length
+        del self.buffer[:length]
+
+
+class DriveTarget:
+    """Destination that opens Drive resumable uploads for streamed downloads."""
+
+    def __init__(self, gauth, parent_id: Optional[str] = None,
+                 upload_url: str = DRIVE_UPLOAD_URL) -> None:
+        """
+        Args:
+            gauth: Authenticated pydrive2 GoogleAuth instance.
+            parent_id (str, optional): ID of the destination folder.
+            upload_url (str): Drive upload endpoint.
+        """
+        self.gauth = gauth
+        self.parent_id = parent_id
+        self.upload_url = upload_url
+
+    def open(self, name: str, total_size: Optional[int] = None) -> DriveResumableUpload:
+        """Starts an upload session for a file called ``name``."""
+        return DriveResumableUpload(self.gauth, name, self.parent_id, total_size,
+                                    upload_url=self.upload_url)
+
+
+class S3Target:
+    """Destination that opens S3 multipart uploads for streamed downloads."""
+
+    def __init__(self, s3_client, bucket: str, prefix: str = '') -> None:
+        """
+        Args:
+            s3_client: boto3 S3 client.
+            bucket (str): Destination bucket.
+            prefix (str): Key prefix prepended to each object name.
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def open(self, name: str, total_size: Optional[int] = None) -> S3MultipartUpload:
+        """Starts a multipart upload for an object called ``name``."""
+        key = f"{self.prefix}/{name}" if self.prefix else name
+        return S3MultipartUpload(self.s3_client, self.bucket, key, total_size)
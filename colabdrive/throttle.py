@@ -0,0 +1,241 @@
+## throttle.py
+
+import contextlib
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+import requests
+from colabdrive.logger import logger
+from colabdrive import metrics
+
+THROTTLE_STATUSES = (429, 503)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'SlowDown', 'Throttling',
+                      'TooManyRequests', 'too_many_requests')
+MAX_BACKOFF = 60.0
+
+
+class ThrottledError(IOError):
+    """Raised when a provider answers with a "slow down" response."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_and_headers(error: BaseException):
+    """Pulls the HTTP status and headers out of the client libraries' error types."""
+    resp = getattr(error, 'resp', None)  # googleapiclient HttpError (httplib2 response)
+    if resp is not None and hasattr(resp, 'status'):
+        return resp.status, resp
+    response = getattr(error, 'response', None)
+    if isinstance(response, requests.Response):
+        return response.status_code, response.headers
+    if isinstance(response, dict):  # botocore ClientError
+        meta = response.get('ResponseMetadata', {})
+        return meta.get('HTTPStatusCode'), meta.get('HTTPHeaders', {})
+    return None, {}
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Tells whether an exception from any backend means "retry later, more slowly"."""
+    if isinstance(error, ThrottledError) or type(error).__name__ == 'RateLimitError':
+        return True
+    status, _ = _status_and_headers(error)
+    if status in THROTTLE_STATUSES:
+        return True
+    if status == 403 or isinstance(getattr(error, 'response', None), dict):
+        return any(reason in str(error) for reason in RATE_LIMIT_REASONS)
+    # pydrive2 wraps the HttpError it got from the API client.
+    cause = error.args[0] if error.args and isinstance(error.args[0], BaseException) else None
+    return cause is not None and is_throttled(cause)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Returns the server-requested delay in seconds, if the error carries one."""
+    if isinstance(error, ThrottledError):
+        return error.retry_after
+    backoff = getattr(error, 'backoff', None)  # dropbox RateLimitError
+    if backoff is not None:
+        return float(backoff)
+    _, headers = _status_and_headers(error)
+    return parse_retry_after(headers.get('retry-after') or headers.get('Retry-After'))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def check_response(response: requests.Response) -> requests.Response:
+    """Raises ThrottledError for a throttling ``requests`` response, else returns it."""
+    if response.status_code in THROTTLE_STATUSES:
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        response.close()
+        raise ThrottledError(f"{response.url} returned {response.status_code}", delay)
+    return response
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one backend.
+
+    The limit grows by one each measurement window in which throughput rose
+    while the current limit was fully used, and halves when the provider
+    throttles. A Retry-After from the provider pauses all new requests to that
+    backend until it has passed.
+    """
+
+    def __init__(self, backend: str, initial: int = 8, minimum: int = 1, maximum: int = 64,
+                 window: float = 2.0) -> None:
+        """
+        Args:
+            backend (str): Name used in logs and metrics labels.
+            initial (int): Starting number of concurrent requests.
+            minimum (int): Floor the limit never drops below.
+            maximum (int): Ceiling the limit never grows past.
+            window (float): Seconds of completed work compared between adjustments.
+        """
+        self.backend = backend
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._window_start = time.monotonic()
+        self._window_work = 0.0
+        self._window_peak = 0
+        self._last_rate: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._publish()
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """Holds one unit of the backend's concurrency for the enclosed request."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self.in_flight < self.limit:
+                    self.in_flight += 1
+                    self._window_peak = max(self._window_peak, self.in_flight)
+                    return
+                else:
+                    self._cond.wait()
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self, work: float = 1.0) -> None:
+        """Records a completed request; ``work`` is its size (bytes, or 1 per call)."""
+        with self._cond:
+            self._window_work += work
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed < self.window:
+                return
+            rate = self._window_work / elapsed
+            saturated = self._window_peak >= self.limit
+            if saturated and (self._last_rate is None or rate > self._last_rate * 1.05):
+                if self.limit < self.maximum:
+                    self.limit += 1
+                    self._cond.notify_all()
+                    self._publish()
+            self._last_rate = rate
+            self._window_start = now
+            self._window_work = 0.0
+            self._window_peak = self.in_flight
+
+    def on_throttle(self, delay: float) -> None:
+        """Halves the limit and pauses new requests for ``delay`` seconds."""
+        with self._cond:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + delay)
+            # A burst of rejections from one overload counts as a single signal.
+            if now - self._last_decrease >= max(delay, 1.0):
+                self.limit = max(self.minimum, self.limit // 2)
+                self._last_decrease = now
+                self._last_rate = None
+                self._publish()
+                logger.warning(f"{self.backend} is throttling; concurrency limit now {self.limit}")
+
+    def _publish(self) -> None:
+        metrics.registry.set('colabdrive_concurrency_limit', self.limit, backend=self.backend)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+metrics.registry.help['colabdrive_concurrency_limit'] = 'Current adaptive concurrency limit per backend.'
+
+
+def limiter_for(backend: str) -> AdaptiveLimiter:
+    """Returns the process-wide limiter for ``backend``."""
+    with _limiters_lock:
+        limiter = _limiters.get(backend)
+        if limiter is None:
+            limiter = _limiters[backend] = AdaptiveLimiter(backend)
+        return limiter
+
+
+def backoff_delay(attempt: int, base: float = 1.0) -> float:
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(0, min(MAX_BACKOFF, base * (2 ** attempt)))
+
+
+def retry_call(backend: str, fn: Callable[[], Any], max_attempts: int = 5,
+               work: Union[float, Callable[[Any], float]] = 1.0,
+               on_retry: Callable[[], None] = metrics.add_retry) -> Any:
+    """Calls ``fn`` under the backend's concurrency limit, retrying throttled attempts.
+
+    Errors that are not throttling responses are raised immediately; so is
+    the last throttling error once ``max_attempts`` is used up.
+
+    Args:
+        backend (str): Limiter to run under, e.g. "drive", "s3", "huggingface".
+        fn (Callable): The request to make.
+        max_attempts (int): Attempts before giving up on a throttled request.
+        work (float | Callable): Size of the request for throughput tracking, or a
+            function of ``fn``'s result returning it (e.g. bytes transferred).
+        on_retry (Callable): Called once per retry; counts it on the current operation by default.
+    """
+    limiter = limiter_for(backend)
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with limiter.slot():
+                result = fn()
+        except Exception as e:
+            if attempt == max_attempts or not is_throttled(e):
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            # A provider asking for hours would otherwise stall the caller that long.
+            delay = min(delay, MAX_BACKOFF)
+            limiter.on_throttle(delay)
+            on_retry()
+            logger.warning(f"{backend} throttled ({e}); retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        limiter.on_success(work(result) if callable(work) else work)
+        return result
@@ -0,0 +1,217 @@
+## thumbnails.py
+
+import concurrent.futures
+import hashlib
+import io
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import requests
+from PIL import Image
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive.ranged_download import DRIVE_FILES_URL
+from colabdrive import metrics, throttle
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp', '.tiff', '.tif'}
+# Source images larger than this are only previewed through Drive's thumbnailLink.
+MAX_DECODE_BYTES = 200 * 1024 * 1024
+
+
+class ThumbnailCache:
+    """Small JPEG previews of images, generated in the background and kept on disk.
+
+    Previews come from Drive's ``thumbnailLink`` when the file's ID is known,
+    which avoids reading the image at all; otherwise the image is decoded
+    with Pillow's draft mode, which lets JPEGs decode at a fraction of their
+    size. Entries are keyed by file ID (or path) and mtime, so an edited image
+    gets a new preview, and the cache is trimmed to ``max_bytes`` by evicting
+    the least recently used previews.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 size: int = 256, workers: int = 8,
+                 headers: Optional[Callable[[], Dict[str, str]]] = None) -> None:
+        """
+        Args:
+            cache_dir (str, optional): Where previews are stored; defaults to the
+                ``thumbnail_dir`` setting.
+            max_bytes (int, optional): Cache size limit; defaults to the
+                ``thumbnail_cache_bytes`` setting.
+            size (int): Longest side of a preview in pixels.
+            workers (int): Previews generated concurrently.
+            headers (Callable, optional): Returns Drive auth headers; without it only
+                local decoding is used.
+        """
+        self.cache_dir = cache_dir or config.get('thumbnail_dir')
+        self.max_bytes = max_bytes or config.get('thumbnail_cache_bytes') or 256 * 1024 * 1024
+        self.size = size
+        self.headers = headers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+        self._lock = threading.Lock()
+        self._pending: Dict[str, concurrent.futures.Future] = {}
+        self._total: Optional[int] = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_path(self, key: str, mtime: float) -> str:
+        digest = hashlib.sha1(f"{key}:{mtime}:{self.size}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + '.jpg')
+
+    def get(self, path: str, file_id: Optional[str] = None, mtime: Optional[float] = None) -> Optional[str]:
+        """Returns the cached preview of an image, generating it if needed.
+
+        Args:
+            path (str): Local or mounted path of the image; may be a display name
+                when only ``file_id`` is available.
+            file_id (str, optional): Drive file ID, used to fetch ``thumbnailLink``.
+            mtime (float, optional): Modification time; read from ``path`` if omitted.
+
+        Returns:
+            Optional[str]: Path of the JPEG preview, None if none could be made.
+        """
+        try:
+            return self.submit(path, file_id, mtime).result()
+        except Exception as e:
+            logger.warning(f"No preview for {path}: {e}")
+            return None
+
+    def submit(self, path: str, file_id: Optional[str] = None,
+               mtime: Optional[float] = None) -> concurrent.futures.Future:
+        """Schedules a preview on the background pool; the future yields its path."""
+        if mtime is None:
+            mtime = os.stat(path).st_mtime if os.path.exists(path) else 0.0
+        cache_path = self._cache_path(file_id or os.path.abspath(path), mtime)
+        with self._lock:
+            future = self._pending.get(cache_path)
+            if future is not None:
+                return future
+            if os.path.exists(cache_path):
+                # Touch it so LRU eviction sees the hit.
+                os.utime(cache_path)
+                done: concurrent.futures.Future = concurrent.futures.Future()
+                done.set_result(cache_path)
+                metrics.registry.inc('colabdrive_thumbnail_requests_total', result='hit')
+                return done
+            future = self._executor.submit(self._generate, path, file_id, cache_path)
+            self._pending[cache_path] = future
+        future.add_done_callback(lambda _: self._forget(cache_path))
+        return future
+
+    def _forget(self, cache_path: str) -> None:
+        with self._lock:
+            self._pending.pop(cache_path, None)
+
+    def gallery(self, items: List[Tuple[str, Optional[str], Optional[float]]],
+                timeout: float = 30.0) -> List[Tuple[str, str]]:
+        """Previews for a page of images, generated in parallel.
+
+        Args:
+            items (List[Tuple]): (path, file_id, mtime) per image.
+            timeout (float): Seconds to wait in total; unfinished previews are left
+                generating for the next request and omitted.
+
+        Returns:
+            List[Tuple[str, str]]: (preview path, file name) in input order.
+        """
+        futures = [(self.submit(path, file_id, mtime), path) for path, file_id, mtime in items]
+        concurrent.futures.wait([f for f, _ in futures], timeout=timeout)
+        results = []
+        for future, path in futures:
+            if future.done() and future.exception() is None and future.result():
+                results.append((future.result(), os.path.basename(path)))
+        return results
+
+    def _generate(self, path: str, file_id: Optional[str], cache_path: str) -> Optional[str]:
+        data = None
+        if file_id and self.headers:
+            try:
+                data = self._from_drive(file_id)
+                source = 'drive'
+            except Exception as e:
+                logger.debug(f"Drive thumbnail unavailable for {file_id}: {e}")
+        if data is None:
+            if not os.path.isfile(path) or os.path.getsize(path) > MAX_DECODE_BYTES:
+                metrics.registry.inc('colabdrive_thumbnail_requests_total', result='unavailable')
+                return None
+            data = self._from_file(path)
+            source = 'decode'
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + '.part'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, cache_path)
+        metrics.registry.inc('colabdrive_thumbnail_requests_total', result=source)
+        self._account(len(data))
+        return cache_path
+
+    def _from_drive(self, file_id: str) -> bytes:
+        """Downloads Drive's own preview, resized server-side to ``size``."""
+        def attempt():
+            response = requests.get(f"{DRIVE_FILES_URL}/{file_id}", params={'fields': 'thumbnailLink'},
+                                    headers=self.headers(), timeout=30)
+            throttle.check_response(response)
+            response.raise_for_status()
+            link = response.json().get('thumbnailLink')
+            if not link:
+                raise ValueError("no thumbnailLink")
+            # Links end in a size suffix such as "=s220"; ask for ours instead.
+            link = link.rsplit('=s', 1)[0] + f"=s{self.size}"
+            image = requests.get(link, headers=self.headers(), timeout=30)
+            throttle.check_response(image)
+            image.raise_for_status()
+            return image.content
+        content = throttle.retry_call('drive', attempt, max_attempts=3)
+        # Re-encode so every cached preview is a JPEG of the requested size.
+        with Image.open(io.BytesIO(content)) as image:
+            return self._encode(image)
+
+    def _from_file(self, path: str) -> bytes:
+        with Image.open(path) as image:
+            # JPEG decoders can scale by 1/2..1/8 while decoding; a no-op for other formats.
+            image.draft('RGB', (self.size, self.size))
+            return self._encode(image)
+
+    def _encode(self, image: Image.Image) -> bytes:
+        image.thumbnail((self.size, self.size))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        return buffer.getvalue()
+
+    def _account(self, added: int) -> None:
+        """Tracks the cache size and evicts least recently used previews past ``max_bytes``."""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(entry[1] for entry in self._entries())
+            else:
+                self._total += added
+            if self._total <= self.max_bytes:
+                return
+            # Trim to 90% so eviction does not run on every new preview.
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in sorted(self._entries()):
+                if self._total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self._total -= size
+                except OSError:
+                    pass
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for directory, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+
+metrics.registry.help['colabdrive_thumbnail_requests_total'] = 'Thumbnail requests by how they were served.'
@@ -1,27 +1,79 @@
 ## ui.py
 
+import atexit
+import os
+import time
 import gradio as gr
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 from gradio.themes.utils import colors
 from gradio.themes import Base
 from colabdrive.logger import logger
+from colabdrive.config import config
 from colabdrive.file_operations import FileOperations
 from colabdrive.drive_operations import DriveOperations
 from colabdrive.model_operations import ModelOperations
+from colabdrive.model_management import ModelManagement
+from colabdrive.job_store import JOB_STATUSES, JobStore, WorkerPool
+from colabdrive.search_index import search_index
+from colabdrive.stream_upload import drive_auth_headers
+from colabdrive.thumbnails import IMAGE_EXTENSIONS, ThumbnailCache
+
+def _format_size(size: int) -> str:
+    """Formats a byte count for display."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
 
 class UI:
     """Class for creating the user interface and displaying progress and errors."""
 
-    def __init__(self) -> None:
-        """Initializes the UI class and its components."""
+    def __init__(self, job_workers: Optional[int] = None) -> None:
+        """Initializes the UI class and its components.
+
+        Args:
+            job_workers (int, optional): Worker processes for transfers and conversions;
+                defaults to the ``job_workers`` setting. With 0 they run in the web
+                server's process.
+        """
         self.interface: Optional[gr.Interface] = None
+        self.page_size = 200
+        self.metrics_server = None
         self.file_operations = FileOperations()
-        self.drive_operations = DriveOperations()
+        self.drive_operations = DriveOperations(gauth=self.file_operations.gauth)
         try:
             self.model_operations = ModelOperations()
         except Exception as e:
             logger.error(f"Failed to initialize ModelOperations: {e}")
             self.model_operations = None
+        self.model_management = ModelManagement()
+        self.catalog_refreshed = False
+        self.search_index_refreshed = False
+        gauth = self.file_operations.gauth
+        self.thumbnails = ThumbnailCache(headers=(lambda: drive_auth_headers(gauth)) if gauth else None)
+        self.gallery_page_size = 48
+        workers = config.get('job_workers') if job_workers is None else job_workers
+        # With workers, handlers only queue transfers and conversions and report their job ID.
+        self.jobs = JobStore() if workers else None
+        self.worker_pool = WorkerPool(workers, self.jobs.db_path) if workers else None
+
+    def _queue_or_run(self, kind: str, args: Dict[str, Any], run: Callable[[], str]) -> str:
+        """Queues a job for the worker pool when it is enabled, otherwise calls ``run`` here.
+
+        Args:
+            kind (str): Job kind, one of the ``colabdrive.headless`` step types
+            args (Dict[str, Any]): Arguments of that step type
+            run (Callable[[], str]): Does the work in-process and returns the status message
+
+        Returns:
+            str: Status message
+        """
+        if self.jobs is None:
+            return run()
+        job_id = self.jobs.submit(kind, args)
+        return f"Queued as job {job_id}; see the Jobs tab for progress"
 
     def mount_drive(self) -> str:
         """Mount Google Drive and return status.
@@ -32,19 +84,87 @@ class UI:
         success = self.drive_operations.mount_drive()
         return "Drive mounted successfully!" if success else "Failed to mount drive"
 
-    def list_directory(self, directory: str) -> str:
+    def list_directory(self, directory: str, pattern: str = "", depth: int = 0,
+                       page: int = 1, refresh: bool = False) -> str:
         """List files in the specified directory.
 
         Args:
             directory (str): Path to directory to list
+            pattern (str): Optional glob filter such as "*.safetensors"
+            depth (int): Number of subdirectory levels to include
+            page (int): 1-based page of results to show
+            refresh (bool): Drop cached listings before walking
 
         Returns:
-            str: Newline-separated list of files or error message
+            str: One line per entry with type, size and modification time, or error message
         """
-        files = self.drive_operations.list_files(directory)
-        if files:
-            return "\n".join(files)
-        return "Failed to list files"
+        if refresh:
+            self.drive_operations.stat_cache.invalidate(directory)
+        page = max(1, int(page or 1))
+        entries = self.drive_operations.walk(
+            directory,
+            max_depth=max(0, int(depth or 0)),
+            pattern=pattern.strip() or None,
+            offset=(page - 1) * self.page_size,
+            limit=self.page_size
+        )
+        if entries is None:
+            return "Failed to list files"
+        if not entries:
+            return "No files found"
+        lines = []
+        for entry in entries:
+            size = "<DIR>" if entry.is_dir else _format_size(entry.size)
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.mtime))
+            lines.append(f"{size:>10}  {modified}  {os.path.relpath(entry.path, directory)}")
+        return "\n".join(lines)
+
+    def image_gallery(self, directory: str, pattern: str = "", depth: int = 0,
+                      page: int = 1, refresh: bool = False) -> list:
+        """Previews the images in a directory, a page at a time.
+
+        Args:
+            directory (str): Path to directory to browse
+            pattern (str): Optional glob filter such as "*.png"
+            depth (int): Number of subdirectory levels to include
+            page (int): 1-based page of images to show
+            refresh (bool): Drop cached listings before walking
+
+        Returns:
+            list: (thumbnail path, file name) pairs for the gallery
+        """
+        if refresh:
+            self.drive_operations.stat_cache.invalidate(directory)
+        entries = self.drive_operations.walk(directory, max_depth=max(0, int(depth or 0)),
+                                             pattern=pattern.strip() or None) or []
+        images = [entry for entry in entries if not entry.is_dir
+                  and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS]
+        start = (max(1, int(page or 1)) - 1) * self.gallery_page_size
+        items = []
+        for entry in images[start:start + self.gallery_page_size]:
+            # Files on the Drive mount are previewed through the API rather than read over FUSE.
+            file_id = self.drive_operations.drive_id(entry.path) \
+                if entry.path.startswith(self.drive_operations.mount_point) else None
+            items.append((entry.path, file_id, entry.mtime))
+        return self.thumbnails.gallery(items)
+
+    def fetch_to_local(self, path: str) -> str:
+        """Copy a file from the mounted drive to local disk.
+
+        Args:
+            path (str): Path of the file on the mounted drive
+
+        Returns:
+            str: Status message indicating fetch result
+        """
+        if not path or not path.strip():
+            return "Error: Please provide a file path"
+        path = path.strip()
+
+        def run() -> str:
+            result = self.drive_operations.fetch_to_local(path)
+            return f"Fetched to {result}" if result else "Fetch failed"
+        return self._queue_or_run('fetch', {'path': path}, run)
 
     def download_from_huggingface(self, model_name: str, file_name: str) -> str:
         """Download a file from HuggingFace.
@@ -58,8 +178,11 @@ class UI:
         """
         if not self.model_operations:
             return "Model operations not available"
-        result = self.model_operations.download_from_huggingface(model_name, file_name)
-        return f"Downloaded to {result}" if result else "Download failed"
+
+        def run() -> str:
+            result = self.model_operations.download_from_huggingface(model_name, file_name)
+            return f"Downloaded to {result}" if result else "Download failed"
+        return self._queue_or_run('huggingface', {'repo': model_name, 'file': file_name}, run)
 
     def clone_github_repo(self, repo_url: str) -> str:
         """Clone a GitHub repository.
@@ -72,8 +195,11 @@ class UI:
         """
         if not self.model_operations:
             return "Model operations not available - initialization failed"
-        result = self.model_operations.clone_github_repo(repo_url)
-        return f"Cloned to {result}" if result else "Clone failed"
+
+        def run() -> str:
+            result = self.model_operations.clone_github_repo(repo_url)
+            return f"Cloned to {result}" if result else "Clone failed"
+        return self._queue_or_run('git', {'url': repo_url}, run)
 
     def download_from_civitai(self, model_url: str) -> str:
         """Download a model from CivitAI.
@@ -86,8 +212,80 @@ class UI:
         """
         if not self.model_operations:
             return "Model operations not available - initialization failed"
-        result = self.model_operations.download_civitai_model(model_url)
-        return f"Downloaded to {result}" if result else "Download failed"
+
+        def run() -> str:
+            result = self.model_operations.download_civitai_model(model_url)
+            return f"Downloaded to {result}" if result else "Download failed"
+        return self._queue_or_run('civitai', {'url': model_url}, run)
+
+    def search_models(self, query: str, refresh: bool = False) -> str:
+        """Search the local model catalog.
+
+        Args:
+            query (str): Text to look for in names, paths, sources and header metadata
+            refresh (bool): Re-index changed model files before searching
+
+        Returns:
+            str: One line per model with format, size, parameter count and path
+        """
+        # The first search of a session picks up models added while the app was closed.
+        if refresh or not self.catalog_refreshed:
+            self.model_management.refresh_catalog()
+            self.catalog_refreshed = True
+        models = self.model_management.search_models(query or "", limit=self.page_size)
+        if not models:
+            return "No models found"
+        lines = []
+        for model in models:
+            params = f"{model['parameter_count'] / 1e6:.0f}M params" if model['parameter_count'] else ""
+            source = f"  [{model['source']}]" if model['source'] else ""
+            lines.append(f"{model['format']:>11}  {_format_size(model['size']):>10}  {params:>13}  "
+                         f"{model['path']}{source}")
+        return "\n".join(lines)
+
+    def reindex_files(self) -> None:
+        """Brings the file search index up to date with Drive, the mount and the model directory."""
+        sources = []
+        if self.file_operations.drive:
+            sources.append(('drive', lambda: search_index.index_drive(self.file_operations.drive)))
+        mounted = os.path.join(self.drive_operations.mount_point, 'My Drive')
+        if os.path.isdir(mounted):
+            sources.append(('mount', lambda: search_index.index_directory(mounted, 'mount')))
+        if self.model_operations and os.path.isdir(self.model_operations.default_path):
+            models = self.model_operations.default_path
+            sources.append(('models', lambda: search_index.index_directory(models, 'models')))
+        for name, index in sources:
+            try:
+                index()
+            except Exception as e:
+                logger.error(f"Failed to index {name} for search: {e}")
+
+    def search_files(self, query: str, reindex: bool = False) -> str:
+        """Fuzzy-search file names and paths across Drive, the mount and the model directory.
+
+        Args:
+            query (str): Words or fragments of the name or path; small typos are tolerated
+            reindex (bool): Pick up changes since the last index update before searching
+
+        Returns:
+            str: One line per match with source, size, path and Drive file ID
+        """
+        if not query or len(query.strip()) < 2:
+            return "Enter at least two characters"
+        # The first search of a session picks up files added while the app was closed.
+        if reindex or not self.search_index_refreshed:
+            self.reindex_files()
+            self.search_index_refreshed = True
+        start = time.perf_counter()
+        results = search_index.search(query, limit=self.page_size)
+        if not results:
+            return "No files found"
+        lines = [f"{len(results)} matches in {(time.perf_counter() - start) * 1000:.0f} ms"]
+        for entry in results:
+            size = "<DIR>" if entry['is_dir'] else _format_size(entry['size'] or 0)
+            file_id = f"  id={entry['file_id']}" if entry['file_id'] else ""
+            lines.append(f"{entry['source']:>6}  {size:>10}  {entry['path']}{file_id}")
+        return "\n".join(lines)
 
     def create_interface(self) -> None:
         """Creates the user interface for the application."""
@@ -131,6 +329,15 @@ class UI:
                                 )
                             with gr.Column(scale=1):
                                 self.list_files_button = gr.Button("📋 List Files", variant="secondary")
+
+                        with gr.Row():
+                            self.list_files_pattern = gr.Textbox(
+                                label="Filter",
+                                placeholder="e.g., *.safetensors"
+                            )
+                            self.list_files_depth = gr.Number(label="Depth", value=0, precision=0)
+                            self.list_files_page = gr.Number(label="Page", value=1, precision=0)
+                            self.list_files_refresh = gr.Checkbox(label="Refresh", value=False)
                         
                         self.files_list = gr.Textbox(
                             label="Files",
@@ -138,6 +345,25 @@ class UI:
                             lines=10,
                             container=True
                         )
+
+                        with gr.Accordion("Image Previews", open=False):
+                            self.gallery_button = gr.Button("🖼️ Show Images", variant="secondary")
+                            self.image_gallery_view = gr.Gallery(
+                                label="Images",
+                                columns=6,
+                                height="auto",
+                                preview=False
+                            )
+
+                        with gr.Row():
+                            with gr.Column(scale=3):
+                                self.fetch_path_input = gr.Textbox(
+                                    label="Fetch to Local Disk",
+                                    placeholder="/content/drive/My Drive/models/model.safetensors"
+                                )
+                            with gr.Column(scale=1):
+                                self.fetch_button = gr.Button("⚡ Fetch", variant="secondary")
+                                self.fetch_status = gr.Textbox(label="Status", interactive=False)
                 
                 with gr.Tab("🤖 Model Operations", id=2):
                     with gr.Group():
@@ -177,9 +403,41 @@ class UI:
                             with gr.Column(scale=1):
                                 self.civitai_download_button = gr.Button("⬇️ Download from CivitAI", variant="primary")
                                 self.civitai_status = gr.Textbox(label="Status", interactive=False)
+
+                        gr.Markdown("### Model Catalog")
+                        with gr.Row():
+                            with gr.Column(scale=3):
+                                self.model_search_input = gr.Textbox(
+                                    label="Search Models",
+                                    placeholder="e.g., sdxl, fp16, lora"
+                                )
+                            with gr.Column(scale=1):
+                                self.model_search_button = gr.Button("🔎 Search", variant="secondary")
+                                self.model_search_refresh = gr.Checkbox(label="Rescan", value=False)
+                        self.model_search_results = gr.Textbox(
+                            label="Models",
+                            interactive=False,
+                            lines=10
+                        )
                 
                 with gr.Tab("📄 File Operations", id=3):
                     with gr.Group():
+                        with gr.Accordion("Find", open=True):
+                            with gr.Row():
+                                with gr.Column(scale=3):
+                                    self.file_search_input = gr.Textbox(
+                                        label="Search Files",
+                                        placeholder="Part of a name or path, e.g. juggernaut xl"
+                                    )
+                                with gr.Column(scale=1):
+                                    self.file_search_button = gr.Button("🔎 Search", variant="secondary")
+                                    self.file_search_reindex = gr.Checkbox(label="Reindex", value=False)
+                            self.file_search_results = gr.Textbox(
+                                label="Matches",
+                                interactive=False,
+                                lines=10
+                            )
+
                         with gr.Accordion("Upload", open=True):
                             with gr.Row():
                                 with gr.Column(scale=2):
@@ -195,8 +453,8 @@ class UI:
                             with gr.Row():
                                 with gr.Column(scale=2):
                                     self.download_file_input = gr.Textbox(
-                                        label="File ID",
-                                        placeholder="Enter file ID to download"
+                                        label="File ID or Drive Path",
+                                        placeholder="Enter file ID or path, e.g. My Drive/models/model.safetensors"
                                     )
                                 with gr.Column(scale=1):
                                     self.download_button = gr.Button("⬇️ Download", variant="primary")
@@ -217,23 +475,76 @@ class UI:
                                     self.convert_button = gr.Button("🔄 Convert", variant="primary")
                                     self.convert_status = gr.Textbox(label="Status", interactive=False)
 
+                if self.jobs is not None:
+                    with gr.Tab("🗂️ Jobs", id=4):
+                        with gr.Group():
+                            with gr.Row():
+                                self.jobs_refresh_button = gr.Button("🔄 Refresh", variant="secondary")
+                                self.cancel_job_input = gr.Number(label="Job ID", precision=0)
+                                self.cancel_job_button = gr.Button("✖️ Cancel Job", variant="secondary")
+                            self.jobs_list = gr.Textbox(
+                                label="Jobs",
+                                interactive=False,
+                                lines=15
+                            )
+
+            # Without job workers, transfers and conversions run in the server and
+            # share its state, so they keep Gradio's one-at-a-time default; with
+            # workers their handlers only queue a job.
+            transfer_limit = 'default' if self.jobs is not None else 1
+
             # Connect all the new buttons
             self.mount_button.click(self.mount_drive, outputs=self.mount_status)
-            self.list_files_button.click(self.list_directory, inputs=self.list_files_input, outputs=self.files_list)
+            self.list_files_button.click(self.list_directory,
+                                        inputs=[self.list_files_input, self.list_files_pattern,
+                                                self.list_files_depth, self.list_files_page,
+                                                self.list_files_refresh],
+                                        outputs=self.files_list)
+            self.gallery_button.click(self.image_gallery,
+                                      inputs=[self.list_files_input, self.list_files_pattern,
+                                              self.list_files_depth, self.list_files_page,
+                                              self.list_files_refresh],
+                                      outputs=self.image_gallery_view)
+            self.fetch_button.click(self.fetch_to_local, inputs=self.fetch_path_input,
+                                    outputs=self.fetch_status, concurrency_limit=transfer_limit)
             self.hf_download_button.click(self.download_from_huggingface, 
                                         inputs=[self.hf_model_name, self.hf_file_name],
-                                        outputs=self.hf_status)
+                                        outputs=self.hf_status,
+                                        concurrency_limit=transfer_limit)
             self.github_clone_button.click(self.clone_github_repo,
                                          inputs=self.github_url,
-                                         outputs=self.github_status)
+                                         outputs=self.github_status,
+                                         concurrency_limit=transfer_limit)
             self.civitai_download_button.click(self.download_from_civitai,
                                              inputs=self.civitai_url,
-                                             outputs=self.civitai_status)
+                                             outputs=self.civitai_status,
+                                             concurrency_limit=transfer_limit)
+            self.model_search_button.click(self.search_models,
+                                           inputs=[self.model_search_input, self.model_search_refresh],
+                                           outputs=self.model_search_results)
+            self.model_search_input.submit(self.search_models,
+                                           inputs=[self.model_search_input, self.model_search_refresh],
+                                           outputs=self.model_search_results)
             
+            self.file_search_button.click(self.search_files,
+                                          inputs=[self.file_search_input, self.file_search_reindex],
+                                          outputs=self.file_search_results)
+            self.file_search_input.submit(self.search_files,
+                                          inputs=[self.file_search_input, self.file_search_reindex],
+                                          outputs=self.file_search_results)
+
             # Original buttons
-            self.upload_button.click(self.upload_file, inputs=self.upload_file_input, outputs=self.upload_status)
-            self.download_button.click(self.download_file, inputs=self.download_file_input, outputs=self.download_status)
-            self.convert_button.click(self.convert_file, inputs=[self.convert_file_input, self.output_format_input], outputs=self.convert_status)
+            self.upload_button.click(self.upload_file, inputs=self.upload_file_input, outputs=self.upload_status,
+                                     concurrency_limit=transfer_limit)
+            self.download_button.click(self.download_file, inputs=self.download_file_input, outputs=self.download_status,
+                                       concurrency_limit=transfer_limit)
+            self.convert_button.click(self.convert_file, inputs=[self.convert_file_input, self.output_format_input], outputs=self.convert_status,
+                                      concurrency_limit=transfer_limit)
+
+            if self.jobs is not None:
+                self.jobs_refresh_button.click(self.job_status, outputs=self.jobs_list)
+                self.cancel_job_button.click(self.cancel_job, inputs=self.cancel_job_input, outputs=self.jobs_list)
+                self.interface.load(self.job_status, outputs=self.jobs_list)
 
         logger.info("User interface created successfully.")
 
@@ -247,13 +558,15 @@ class UI:
             str: Status message indicating the result of the upload.
         """
         logger.info(f"Attempting to upload file: {file}")
-        success = self.file_operations.upload_file(file)
-        if success:
-            logger.info(f"File uploaded successfully: {file}")
-            return "Upload successful!"
-        else:
-            logger.error(f"Failed to upload file: {file}")
-            return "Upload failed."
+
+        def run() -> str:
+            success, message = self.file_operations.upload_file(file)
+            if success:
+                logger.info(f"File uploaded successfully: {file}")
+            else:
+                logger.error(f"Failed to upload file: {file}")
+            return message
+        return self._queue_or_run('drive_upload', {'file': file}, run)
 
     def download_file(self, file_id: str) -> str:
         """Handles file download and updates the status.
@@ -269,9 +582,12 @@ class UI:
         if not file_id or not file_id.strip():
             return "Error: Please provide a valid file ID"
             
-        success, message = self.file_operations.download_file(file_id)
-        logger.info(f"Download result: {message}")
-        return message
+
+        def run() -> str:
+            success, message = self.file_operations.download_file(file_id)
+            logger.info(f"Download result: {message}")
+            return message
+        return self._queue_or_run('drive_download', {'file': file_id.strip()}, run)
 
     def convert_file(self, input_file: str, output_format: str) -> str:
         """Handles file conversion and updates the status.
@@ -296,16 +612,66 @@ class UI:
             return "Error: Invalid file input"
             
         logger.info(f"Attempting to convert file: {file_path} to {output_format}")
-        success, message = self.file_operations.convert_file(file_path, output_format)
-        logger.info(f"Conversion result: {message}")
-        return message
+
+        def run() -> str:
+            success, message = self.file_operations.convert_file(file_path, output_format)
+            logger.info(f"Conversion result: {message}")
+            return message
+        return self._queue_or_run('convert', {'input': file_path, 'format': output_format}, run)
+
+    def job_status(self) -> str:
+        """Lists recent jobs, newest first.
+
+        Returns:
+            str: A summary line, then one line per job with its state, elapsed time and outcome
+        """
+        if self.jobs is None:
+            return "Job workers are disabled"
+        counts = self.jobs.counts()
+        summary = ", ".join(f"{counts[status]} {status}" for status in JOB_STATUSES if counts[status])
+        lines = [f"{self.worker_pool.alive()} workers; {summary or 'no jobs'}"]
+        now = time.time()
+        for job in self.jobs.recent(self.page_size):
+            elapsed = (job['finished_at'] or now) - (job['started_at'] or job['created_at'])
+            detail = job['error'] or job['result'] or ""
+            lines.append(f"#{job['id']:<5} {job['kind']:14} {job['status']:9} {elapsed:7.0f}s  {detail}")
+        return "\n".join(lines)
+
+    def cancel_job(self, job_id: float) -> str:
+        """Cancels a queued job.
+
+        Args:
+            job_id (float): ID of the job, as entered in the number field
+
+        Returns:
+            str: Outcome followed by the refreshed job list
+        """
+        if self.jobs is None or not job_id:
+            return self.job_status()
+        job_id = int(job_id)
+        message = f"Cancelled job {job_id}" if self.jobs.cancel(job_id) \
+            else f"Job {job_id} is not queued; running jobs cannot be cancelled"
+        return f"{message}\n{self.job_status()}"
 
     def launch(self) -> None:
         """Launches the Gradio interface."""
         if not self.interface:
             self.create_interface()
             
-        from colabdrive.config import config
+        from colabdrive.metrics import start_metrics_server
+
+        # Expose transfer metrics for Prometheus alongside the web UI
+        if self.metrics_server is None:
+            self.metrics_server = start_metrics_server()
+
+        if self.worker_pool is not None:
+            self.worker_pool.start()
+            atexit.register(self.worker_pool.stop)
+
+        # Gradio runs one event at a time by default, so a slow listing or search
+        # would hold up every other user of the page. Transfer handlers set their
+        # own limit in create_interface.
+        self.interface.queue(default_concurrency_limit=config.get('ui_concurrency') or 1)
         
         # Define port range
         start_port = 7860
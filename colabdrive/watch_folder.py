@@ -0,0 +1,432 @@
+## watch_folder.py
+
+"""Uploads files from a local folder as soon as they have been written.
+
+    python -m colabdrive.watch_folder /content/checkpoints --backend drive \\
+        --destination "My Drive/checkpoints"
+
+Changes are detected with inotify on Linux and by polling elsewhere. A file
+is uploaded once it has been quiet for ``settle`` seconds and its size and
+mtime have stopped moving, so half-written checkpoints are never sent. A file
+saved again while queued or uploading is uploaded once more afterwards, at its
+latest version only. Failed uploads are retried with exponential backoff.
+"""
+
+import argparse
+import concurrent.futures
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from colabdrive.logger import logger
+from colabdrive.config import config
+from colabdrive.drive_paths import looks_like_path
+from colabdrive import metrics
+
+# Temporary names written by editors, torch.save wrappers and our own downloads.
+IGNORED_PATTERNS = ('*.part', '*.tmp', '*.temp', '*.swp', '*~', '.*')
+
+# inotify event masks, from <sys/inotify.h>.
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# Failed uploads are retried after RETRY_DELAY seconds, doubling up to
+# MAX_RETRY_DELAY, until MAX_RETRIES attempts have failed.
+RETRY_DELAY = 10.0
+MAX_RETRY_DELAY = 600.0
+MAX_RETRIES = 8
+
+
+class _Inotify:
+    """Minimal recursive inotify watcher over libc, reporting changed file paths."""
+
+    def __init__(self, root: str) -> None:
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        self.overflowed = False
+        self._add_tree(root)
+
+    def _add_tree(self, root: str) -> List[str]:
+        """Watches ``root`` and its subdirectories; returns files already inside them."""
+        found = []
+        for directory, _, files in os.walk(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "inotify watch limit reached (fs.inotify.max_user_watches)")
+                logger.warning(f"Cannot watch {directory}: {os.strerror(error)}")
+                continue
+            self._dirs[wd] = directory
+            found.extend(os.path.join(directory, name) for name in files)
+        return found
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def read(self, timeout: float) -> Set[str]:
+        """Waits up to ``timeout`` seconds and returns the paths that changed."""
+        changed: Set[str] = set()
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='surrogateescape')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can land in a new directory before it is watched.
+                    changed.update(self._add_tree(path))
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _scan(root: str) -> Dict[str, Tuple[int, int]]:
+    """(size, mtime_ns) of every file under ``root``."""
+    state = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (stat.st_size, stat.st_mtime_ns)
+    return state
+
+
+class _Poller:
+    """Fallback watcher that diffs directory snapshots."""
+
+    def __init__(self, root: str, interval: float) -> None:
+        self.root = root
+        self.interval = interval
+        self.overflowed = False
+        self._snapshot = _scan(root)
+
+    def read(self, timeout: float) -> Set[str]:
+        time.sleep(min(timeout, self.interval))
+        snapshot = _scan(self.root)
+        changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class FolderWatcher:
+    """Watches a folder and uploads new or modified files in the background."""
+
+    def __init__(self, directory: str, upload: Callable[[str], object], settle: Optional[float] = None,
+                 patterns: Optional[Iterable[str]] = None, workers: int = 2,
+                 poll_interval: float = 2.0, use_inotify: bool = True,
+                 upload_existing: bool = False) -> None:
+        """
+        Args:
+            directory (str): Local folder to watch, including subfolders.
+            upload (Callable): Uploads one path; a falsy or ``(False, msg)`` result
+                counts as a failure and the upload is retried with backoff.
+            settle (float, optional): Seconds without writes before a file is uploaded;
+                defaults to the ``watch_settle_seconds`` setting.
+            patterns (Iterable[str], optional): Only upload names matching these globs.
+            workers (int): Concurrent uploads.
+            poll_interval (float): Seconds between scans when inotify is unavailable.
+            use_inotify (bool): Set False to force polling, e.g. on FUSE mounts.
+            upload_existing (bool): Also upload files present when watching starts.
+        """
+        self.directory = os.path.abspath(directory)
+        self.upload = upload
+        self.settle = settle if settle is not None else (config.get('watch_settle_seconds') or 5.0)
+        self.patterns = list(patterns or [])
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.upload_existing = upload_existing
+        self._lock = threading.Lock()
+        # path -> (time of last change, (size, mtime_ns) at that time)
+        self._pending: Dict[str, Tuple[float, Optional[Tuple[int, int]]]] = {}
+        # path -> (size, mtime_ns) being uploaded
+        self._uploading: Dict[str, Tuple[int, int]] = {}
+        # path -> (size, mtime_ns) last uploaded, or found when watching started
+        self._known: Dict[str, Tuple[int, int]] = {}
+        # path -> failed attempts at its current version
+        self._attempts: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.uploaded = 0
+        self.failed = 0
+
+    def _wanted(self, path: str) -> bool:
+        name = os.path.basename(path)
+        if any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_PATTERNS):
+            return False
+        return not self.patterns or any(fnmatch.fnmatch(name, p) for p in self.patterns)
+
+    @staticmethod
+    def _state(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _note(self, paths: Iterable[str]) -> None:
+        """Restarts the quiet period of each changed file."""
+        now = time.monotonic()
+        with self._lock:
+            for path in paths:
+                if not self._wanted(path):
+                    continue
+                # A file changed mid-upload stays pending and goes again afterwards.
+                self._pending[path] = (now, self._state(path))
+                self._attempts.pop(path, None)
+
+    def _ready(self) -> List[str]:
+        """Pending files that have been quiet for ``settle`` seconds and stopped changing."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (changed_at, state) in list(self._pending.items()):
+                if now - changed_at < self.settle or path in self._uploading:
+                    continue
+                current = self._state(path)
+                if current is None:
+                    del self._pending[path]
+                elif current != state:
+                    # Written without an event we saw (e.g. polling or mmap writes); wait again.
+                    self._pending[path] = (now, current)
+                else:
+                    del self._pending[path]
+                    self._uploading[path] = current
+                    ready.append(path)
+        return ready
+
+    def _rescan(self) -> None:
+        """Notes the files whose size or mtime differ from what was last uploaded.
+
+        Used after the event queue overflowed, when changes may have been missed;
+        files already uploaded at their current state are not sent again.
+        """
+        snapshot = _scan(self.directory)
+        with self._lock:
+            self._known = {path: state for path, state in self._known.items() if path in snapshot}
+            changed = [path for path, state in snapshot.items()
+                       if self._known.get(path) != state and self._uploading.get(path) != state
+                       and path not in self._pending]
+        logger.info(f"Rescan of {self.directory} found {len(changed)} changed files")
+        self._note(changed)
+
+    def _upload_one(self, path: str) -> None:
+        start = time.monotonic()
+        try:
+            result = self.upload(path)
+            ok = result[0] if isinstance(result, tuple) else bool(result)
+        except Exception as e:
+            logger.error(f"Watch upload of {path} failed: {e}")
+            ok = False
+        with self._lock:
+            state = self._uploading.pop(path, None)
+            if ok:
+                self._known[path] = state
+                self._attempts.pop(path, None)
+                self.uploaded += 1
+            else:
+                self.failed += 1
+                retry_in = self._schedule_retry(path, state)
+        metrics.registry.inc('colabdrive_watch_uploads_total', status='ok' if ok else 'error')
+        if ok:
+            logger.info(f"Watch uploaded {path} in {time.monotonic() - start:.1f}s")
+        elif retry_in is not None:
+            logger.warning(f"Retrying upload of {path} in {retry_in:.0f}s")
+
+    def _schedule_retry(self, path: str, state: Optional[Tuple[int, int]]) -> Optional[float]:
+        """Requeues a failed upload after a backoff delay; returns the delay, None if giving up.
+
+        Must be called with the lock held.
+        """
+        if path in self._pending:
+            # Changed again during the upload; the newer version is already queued.
+            return None
+        attempts = self._attempts.get(path, 0) + 1
+        if attempts >= MAX_RETRIES:
+            self._attempts.pop(path, None)
+            logger.error(f"Giving up on {path} after {attempts} failed uploads; it is retried on its next change")
+            return None
+        self._attempts[path] = attempts
+        delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+        # Ready once the quiet period has passed after the delay.
+        self._pending[path] = (time.monotonic() + delay, state)
+        return delay
+
+    def _open_source(self):
+        if self.use_inotify:
+            try:
+                return _Inotify(self.directory)
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({e}); polling {self.directory} instead")
+        return _Poller(self.directory, self.poll_interval)
+
+    def _run(self) -> None:
+        source = self._open_source()
+        existing = _scan(self.directory)
+        if self.upload_existing:
+            self._note(existing)
+        else:
+            with self._lock:
+                self._known = existing
+        try:
+            while not self._stop.is_set():
+                self._note(source.read(min(self.settle, 1.0)))
+                if source.overflowed:
+                    # Events were dropped; fall back to comparing against a fresh scan.
+                    logger.warning(f"Watch event queue overflowed for {self.directory}; rescanning")
+                    source.overflowed = False
+                    self._rescan()
+                for path in self._ready():
+                    self._executor.submit(self._upload_one, path)
+        except Exception as e:
+            logger.error(f"Folder watcher for {self.directory} stopped: {e}")
+        finally:
+            source.close()
+
+    def start(self) -> 'FolderWatcher':
+        """Starts watching in a background thread."""
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+            self._thread = threading.Thread(target=self._run, name=f"watch:{self.directory}", daemon=True)
+            self._thread.start()
+            logger.info(f"Watching {self.directory} for new files (settle {self.settle}s)")
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        """Stops watching; with ``wait``, finishes uploads already started."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=wait)
+            self._thread = None
+
+    def status(self) -> Dict[str, int]:
+        """Counts of files waiting, uploading and awaiting a retry, and of uploads done and failed."""
+        with self._lock:
+            return {'pending': len(self._pending), 'uploading': len(self._uploading),
+                    'retrying': len(self._attempts), 'uploaded': self.uploaded, 'failed': self.failed}
+
+
+metrics.registry.help['colabdrive_watch_uploads_total'] = 'Uploads triggered by folder watchers.'
+
+
+def make_uploader(backend: str, directory: str, destination: Optional[str] = None,
+                  compress: Optional[str] = None) -> Callable[[str], object]:
+    """Builds the upload callback for a backend.
+
+    Args:
+        backend (str): "drive", "s3" or "dropbox".
+        directory (str): The watched folder; uploads keep paths relative to it, so
+            same-named files in different subfolders do not overwrite each other.
+        destination (str, optional): Drive folder path or ID, or the S3 bucket.
+        compress (str, optional): Compression setting passed to the upload.
+    """
+    directory = os.path.abspath(directory)
+    if backend == 'drive':
+        from colabdrive.file_operations import FileOperations
+        files = FileOperations()
+
+        def upload(path: str):
+            folder = destination
+            relative = os.path.relpath(os.path.dirname(path), directory)
+            if relative != '.' and looks_like_path(destination or 'My Drive'):
+                folder = f"{(destination or 'My Drive').rstrip('/')}/{relative.replace(os.sep, '/')}"
+            # Re-saved files become new revisions rather than duplicates. Settled files
+            # are uploaded in place: a staged copy of every save would double disk use.
+            return files.upload_file(path, folder, compress, if_exists='update', stage=False)
+        return upload
+
+    def key(path: str) -> str:
+        return os.path.relpath(path, directory).replace(os.sep, '/')
+
+    from colabdrive.cloud_storage import CloudStorage
+    cloud = CloudStorage()
+    if backend == 's3':
+        if not destination:
+            raise ValueError("S3 uploads need a bucket as the destination")
+        return lambda path: cloud.upload_to_s3(path, destination, compress, key=key(path))
+    if backend == 'dropbox':
+        return lambda path: cloud.upload_to_dropbox(path, '/' + key(path))
+    raise ValueError(f"Unknown backend {backend}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('directory', help='Local folder to watch')
+    parser.add_argument('--backend', choices=['drive', 's3', 'dropbox'], default='drive')
+    parser.add_argument('--destination', help='Drive folder path or ID, or S3 bucket')
+    parser.add_argument('--pattern', action='append', help='Only upload matching names (repeatable)')
+    parser.add_argument('--settle', type=float, default=None, help='Quiet seconds before uploading')
+    parser.add_argument('--compress', default=None, help='auto, zstd, gzip or off')
+    parser.add_argument('--poll', action='store_true', help='Poll instead of using inotify')
+    parser.add_argument('--existing', action='store_true', help='Also upload files already present')
+    args = parser.parse_args(argv)
+
+    watcher = FolderWatcher(args.directory,
+                            make_uploader(args.backend, args.directory, args.destination, args.compress),
+                            settle=args.settle, patterns=args.pattern, use_inotify=not args.poll,
+                            upload_existing=args.existing).start()
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"Watch status for {watcher.directory}: {watcher.status()}")
+    except KeyboardInterrupt:
+        watcher.stop()
+    print(watcher.status())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())